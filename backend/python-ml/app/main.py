@@ -19,14 +19,17 @@ This system can SAVE LIVES by detecting emergencies early.
 """
 
 import os
+import json
 import time
 from contextlib import asynccontextmanager
 from typing import List, Optional
 
+import aiofiles
 import uvicorn
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from loguru import logger
@@ -39,7 +42,17 @@ from app.services.vision_service import vision_service
 from app.services.multi_modal_risk_predictor import risk_predictor
 from app.services.emergency_detector import emergency_detector
 from app.services.alert_service import AlertService
-from app.services.data_aggregator import DataAggregator
+from app.services.data_aggregator import data_aggregator
+from app.services.inference_executor import inference_executor, InferenceQueueFull
+from app.services.camera_session import camera_sessions, CameraSession
+from app.services.motion_gate import motion_gate
+from app.services.inference_workers import inference_workers
+from app.services.clip_analyzer import clip_analyzer, ClipDecodeError
+from app.models.model_registry import model_registry, ModelsNotReady
+from app.models.pose_estimator import pose_estimator
+from app.models.emotion_detector import emotion_detector
+from app.utils.frame_context import FrameContext
+from app.utils.firebase_client import firebase_client
 
 # NEW: Advanced ML Services
 from app.services.multilingual_service import multilingual_assistant
@@ -72,6 +85,7 @@ class VisionComprehensiveRequest(BaseModel):
     userId: str
     image: str # Base64
     timestamp: Optional[str] = None
+    cameraId: Optional[str] = None # Camera within the household (motion gate, per-camera tracking)
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # Existing Models
@@ -83,6 +97,7 @@ class VisionAnalysisRequest(BaseModel):
     image: str = Field(..., description="Base64-encoded image")
     detectEmotion: bool = Field(True, description="Run emotion detection")
     detectFall: bool = Field(True, description="Run fall detection")
+    cameraId: Optional[str] = Field(None, description="Camera ID (keys fall motion tracking)")
 
 
 class RiskAssessmentRequest(BaseModel):
@@ -164,10 +179,20 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 ElderNest ML Service Starting...")
     logger.info("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
     
-    # Initialize services
-    app.state.data_aggregator = DataAggregator(initialize_firebase=True)
+    # Initialize services (shares the module-level aggregator)
+    app.state.data_aggregator = data_aggregator
     app.state.alert_service = AlertService(initialize_firebase=True)
     
+    # Vision models (and inference workers): now, in the background, or on first use
+    if model_registry.mode == 'eager':
+        await asyncio.to_thread(model_registry.load_all)
+        logger.info("✅ Vision Models: Ready")
+    elif model_registry.mode == 'background':
+        model_registry.start_background()
+        logger.info("⏳ Vision Models: Loading in background")
+    else:
+        logger.info("💤 Vision Models: Load on first use")
+    
     logger.info("✅ Vision Service: Ready")
     logger.info("✅ Risk Predictor: Ready")
     logger.info("✅ Emergency Detector: Ready")
@@ -178,6 +203,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("👋 ElderNest ML Service Shutting Down...")
+    inference_executor.shutdown(wait=False)
+    pose_estimator.shutdown()
+    emotion_detector.shutdown()
+    inference_workers.stop()
+    await firebase_client.close()
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -229,6 +259,53 @@ async def add_process_time_header(request: Request, call_next):
     return response
 
 
+# Load shedding: inference pools are full
+@app.exception_handler(InferenceQueueFull)
+async def inference_queue_full_handler(request: Request, exc: InferenceQueueFull):
+    """Reject requests while a model family is saturated."""
+    logger.warning(f"Inference backpressure on {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content={
+            "error": "Inference capacity exceeded",
+            "detail": str(exc),
+            "family": exc.family,
+            "path": str(request.url.path)
+        }
+    )
+
+
+# Vision models still loading (MODEL_LOADING=background)
+@app.exception_handler(ModelsNotReady)
+async def models_not_ready_handler(request: Request, exc: ModelsNotReady):
+    """Reject vision requests until the models have loaded."""
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "5"},
+        content={
+            "error": "Models loading",
+            "detail": str(exc),
+            "pending": exc.pending,
+            "path": str(request.url.path)
+        }
+    )
+
+
+async def require_vision_models():
+    """
+    Dependency for vision endpoints.
+    
+    Raises ModelsNotReady while the background loader runs; if models
+    were never preloaded (MODEL_LOADING=lazy), loads them now.
+    """
+    if model_registry.ready:
+        return
+    if model_registry.loading:
+        raise ModelsNotReady(model_registry.pending())
+    await asyncio.to_thread(model_registry.load_all)
+
+
 # Error handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -287,74 +364,240 @@ async def health_check():
             "vision_service": "ok",
             "risk_predictor": "ok",
             "emergency_detector": "ok"
-        }
+        },
+        "inference": inference_executor.get_stats(),
+        "pose_estimator": pose_estimator.get_stats(),
+        "emotion_detector": emotion_detector.get_stats(),
+        "camera_streams": camera_sessions.get_stats(),
+        "motion_gate": motion_gate.get_stats(),
+        "inference_workers": inference_workers.get_stats(),
+        "user_data_cache": data_aggregator.cache.get_stats(),
+        "daily_rollups": data_aggregator.rollups.get_stats(),
+        "models": model_registry.get_status()
     }
 
 
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness probe: 200 once vision models have loaded, else 503."""
+    status = model_registry.get_status()
+    return JSONResponse(status_code=200 if status['ready'] else 503, content=status)
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-# Vision Endpoints
+# Binary Frame Input
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-@app.post("/api/analyze-vision", tags=["Vision"])
-async def analyze_vision(
-    request: VisionAnalysisRequest,
-    background_tasks: BackgroundTasks
-):
+async def read_binary_frame(request: Request) -> FrameContext:
     """
-    Comprehensive vision analysis: emotion + fall detection.
+    Read a camera frame from a binary request body.
     
-    Analyzes camera frame for:
-    - Facial emotions (happy, sad, angry, etc.)
-    - Fall detection (body posture analysis)
-    - Pain indicators
-    - Distress levels
+    Accepts a multipart upload (file field `image`) or a raw encoded
+    image body. The bytes are handed to the decoder as-is, without a
+    base64 round trip.
+    """
+    content_type = request.headers.get('content-type', '')
     
-    Triggers emergency alerts if critical situations detected.
+    if content_type.startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get('image')
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart field 'image' must be a file")
+        data = await upload.read()
+    else:
+        data = await request.body()
+    
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty image body")
+    
+    return FrameContext.from_bytes(memoryview(data))
+
+
+# Upload chunk size and container suffixes (helps the demuxer probe)
+CLIP_UPLOAD_CHUNK = 1024 * 1024
+CLIP_SUFFIXES = {
+    'video/webm': '.webm',
+    'video/mp4': '.mp4',
+    'video/quicktime': '.mov',
+    'video/x-msvideo': '.avi'
+}
+
+
+async def read_clip_upload(request: Request) -> str:
     """
+    Stream an uploaded video clip to a temporary file.
+    
+    Accepts a multipart upload (file field `clip`) or a raw video body.
+    The clip is written chunk by chunk and never held in memory whole.
+    The caller removes the file.
+    
+    Returns:
+        Path of the temporary file
+    """
+    content_type = request.headers.get('content-type', '')
+    
+    if content_type.startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get('clip')
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart field 'clip' must be a file")
+        suffix = os.path.splitext(upload.filename or '')[1] or '.video'
+        
+        async def chunks():
+            while True:
+                chunk = await upload.read(CLIP_UPLOAD_CHUNK)
+                if not chunk:
+                    break
+                yield chunk
+        source = chunks()
+    else:
+        suffix = CLIP_SUFFIXES.get(content_type.split(';')[0].strip(), '.video')
+        source = request.stream()
+    
+    size = 0
+    async with aiofiles.tempfile.NamedTemporaryFile('wb', suffix=suffix, delete=False) as clip_file:
+        path = clip_file.name
+        try:
+            async for chunk in source:
+                size += len(chunk)
+                if size > clip_analyzer.max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Clip exceeds {clip_analyzer.max_bytes // (1024 * 1024)}MB"
+                    )
+                await clip_file.write(chunk)
+        except BaseException:
+            await clip_file.close()
+            os.remove(path)
+            raise
+    
+    if size == 0:
+        os.remove(path)
+        raise HTTPException(status_code=400, detail="Empty clip body")
+    
+    return path
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Vision Endpoints
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+async def _check_vision_emergency(
+    user_id: str,
+    vision_data: dict,
+    background_tasks: BackgroundTasks
+) -> Optional[dict]:
+    """Run emergency detection for a high-severity vision alert; alert family if needed."""
+    # Fetch user data for emergency check (and the family to alert)
+    data_agg = app.state.data_aggregator
+    user_data = await data_agg.fetch_user_data(
+        user_id,
+        sources=('profile', 'activity', 'health', 'events')
+    )
+    
+    emergency = emergency_detector.detect_emergency(
+        vision_data=vision_data,
+        activity_data=user_data.get('activity'),
+        health_data=user_data.get('health'),
+        recent_events=user_data.get('events')
+    )
+    
+    if not emergency.get('emergency'):
+        return None
+    
+    # Send alerts in background
+    background_tasks.add_task(
+        app.state.alert_service.send_emergency_alert,
+        elder_id=user_id,
+        elder_name=user_data.get('elder_name', 'Elder'),
+        emergency_data=emergency,
+        family_members=[
+            fm for fm in user_data.get('family_members', [])
+        ]
+    )
+    return emergency
+
+
+async def _analyze_vision_frame(
+    frame: FrameContext,
+    user_id: str,
+    detect_emotion: bool,
+    detect_fall: bool,
+    background_tasks: BackgroundTasks,
+    camera_id: Optional[str] = None
+) -> dict:
+    """Emotion + fall analysis shared by the JSON and binary endpoints."""
     try:
         # Run vision analysis
         result = await vision_service.analyze_frame(
-            image_base64=request.image,
-            user_id=request.userId,
-            detect_emotion=request.detectEmotion,
-            detect_fall=request.detectFall
+            image_base64=frame,
+            user_id=user_id,
+            detect_emotion=detect_emotion,
+            detect_fall=detect_fall,
+            camera_id=camera_id
         )
         
         # Check for emergency conditions
         alert = result.get('alert')
         if alert and alert.get('severity') in ['critical', 'high']:
-            # Fetch user data for emergency check
-            data_agg = app.state.data_aggregator
-            user_data = await data_agg.fetch_user_data(request.userId)
-            
-            emergency = emergency_detector.detect_emergency(
-                vision_data=result,
-                activity_data=user_data.get('activity'),
-                health_data=user_data.get('health'),
-                recent_events=user_data.get('events')
-            )
-            
-            if emergency.get('emergency'):
-                # Send alerts in background
-                background_tasks.add_task(
-                    app.state.alert_service.send_emergency_alert,
-                    elder_id=request.userId,
-                    elder_name=user_data.get('elder_name', 'Elder'),
-                    emergency_data=emergency,
-                    family_members=[
-                        fm for fm in user_data.get('family_members', [])
-                    ]
-                )
+            emergency = await _check_vision_emergency(user_id, result, background_tasks)
+            if emergency:
                 result['emergency'] = emergency
         
         return result
         
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         logger.error(f"Vision analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/analyze-emotion", tags=["Vision"])
+@app.post("/api/analyze-vision", tags=["Vision"], dependencies=[Depends(require_vision_models)])
+async def analyze_vision(
+    request: VisionAnalysisRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Comprehensive vision analysis: emotion + fall detection.
+    
+    Analyzes camera frame for:
+    - Facial emotions (happy, sad, angry, etc.)
+    - Fall detection (body posture analysis)
+    - Pain indicators
+    - Distress levels
+    
+    Triggers emergency alerts if critical situations detected.
+    """
+    return await _analyze_vision_frame(
+        FrameContext.from_base64(request.image),
+        request.userId,
+        request.detectEmotion,
+        request.detectFall,
+        background_tasks,
+        camera_id=request.cameraId
+    )
+
+
+@app.post("/api/analyze-vision/binary", tags=["Vision"], dependencies=[Depends(require_vision_models)])
+async def analyze_vision_binary(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    userId: str = Query(..., description="Elder user ID"),
+    detectEmotion: bool = Query(True, description="Run emotion detection"),
+    detectFall: bool = Query(True, description="Run fall detection"),
+    cameraId: Optional[str] = Query(None, description="Camera ID (keys fall motion tracking)")
+):
+    """
+    Same as /api/analyze-vision, for a raw image body or multipart upload.
+    """
+    frame = await read_binary_frame(request)
+    return await _analyze_vision_frame(
+        frame, userId, detectEmotion, detectFall, background_tasks, camera_id=cameraId
+    )
+
+
+@app.post("/api/analyze-emotion", tags=["Vision"], dependencies=[Depends(require_vision_models)])
 async def analyze_emotion(request: EmotionAnalysisRequest):
     """
     Analyze facial emotion from image.
@@ -369,12 +612,29 @@ async def analyze_emotion(request: EmotionAnalysisRequest):
     try:
         result = await vision_service.analyze_emotion_only(request.image)
         return result
+    except InferenceQueueFull:
+        raise
+    except Exception as e:
+        logger.error(f"Emotion analysis error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/analyze-emotion/binary", tags=["Vision"], dependencies=[Depends(require_vision_models)])
+async def analyze_emotion_binary(request: Request):
+    """
+    Same as /api/analyze-emotion, for a raw image body or multipart upload.
+    """
+    frame = await read_binary_frame(request)
+    try:
+        return await vision_service.analyze_emotion_only(frame)
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         logger.error(f"Emotion analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/detect-fall", tags=["Vision"])
+@app.post("/api/detect-fall", tags=["Vision"], dependencies=[Depends(require_vision_models)])
 async def detect_fall(request: FallDetectionRequest):
     """
     Detect falls and analyze body posture.
@@ -388,11 +648,77 @@ async def detect_fall(request: FallDetectionRequest):
     try:
         result = await vision_service.detect_fall_only(request.image)
         return result
+    except InferenceQueueFull:
+        raise
+    except Exception as e:
+        logger.error(f"Fall detection error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/detect-fall/binary", tags=["Vision"], dependencies=[Depends(require_vision_models)])
+async def detect_fall_binary(request: Request):
+    """
+    Same as /api/detect-fall, for a raw image body or multipart upload.
+    """
+    frame = await read_binary_frame(request)
+    try:
+        return await vision_service.detect_fall_only(frame)
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         logger.error(f"Fall detection error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/vision/analyze-clip", tags=["Vision"], dependencies=[Depends(require_vision_models)])
+async def analyze_clip(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    userId: str = Query(..., description="Elder user ID"),
+    detectEmotion: bool = Query(True, description="Run emotion detection"),
+    detectFall: bool = Query(True, description="Run fall detection")
+):
+    """
+    Analyze a short camera clip (webm / mp4 body or multipart field `clip`).
+    
+    Frames are decoded in a streaming fashion and sampled adaptively
+    (denser while the scene changes). Returns a per-sample timeline
+    plus aggregated fall and emotion verdicts; critical findings
+    trigger the usual emergency alerts.
+    """
+    path = await read_clip_upload(request)
+    try:
+        result = await clip_analyzer.analyze_clip(path, userId, detectEmotion, detectFall)
+    except ClipDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        os.remove(path)
+    
+    alert = result.get('alert')
+    if alert and alert.get('severity') in ['critical', 'high']:
+        emergency = await _check_vision_emergency(userId, result['verdict'], background_tasks)
+        if emergency:
+            result['emergency'] = emergency
+    
+    return result
+
+
+@app.get("/api/vision/movement-pattern/{user_id}", tags=["Vision"])
+async def movement_pattern(user_id: str):
+    """
+    Movement pattern from the user's recent pose history.
+    
+    Returns:
+    - Activity level
+    - Posture changes and fall events
+    - Time share standing / sitting / lying
+    """
+    return {
+        'user_id': user_id,
+        **vision_service.get_movement_pattern(user_id)
+    }
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # Risk Prediction Endpoints
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -419,7 +745,8 @@ async def predict_risk(request: RiskAssessmentRequest):
         data_agg = app.state.data_aggregator
         user_data = await data_agg.fetch_user_data(
             request.userId,
-            days=request.timeWindowDays
+            days=request.timeWindowDays,
+            sources=('chat', 'mood', 'vision', 'activity', 'health')
         )
         
         # Predict risk
@@ -433,8 +760,7 @@ async def predict_risk(request: RiskAssessmentRequest):
         
         # SAVE TO FIRESTORE (Closing the loop)
         try:
-            if data_agg.firebase_initialized and data_agg.db:
-                # 1. Add to riskScores history
+            if data_agg.firebase_initialized:
                 risk_doc = {
                     'userId': request.userId,
                     'timestamp': datetime.now(),
@@ -446,13 +772,9 @@ async def predict_risk(request: RiskAssessmentRequest):
                         'version': '1.0.0'
                     }
                 }
-                data_agg.db.collection('riskScores').add(risk_doc)
-                
-                # 2. Update User Profile with latest risk for fast access
-                # Also reset emergency if risk is low (optional, but good for auto-recovery)
-                # For now, just update risk stats.
-                user_ref = data_agg.db.collection('users').document(request.userId)
-                user_ref.update({
+                # 1. Add to riskScores history, 2. update User Profile with
+                # latest risk for fast access (drops the cached copies)
+                await data_agg.record_risk_score(request.userId, risk_doc, {
                     'currentRiskScore': prediction.get('risk_score', 0),
                     'currentRiskLevel': prediction.get('risk_level', 'SAFE'),
                     'lastRiskAnalysis': datetime.now()
@@ -575,9 +897,8 @@ async def check_emergency(
             # UPDATE USER PROFILE (Real-time sync)
             try:
                 data_agg = app.state.data_aggregator
-                if data_agg.firebase_initialized and data_agg.db:
-                    user_ref = data_agg.db.collection('users').document(request.userId)
-                    user_ref.update({
+                if data_agg.firebase_initialized:
+                    await data_agg.flag_emergency(request.userId, {
                         'isEmergency': True,
                         'lastEmergencyTime': datetime.now(),
                         'emergencyType': emergency.get('emergency_type')
@@ -691,7 +1012,9 @@ async def enroll_face(request: EnrollFaceRequest):
         success = False
         # Enroll using first image for now
         if request.images:
-            success = intruder_detector.enroll_face(
+            success = await inference_executor.run(
+                'face',
+                intruder_detector.enroll_face,
                 user_id=request.userId,
                 name=request.name,
                 relation=request.relationship,
@@ -703,6 +1026,8 @@ async def enroll_face(request: EnrollFaceRequest):
         else:
             raise HTTPException(status_code=400, detail="Could not detect face in image")
             
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         logger.error(f"Enrollment error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -711,34 +1036,70 @@ async def enroll_face(request: EnrollFaceRequest):
 # NEW: Comprehensive Vision (Parallel)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
-@app.post("/api/vision/comprehensive-analysis", tags=["Vision"])
-async def comprehensive_vision(
-    request: VisionComprehensiveRequest,
-    background_tasks: BackgroundTasks
-):
+# Strong references to fire-and-forget tasks (the loop only keeps weak ones)
+_background_jobs: set = set()
+
+
+def _run_in_background(background_tasks: Optional[BackgroundTasks], fn, **kwargs):
     """
-    Run ALL vision analyses in parallel:
-    - Emotion
-    - Fall Detection
-    - Health State (Fainting/Sleeping)
-    - Intruder Detection
+    Defer a coroutine function until after the response is sent.
+    
+    WebSocket streams have no response to wait for, so without
+    BackgroundTasks the call is scheduled on the event loop directly.
+    """
+    if background_tasks is not None:
+        background_tasks.add_task(fn, **kwargs)
+    else:
+        task = asyncio.create_task(fn(**kwargs))
+        _background_jobs.add(task)
+        task.add_done_callback(_background_jobs.discard)
+
+
+async def _comprehensive_analysis(
+    frame: FrameContext,
+    user_id: str,
+    timestamp: datetime,
+    background_tasks: Optional[BackgroundTasks] = None,
+    camera_id: Optional[str] = None
+) -> dict:
+    """
+    Run ALL vision analyses on one decoded frame in parallel.
+    
+    Every analyzer shares the frame and its derived views, so the image
+    is decoded once per request. Frames of a static scene skip the
+    models and reuse the camera's previous analysis (motion gate).
     """
     try:
-        timestamp = datetime.fromisoformat(request.timestamp) if request.timestamp else datetime.now()
-        
-        # Run in parallel
-        # Note: vision_service methods need to be async
+        # Motion gate: unchanged scene -> heartbeat only, no inference.
+        # Camera IDs are client-chosen ("living-room"), so the user is
+        # part of the key: households never share cached analyses
+        camera = (user_id, camera_id)
+        cached, motion = await asyncio.to_thread(motion_gate.check, camera, frame)
+        if cached is not None:
+            return {
+                **cached,
+                'timestamp': timestamp.isoformat(),
+                'alerts': [],
+                'motion': motion
+            }
         
+        # Run in parallel: each analyzer dispatches its model calls to
+        # the inference executor, so these genuinely overlap
         results = await asyncio.gather(
-            vision_service.analyze_emotion_only(request.image),
-            vision_service.detect_fall_only(request.image),
-            health_state_detector.analyze_health_state(request.userId, request.image, timestamp),
-            intruder_detector.detect_intruder(request.userId, request.image, timestamp),
+            vision_service.analyze_emotion_only(frame),
+            vision_service.detect_fall_only(frame, user_id=user_id, camera_id=camera_id),
+            health_state_detector.analyze_health_state(user_id, frame, timestamp, camera_id),
+            intruder_detector.detect_intruder(user_id, frame, timestamp, camera_id),
             return_exceptions=True
         )
         
         emotion_res, fall_res, health_res, intruder_res = results
         
+        # Shed load if any model family was saturated
+        for res in results:
+            if isinstance(res, InferenceQueueFull):
+                raise res
+        
         # Handle exceptions in results
         def check_res(res, name):
             if isinstance(res, Exception):
@@ -753,13 +1114,15 @@ async def comprehensive_vision(
         
         response = {
             'timestamp': timestamp.isoformat(),
-            'user_id': request.userId,
+            'user_id': user_id,
             'emotion': emotion_res,
             'fall': fall_res,
             'health_state': health_res,
             'security': intruder_res,
-            'alerts': []
+            'alerts': [],
+            'motion': motion
         }
+        motion_gate.update(camera, frame, response)
         
         # Aggregate Alerts
         if fall_res.get('fall_detected'):
@@ -786,14 +1149,15 @@ async def comprehensive_vision(
                 'timestamp': timestamp.isoformat()
             }
             
-            # Fetch user details to get family info
+            # Fetch user details to get family info (one profile read)
             data_agg = app.state.data_aggregator
-            user_data = await data_agg.fetch_user_data(request.userId)
+            user_data = await data_agg.fetch_user_data(user_id, sources=('profile',))
             
             # Send Alert in Background
-            background_tasks.add_task(
+            _run_in_background(
+                background_tasks,
                 app.state.alert_service.send_emergency_alert,
-                elder_id=request.userId,
+                elder_id=user_id,
                 elder_name=user_data.get('elder_name', 'Elder'),
                 emergency_data=emergency_payload,
                 family_members=[fm for fm in user_data.get('family_members', [])]
@@ -802,24 +1166,198 @@ async def comprehensive_vision(
             # UPDATE USER PROFILE (Real-time sync to Frontend)
             try:
                 data_agg = app.state.data_aggregator
-                if data_agg.firebase_initialized and data_agg.db:
-                    user_ref = data_agg.db.collection('users').document(request.userId)
-                    user_ref.update({
+                if data_agg.firebase_initialized:
+                    await data_agg.flag_emergency(user_id, {
                         'isEmergency': True,
                         'lastEmergencyTime': timestamp,
                         'emergencyType': primary_alert['type']
                     })
-                    logger.info(f"🚨 Set isEmergency=True for {request.userId}")
+                    logger.info(f"🚨 Set isEmergency=True for {user_id}")
             except Exception as db_err:
                 logger.error(f"Failed to update user emergency status: {db_err}")
             
         return response
 
+    except InferenceQueueFull:
+        raise
     except Exception as e:
         logger.error(f"Comprehensive analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _parse_timestamp(value: Optional[str]) -> datetime:
+    """Parse an optional ISO timestamp, defaulting to now."""
+    if not value:
+        return datetime.now()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid timestamp: {value}")
+
+
+@app.post("/api/vision/comprehensive-analysis", tags=["Vision"], dependencies=[Depends(require_vision_models)])
+async def comprehensive_vision(
+    request: VisionComprehensiveRequest,
+    background_tasks: BackgroundTasks
+):
+    """
+    Run ALL vision analyses in parallel:
+    - Emotion
+    - Fall Detection
+    - Health State (Fainting/Sleeping)
+    - Intruder Detection
+    """
+    return await _comprehensive_analysis(
+        FrameContext.from_base64(request.image),
+        request.userId,
+        _parse_timestamp(request.timestamp),
+        background_tasks,
+        camera_id=request.cameraId
+    )
+
+
+@app.post("/api/vision/comprehensive-analysis/binary", tags=["Vision"], dependencies=[Depends(require_vision_models)])
+async def comprehensive_vision_binary(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    userId: str = Query(..., description="Elder user ID"),
+    timestamp: Optional[str] = Query(None, description="ISO capture time"),
+    cameraId: Optional[str] = Query(None, description="Camera ID within the household")
+):
+    """
+    Same as /api/vision/comprehensive-analysis, for a raw image body
+    (image/jpeg, image/png, application/octet-stream) or a multipart
+    upload with an `image` file field.
+    """
+    frame = await read_binary_frame(request)
+    return await _comprehensive_analysis(
+        frame, userId, _parse_timestamp(timestamp), background_tasks, camera_id=cameraId
+    )
+
+
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Camera Streaming (WebSocket)
+# ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+async def _camera_analysis_loop(websocket: WebSocket, session: CameraSession):
+    """Analyze the latest frame of a session and push results to the camera."""
+    while True:
+        frame = await session.next_frame()
+        try:
+            result = await _comprehensive_analysis(
+                frame, session.user_id, datetime.now(), camera_id=session.camera_id
+            )
+        except InferenceQueueFull as e:
+            # Overloaded: skip this frame, the camera keeps streaming
+            await websocket.send_json({'type': 'busy', 'family': e.family})
+            continue
+        except HTTPException as e:
+            await websocket.send_json({'type': 'error', 'detail': e.detail})
+            continue
+        
+        session.record(result)
+        # Same encoding as HTTP responses (datetimes etc.)
+        await websocket.send_json(jsonable_encoder({
+            'type': 'analysis',
+            'frame': session.frames_analyzed,
+            'result': result
+        }))
+        if result.get('alerts'):
+            await websocket.send_json(jsonable_encoder({
+                'type': 'alert',
+                'alerts': result['alerts'],
+                'timestamp': result.get('timestamp')
+            }))
+
+
+@app.websocket("/ws/camera/{user_id}")
+async def camera_stream(
+    websocket: WebSocket,
+    user_id: str,
+    fps: Optional[float] = None,
+    cameraId: Optional[str] = None
+):
+    """
+    Persistent camera stream.
+    
+    Client messages:
+    - binary: one encoded frame (JPEG/PNG)
+    - text: {"type": "frame", "image": "<base64>"} or
+            {"type": "config", "fps": 5}
+    
+    Server messages (JSON): session, analysis, alert, busy, error.
+    
+    Only the newest frame is analyzed; frames arriving faster than the
+    session FPS are dropped, never queued.
+    """
+    await websocket.accept()
+    if fps is not None and not camera_sessions.valid_fps(fps):
+        await websocket.send_json({
+            'type': 'error',
+            'detail': f"fps must be a number in (0, {camera_sessions.MAX_FPS:g}]"
+        })
+        await websocket.close(code=1008)  # Policy violation
+        return
+    
+    try:
+        await require_vision_models()
+    except ModelsNotReady as e:
+        await websocket.send_json({'type': 'error', 'detail': str(e), 'pending': e.pending})
+        await websocket.close(code=1013)  # Try again later
+        return
+    
+    session = camera_sessions.open(user_id, fps=fps, camera_id=cameraId)
+    await websocket.send_json({'type': 'session', **session.get_stats()})
+    
+    analysis = asyncio.create_task(_camera_analysis_loop(websocket, session))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            
+            if message.get('bytes'):
+                session.offer(FrameContext.from_bytes(memoryview(message['bytes'])))
+                continue
+            
+            try:
+                payload = json.loads(message.get('text') or '{}')
+            except ValueError:
+                await websocket.send_json({'type': 'error', 'detail': 'Invalid JSON message'})
+                continue
+            
+            if not isinstance(payload, dict):
+                await websocket.send_json({'type': 'error', 'detail': 'Expected a JSON object'})
+                continue
+            
+            if payload.get('type') == 'config':
+                fps = payload.get('fps')
+                if not camera_sessions.valid_fps(fps):
+                    await websocket.send_json({
+                        'type': 'error',
+                        'detail': f"fps must be a number in (0, {camera_sessions.MAX_FPS:g}]"
+                    })
+                    continue
+                session.fps = fps
+                await websocket.send_json({'type': 'session', **session.get_stats()})
+            elif isinstance(payload.get('image'), str) and payload['image']:
+                session.offer(FrameContext.from_base64(payload['image']))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        analysis.cancel()
+        camera_sessions.close(session)
+        motion_gate.forget((session.user_id, session.camera_id))
+    
+    # Surface unexpected analysis loop failures in the logs
+    try:
+        await analysis
+    except (asyncio.CancelledError, WebSocketDisconnect, RuntimeError):
+        pass
+    except Exception as e:
+        logger.error(f"Camera stream error for {user_id}: {e}")
+
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # Run Server
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -5,12 +5,26 @@ ElderNest AI - ML Models
 This package contains pre-trained and custom ML models:
 - EmotionDetector: DeepFace-based facial emotion detection
 - FallDetector: MediaPipe-based fall and posture detection
+- PoseEstimator: Shared YOLOv8 pose model with per-frame keypoint cache
+- PoseHistoryStore: Per-user posture ring buffers
+- KeypointTimelineStore: Per-user keypoint timelines (torso velocity)
+- FaceIndexStore: Persisted household face-embedding matrices
+- FaceTracker: IoU face tracks carrying identities across frames
+- onnx_backend: ONNX Runtime CPU backend for the pose and emotion models
+- ModelRegistry: Deferred (eager / background / lazy) model loading
 - ActivityAnalyzer: Activity pattern analysis
 
 These models form the core of the multi-modal risk assessment system.
 """
 
 from app.models.emotion_detector import EmotionDetector, emotion_detector
+from app.models.pose_estimator import PoseEstimator, PoseResult, pose_estimator
+from app.models.pose_history import PoseHistory, PoseHistoryStore
+from app.models.keypoint_timeline import KeypointTimeline, KeypointTimelineStore, keypoint_timelines
+from app.models.face_index import FaceIndexStore, HouseholdFaceIndex
+from app.models.face_tracker import FaceTracker
+from app.models.onnx_backend import OnnxEmotionClassifier, OnnxPoseModel
+from app.models.model_registry import ModelRegistry, ModelsNotReady, model_registry
 from app.models.fall_detector import FallDetector, fall_detector
 from app.models.activity_analyzer import ActivityAnalyzer, activity_analyzer
 
@@ -19,6 +33,22 @@ __all__ = [
     'emotion_detector',
     'FallDetector', 
     'fall_detector',
+    'PoseEstimator',
+    'PoseResult',
+    'pose_estimator',
+    'PoseHistory',
+    'PoseHistoryStore',
+    'KeypointTimeline',
+    'KeypointTimelineStore',
+    'keypoint_timelines',
+    'FaceIndexStore',
+    'HouseholdFaceIndex',
+    'FaceTracker',
+    'OnnxPoseModel',
+    'OnnxEmotionClassifier',
+    'ModelRegistry',
+    'ModelsNotReady',
+    'model_registry',
     'ActivityAnalyzer',
     'activity_analyzer'
 ]
@@ -14,25 +14,52 @@ Also provides:
 - Emotion trend analysis
 
 Pre-trained on FER2013 dataset (35,887 faces)
+
+Face detection runs per request, but the emotion classifier runs on
+batches: face crops from concurrent requests are stacked into one
+tensor and classified in a single forward pass.
+
+With FACE_ROI_FROM_POSE enabled, the face is cropped from the shared
+YOLO pose keypoints instead of running a full-frame face detector.
+
+With INFERENCE_TOPOLOGY=workers the API process batches whole frames
+(plus their pose face boxes) instead of face crops, and each batch is
+analyzed in one worker call: a worker runs one task at a time, so
+batching there would only add the window wait.
+
+Image quality is checked first: brightness on a downscaled grayscale
+view, blur on a full-resolution center crop; dark, blown-out or blurry
+frames skip the emotion model entirely.
+
+With INFERENCE_BACKEND=onnx the classifier runs on ONNX Runtime
+(optionally INT8-quantized); faces are then found with OpenCV's Haar
+cascade (DeepFace's 'opencv' detector) when DeepFace is not installed.
 """
 
+import os
+import threading
 import numpy as np
 import cv2
-import base64
-import io
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime
-from PIL import Image
 from loguru import logger
 
-# DeepFace import with fallback
-try:
-    from deepface import DeepFace
-    DEEPFACE_AVAILABLE = True
-except ImportError:
-    DEEPFACE_AVAILABLE = False
+from app.models.model_registry import model_registry
+from app.models.onnx_backend import OnnxEmotionClassifier, export_emotion_model, resolve_model, use_onnx
+from app.models.pose_estimator import pose_estimator
+from app.utils.frame_context import FrameContext
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.model_loader import lazy_import
+
+# DeepFace (TensorFlow) is imported on first model load, not at startup
+DeepFace = lazy_import('deepface.DeepFace')
+DEEPFACE_AVAILABLE = DeepFace is not None
+if not DEEPFACE_AVAILABLE:
     logger.warning("DeepFace not available. Using mock emotion detection.")
 
+# DeepFace face extraction helpers (layout differs between releases)
+deepface_functions = lazy_import('deepface.commons.functions') if DEEPFACE_AVAILABLE else None
+
 
 class EmotionDetector:
     """
@@ -60,16 +87,81 @@ class EmotionDetector:
     # Pain indicators (combinations suggest pain)
     PAIN_INDICATORS = ['fear', 'angry', 'sad', 'disgust']
     
+    # Output order of DeepFace's FER2013 emotion classifier
+    EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+    
+    # Classifier input size (grayscale)
+    FACE_SIZE = 48
+    
+    # Quality pre-gate: brightness is read from a view at most this
+    # wide/high, blur from a native-resolution center crop of this size
+    # (downscaling sharpens blur away, so the blur thresholds only hold
+    # at native pixel scale)
+    QUALITY_MAX_SIDE = 320
+    MIN_RESOLUTION = 100
+    MIN_BRIGHTNESS = 40
+    MAX_BRIGHTNESS = 220
+    BLUR_POOR = 100         # Laplacian variance below this is blurry
+    BLUR_ACCEPTABLE = 300
+    
     def __init__(self):
         """Initialize EmotionDetector with DeepFace."""
-        self.is_available = DEEPFACE_AVAILABLE
+        self.backend = 'onnx' if use_onnx() else 'native'
+        self.is_available = DEEPFACE_AVAILABLE or self.backend == 'onnx'
         
-        if self.is_available:
-            logger.info("✅ EmotionDetector initialized with DeepFace")
-            # Warm up the model with a dummy image
-            self._warmup()
-        else:
-            logger.warning("⚠️ EmotionDetector running in mock mode (DeepFace not installed)")
+        # Keras (or ONNX) emotion classifier used by the batched path
+        # (None falls back to per-image DeepFace.analyze)
+        self._emotion_model = None
+        self._face_cascade = None
+        self._batcher = MicroBatcher(
+            name='emotion',
+            batch_fn=self._classify_faces,
+            max_batch_size=int(os.getenv('EMOTION_BATCH_MAX_SIZE', 8)),
+            window_ms=float(os.getenv('EMOTION_BATCH_WINDOW_MS', 10))
+        )
+        # Worker topology: (frame, pose face box) pairs, one worker call per batch
+        self._remote_batcher = MicroBatcher(
+            name='emotion-remote',
+            batch_fn=self._analyze_remote_batch,
+            max_batch_size=self._batcher.max_batch_size,
+            window_ms=self._batcher.window * 1000
+        )
+        
+        # Skip the emotion model on frames too poor to analyze
+        self.quality_gate = os.getenv('EMOTION_QUALITY_GATE', 'true').lower() == 'true'
+        
+        # Crop faces from cached pose keypoints instead of detecting them
+        self.face_roi_from_pose = os.getenv('FACE_ROI_FROM_POSE', 'false').lower() == 'true'
+        self.pose_estimator = pose_estimator
+        
+        # Set to the InferenceWorkers pool when inference runs out of process
+        self.remote = None
+        # True while the models are left to inference worker processes
+        self.deferred = False
+        
+        # Models load on first use (or via the model registry)
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    def load(self):
+        """Load and warm up the models (once; later calls return at once)."""
+        with self._load_lock:
+            if self._loaded:
+                return
+            
+            self.deferred = os.getenv('INFERENCE_TOPOLOGY', 'inprocess').lower() == 'workers'
+            if self.is_available and self.deferred:
+                logger.info("EmotionDetector: models are loaded by inference worker processes")
+            elif self.backend == 'onnx':
+                self._load_onnx()
+            elif self.is_available:
+                logger.info("✅ EmotionDetector initialized with DeepFace")
+                # Warm up the model with a dummy image
+                self._warmup()
+            else:
+                logger.warning("⚠️ EmotionDetector running in mock mode (DeepFace not installed)")
+            
+            self._loaded = True
     
     def _warmup(self):
         """Warm up DeepFace model with a dummy image."""
@@ -88,17 +180,47 @@ class EmotionDetector:
             logger.info("🔥 DeepFace models warmed up")
         except Exception as e:
             logger.warning(f"Warmup failed (non-critical): {e}")
+        
+        if deepface_functions is None:
+            logger.warning("DeepFace face extraction unavailable; emotion batching disabled")
+            return
+        
+        try:
+            # Same classifier DeepFace.analyze uses, called directly on batches
+            self._emotion_model = DeepFace.build_model('Emotion')
+            logger.info("✅ Batched emotion classifier ready")
+        except Exception as e:
+            logger.warning(f"Emotion batching disabled (non-critical): {e}")
+    
+    def _load_onnx(self):
+        """Load the ONNX classifier (exporting it first if needed), else fall back."""
+        try:
+            path = resolve_model('emotion', export_emotion_model if DEEPFACE_AVAILABLE else None)
+            if path is None:
+                raise FileNotFoundError("no exported model and DeepFace is not installed")
+            self._emotion_model = OnnxEmotionClassifier(path)
+            self._emotion_model.predict(
+                np.zeros((1, self.FACE_SIZE, self.FACE_SIZE, 1), dtype=np.float32)
+            )
+            logger.info(f"✅ EmotionDetector initialized with ONNX Runtime ({os.path.basename(path)})")
+        except Exception as e:
+            logger.error(f"EmotionDetector: ONNX backend unavailable ({e}); using DeepFace")
+            self.backend = 'native'
+            self._emotion_model = None
+            self.is_available = DEEPFACE_AVAILABLE
+            if self.is_available:
+                self._warmup()
     
     def analyze_emotion(
         self,
-        image_base64: str,
+        image: Union[str, FrameContext],
         detect_face_quality: bool = True
     ) -> Dict:
         """
-        Analyze facial emotion from base64-encoded image.
+        Analyze facial emotion from a camera frame.
         
         Args:
-            image_base64: Base64-encoded image string
+            image: Base64-encoded image string or shared FrameContext
             detect_face_quality: Whether to assess image quality
             
         Returns:
@@ -116,99 +238,268 @@ class EmotionDetector:
             }
         """
         try:
-            # Decode base64 image
-            image_array = self._decode_image(image_base64)
-            
-            if image_array is None:
+            # Decode once (shared with other analyzers of the same frame)
+            frame = FrameContext.ensure(image)
+            if frame.try_decode() is None:
                 return self._no_face_detected(error="Failed to decode image")
             
-            # Use mock if DeepFace not available
-            if not self.is_available:
-                return self._mock_analysis(image_array)
+            # Cheap quality pre-gate before any model runs
+            image_quality = 'unknown'
+            if detect_face_quality:
+                image_quality = self._assess_image_quality(frame)
+                if image_quality == 'poor' and self.quality_gate:
+                    return self._poor_quality_result()
             
-            # Run DeepFace analysis
-            result = DeepFace.analyze(
-                image_array,
-                actions=['emotion'],
-                enforce_detection=False,
-                detector_backend='opencv',
-                silent=True
-            )
+            if not self._loaded:
+                self.load()
             
-            # Handle list or dict response
-            if isinstance(result, list):
-                if len(result) == 0:
-                    return self._no_face_detected()
-                result = result[0]
+            # Out-of-process topology: frames are batched here, the
+            # worker runs the models (pose face boxes come from this
+            # process's pose memo)
+            if self.remote is not None:
+                result = self._remote_batcher.submit((frame, self._pose_face_box(frame)))
+                result['image_quality'] = image_quality
+                return result
+            if self.deferred:
+                raise RuntimeError("INFERENCE_TOPOLOGY=workers but the inference workers are not running")
             
-            # Extract emotion data
-            emotions = result.get('emotion', {})
-            dominant_emotion = result.get('dominant_emotion', 'neutral')
+            # Use mock if DeepFace not available
+            if not self.is_available:
+                return self._mock_analysis(frame, image_quality)
             
-            if not emotions:
+            # Run the emotion classifier (batched across requests)
+            prediction = self._predict_emotions(frame, self._pose_face_box(frame))
+            if prediction is None:
                 return self._no_face_detected()
             
-            confidence = emotions.get(dominant_emotion, 0) / 100.0
-            
-            # Calculate emotion score (-1 to 1)
-            emotion_score = self.EMOTION_SCORES.get(dominant_emotion, 0.0)
-            
-            # Detect pain/distress
-            pain_detected = self._detect_pain(emotions)
-            distress_level = self._calculate_distress_level(emotions)
-            
-            # Check image quality
-            image_quality = 'unknown'
-            if detect_face_quality:
-                image_quality = self._assess_image_quality(image_array)
-            
-            return {
-                'emotion': dominant_emotion,
-                'confidence': round(confidence, 3),
-                'emotion_score': round(emotion_score, 3),
-                'all_emotions': {k: round(v / 100, 3) for k, v in emotions.items()},
-                'pain_detected': pain_detected,
-                'distress_level': distress_level,
-                'face_detected': True,
-                'image_quality': image_quality,
-                'timestamp': datetime.now().isoformat()
-            }
+            return self._emotion_result(*prediction, image_quality)
             
         except Exception as e:
             logger.error(f"Emotion detection error: {str(e)}")
             return self._no_face_detected(error=str(e))
     
-    def _decode_image(self, image_base64: str) -> Optional[np.ndarray]:
+    def analyze_faces(
+        self,
+        frames: List[FrameContext],
+        boxes: List[Optional[Tuple[int, int, int, int]]]
+    ) -> List[Dict]:
         """
-        Decode base64 image to numpy array.
+        Emotion analysis of several decoded frames at once (blocking).
+        
+        Used by inference worker processes: every face of the batch goes
+        through one classifier call, without the micro-batcher. Quality
+        gating is left to the caller.
         
         Args:
-            image_base64: Base64-encoded image string
+            frames: Decoded camera frames
+            boxes: Pose face box per frame (None: detect the face)
             
         Returns:
-            RGB numpy array or None if decoding fails
+            One analysis dict per frame
         """
-        try:
-            # Remove data URI prefix if present
-            if ',' in image_base64:
-                image_base64 = image_base64.split(',')[1]
-            
-            # Decode base64
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
-            image_array = np.array(image)
-            
-            # Convert to RGB if needed
-            if len(image_array.shape) == 2:  # Grayscale
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_GRAY2RGB)
-            elif image_array.shape[2] == 4:  # RGBA
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2RGB)
-            
-            return image_array
+        if not self._loaded:
+            self.load()
+        if not self.is_available:
+            return [self._mock_analysis(frame, 'unknown') for frame in frames]
+        
+        if self._emotion_model is None:
+            predictions = [self._predict_emotions(frame, box) for frame, box in zip(frames, boxes)]
+        else:
+            faces = [self._face_crop(frame, box) for frame, box in zip(frames, boxes)]
+            present = [face for face in faces if face is not None]
+            scores = iter(self._classify_faces(present) if present else [])
+            predictions = []
+            for face in faces:
+                emotions = next(scores) if face is not None else None
+                predictions.append((emotions, max(emotions, key=emotions.get)) if emotions else None)
+        
+        return [
+            self._emotion_result(*prediction, 'unknown') if prediction is not None
+            else self._no_face_detected()
+            for prediction in predictions
+        ]
+    
+    def _analyze_remote_batch(self, items: List[Tuple[FrameContext, Optional[Tuple[int, int, int, int]]]]) -> List[Dict]:
+        """Send a batch of (frame, pose face box) to an inference worker."""
+        return self.remote.analyze_emotion_batch([frame for frame, _ in items], [box for _, box in items])
+    
+    def _emotion_result(self, emotions: Dict[str, float], dominant_emotion: str, image_quality: str) -> Dict:
+        """Analysis dict from emotion scores (0-100)."""
+        confidence = emotions.get(dominant_emotion, 0) / 100.0
+        
+        # Calculate emotion score (-1 to 1)
+        emotion_score = self.EMOTION_SCORES.get(dominant_emotion, 0.0)
+        
+        # Detect pain/distress
+        pain_detected = self._detect_pain(emotions)
+        distress_level = self._calculate_distress_level(emotions)
+        
+        return {
+            'emotion': dominant_emotion,
+            'confidence': round(confidence, 3),
+            'emotion_score': round(emotion_score, 3),
+            'all_emotions': {k: round(v / 100, 3) for k, v in emotions.items()},
+            'pain_detected': pain_detected,
+            'distress_level': distress_level,
+            'face_detected': True,
+            'image_quality': image_quality,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _face_crop(
+        self,
+        frame: FrameContext,
+        box: Optional[Tuple[int, int, int, int]]
+    ) -> Optional[np.ndarray]:
+        """Classifier input for a frame's face: the pose box crop, else the detected face."""
+        if box is not None:
+            x1, y1, x2, y2 = box
+            return self._prepare_face(frame.gray[y1:y2, x1:x2])
+        return self._extract_face(frame.rgb)
+    
+    def _predict_emotions(
+        self,
+        frame: FrameContext,
+        box: Optional[Tuple[int, int, int, int]] = None
+    ) -> Optional[Tuple[Dict[str, float], str]]:
+        """
+        Get emotion scores (0-100) and the dominant emotion for one frame.
+        
+        Uses the batched classifier when available, otherwise a
+        per-image DeepFace.analyze call. With a pose face box the face
+        crop comes from pose keypoints and face detection is skipped.
+        
+        Args:
+            frame: Decoded camera frame
+            box: Pose face box (see _pose_face_box), or None
             
+        Returns:
+            (emotions, dominant_emotion), or None if no face was found
+        """
+        if self._emotion_model is not None:
+            face = self._face_crop(frame, box)
+            if face is None:
+                return None
+            emotions = self._batcher.submit(face)
+            return emotions, max(emotions, key=emotions.get)
+        
+        if box is not None:
+            x1, y1, x2, y2 = box
+            image_array = frame.rgb[y1:y2, x1:x2]
+            detector_backend = 'skip'
+        else:
+            image_array = frame.rgb
+            detector_backend = 'opencv'
+        
+        result = DeepFace.analyze(
+            image_array,
+            actions=['emotion'],
+            enforce_detection=False,
+            detector_backend=detector_backend,
+            silent=True
+        )
+        
+        # Handle list or dict response
+        if isinstance(result, list):
+            if len(result) == 0:
+                return None
+            result = result[0]
+        
+        emotions = result.get('emotion', {})
+        if not emotions:
+            return None
+        return emotions, result.get('dominant_emotion', 'neutral')
+    
+    def _pose_face_box(self, frame: FrameContext) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Primary face box from pose keypoints, if pose-ROI mode is on.
+        
+        Returns None (use the face detector) when the mode is off or
+        the head keypoints are not visible.
+        """
+        if not self.face_roi_from_pose:
+            return None
+        try:
+            boxes = self.pose_estimator.face_boxes(frame)
         except Exception as e:
-            logger.error(f"Image decode error: {e}")
+            logger.debug(f"Pose face ROI unavailable: {e}")
+            return None
+        return boxes[0] if boxes else None
+    
+    def _prepare_face(self, gray_face: np.ndarray) -> np.ndarray:
+        """Scale a uint8 grayscale face crop to classifier input (48x48, 0-1)."""
+        face = cv2.resize(gray_face, (self.FACE_SIZE, self.FACE_SIZE), interpolation=cv2.INTER_AREA)
+        return face.astype(np.float32) / 255.0
+    
+    def _extract_face(self, image_array: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Detect the first face and prepare it for the classifier.
+        
+        Mirrors DeepFace.analyze preprocessing: opencv detection,
+        alignment, grayscale and a 48x48 resize. Without DeepFace
+        (ONNX backend), the same Haar cascade runs directly.
+        
+        Returns:
+            (48, 48) float32 face crop, or None if no face was found
+        """
+        if deepface_functions is None:
+            return self._detect_face_cascade(cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY))
+        
+        faces = deepface_functions.extract_faces(
+            img=image_array,
+            target_size=(224, 224),
+            detector_backend='opencv',
+            grayscale=False,
+            enforce_detection=False,
+            align=True
+        )
+        if not faces:
+            return None
+        
+        face = faces[0][0]
+        if face.shape[0] == 0 or face.shape[1] == 0:
+            return None
+        
+        gray = cv2.cvtColor(face[0], cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (self.FACE_SIZE, self.FACE_SIZE)).astype(np.float32, copy=False)
+    
+    def _detect_face_cascade(self, gray: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Find the largest face with OpenCV's Haar cascade (no DeepFace needed).
+        
+        Returns:
+            (48, 48) float32 face crop, or None if no face was found
+        """
+        if self._face_cascade is None:
+            self._face_cascade = cv2.CascadeClassifier(
+                os.path.join(cv2.data.haarcascades, 'haarcascade_frontalface_default.xml')
+            )
+        
+        faces = self._face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=10)
+        if len(faces) == 0:
             return None
+        
+        x, y, w, h = max(faces, key=lambda box: box[2] * box[3])
+        return self._prepare_face(gray[y:y + h, x:x + w])
+    
+    def _classify_faces(self, faces: List[np.ndarray]) -> List[Dict[str, float]]:
+        """
+        Classify a batch of face crops in one forward pass.
+        
+        Args:
+            faces: List of (48, 48) float32 face crops
+            
+        Returns:
+            Emotion scores (0-100, summing to 100) for each face
+        """
+        batch = np.stack(faces)[..., np.newaxis]
+        predictions = self._emotion_model.predict(batch, verbose=0)
+        predictions = predictions / predictions.sum(axis=1, keepdims=True) * 100
+        
+        return [
+            {label: float(row[i]) for i, label in enumerate(self.EMOTION_LABELS)}
+            for row in predictions
+        ]
     
     def _detect_pain(self, emotions: Dict[str, float]) -> bool:
         """
@@ -255,7 +546,7 @@ class EmotionDetector:
         else:
             return 'low'
     
-    def _assess_image_quality(self, image_array: np.ndarray) -> str:
+    def _assess_image_quality(self, frame: FrameContext) -> str:
         """
         Assess image quality for reliable emotion detection.
         
@@ -264,35 +555,49 @@ class EmotionDetector:
         - Brightness
         - Blur level
         
+        Brightness is measured on a downscaled grayscale view (cached on
+        the frame) and blur on a bounded full-resolution center crop, so
+        this is cheap enough to run before the emotion model.
+        
         Args:
-            image_array: RGB numpy array
+            frame: Decoded camera frame
             
         Returns:
             Quality string: 'poor', 'acceptable', 'good'
         """
         # Check resolution
-        height, width = image_array.shape[:2]
-        if width < 100 or height < 100:
+        height, width = frame.shape[:2]
+        if width < self.MIN_RESOLUTION or height < self.MIN_RESOLUTION:
             return 'poor'
         
-        # Convert to grayscale for quality checks
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
-        
         # Check brightness
-        brightness = np.mean(gray)
-        if brightness < 40 or brightness > 220:
+        brightness = frame.downscaled(self.QUALITY_MAX_SIDE, gray=True).mean()
+        if brightness < self.MIN_BRIGHTNESS or brightness > self.MAX_BRIGHTNESS:
             return 'poor'  # Too dark or too bright
         
         # Check blur using Laplacian variance
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        laplacian_var = cv2.Laplacian(self._center_crop(frame.gray), cv2.CV_64F).var()
         
-        if laplacian_var < 100:
+        if laplacian_var < self.BLUR_POOR:
             return 'poor'  # Blurry
-        elif laplacian_var < 300:
+        elif laplacian_var < self.BLUR_ACCEPTABLE:
             return 'acceptable'
         else:
             return 'good'
     
+    def _center_crop(self, gray: np.ndarray) -> np.ndarray:
+        """Central region of at most QUALITY_MAX_SIDE pixels per side, unscaled."""
+        height, width = gray.shape[:2]
+        top = max(0, (height - self.QUALITY_MAX_SIDE) // 2)
+        left = max(0, (width - self.QUALITY_MAX_SIDE) // 2)
+        return gray[top:top + self.QUALITY_MAX_SIDE, left:left + self.QUALITY_MAX_SIDE]
+    
+    def _poor_quality_result(self) -> Dict:
+        """Response for frames rejected by the quality pre-gate."""
+        result = self._no_face_detected(error='Image quality too poor for emotion detection')
+        result['image_quality'] = 'poor'
+        return result
+    
     def _no_face_detected(self, error: Optional[str] = None) -> Dict:
         """
         Return default response when no face is detected.
@@ -316,20 +621,21 @@ class EmotionDetector:
             'timestamp': datetime.now().isoformat()
         }
     
-    def _mock_analysis(self, image_array: np.ndarray) -> Dict:
+    def _mock_analysis(self, frame: FrameContext, image_quality: Optional[str] = None) -> Dict:
         """
         Provide mock emotion analysis when DeepFace is not available.
         
         Uses basic image statistics to generate plausible mock data.
         
         Args:
-            image_array: RGB numpy array
+            frame: Decoded camera frame
+            image_quality: Quality already assessed by the pre-gate
             
         Returns:
             Mock emotion analysis dict
         """
         # Use image brightness to influence mock emotion
-        gray = cv2.cvtColor(image_array, cv2.COLOR_RGB2GRAY)
+        gray = frame.gray
         brightness = np.mean(gray) / 255.0
         
         # Brighter images -> happier mock emotions
@@ -359,11 +665,24 @@ class EmotionDetector:
             'pain_detected': False,
             'distress_level': 'low',
             'face_detected': True,
-            'image_quality': self._assess_image_quality(image_array),
+            'image_quality': image_quality or self._assess_image_quality(frame),
             'mock': True,
             'timestamp': datetime.now().isoformat()
         }
     
+    def get_stats(self) -> Dict:
+        """Get emotion batching counters."""
+        return {
+            'backend': self.backend,
+            'batched_classifier': self._emotion_model is not None,
+            'batching': (self._remote_batcher if self.remote is not None else self._batcher).get_stats()
+        }
+    
+    def shutdown(self):
+        """Stop the batching threads."""
+        self._batcher.shutdown()
+        self._remote_batcher.shutdown()
+    
     def analyze_emotion_trend(
         self,
         emotion_history: List[float]
@@ -421,3 +740,4 @@ class EmotionDetector:
 
 # Create global instance for import
 emotion_detector = EmotionDetector()
+model_registry.register('emotion', emotion_detector.load)
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Household Face Index
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Known-face embeddings per household, for intruder detection.
+
+Each household's enrolled faces are one (K, D) float32 matrix of
+L2-normalized embeddings, so matching every face in a frame is a single
+matrix multiply plus argmax: cosine similarity without per-person
+Python loops or repeated norms.
+
+Indexes persist to FACE_INDEX_DIR as `.npy` (embeddings, memory-mapped
+on load) plus a small `.json` sidecar (names, relationships), so
+enrolments survive restarts. Files are replaced atomically.
+
+EmbeddingCache keeps face embeddings of enrolment photos keyed by
+content hash (plus each photo URL's ETag), so re-syncing a household
+only embeds photos that are new or changed.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from loguru import logger
+
+
+# Default location of persisted indexes
+DEFAULT_INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'data', 'face_index'
+)
+
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """(N, D) float32 rows scaled to unit length."""
+    matrix = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class HouseholdFaceIndex:
+    """
+    Known faces of one household as a normalized embedding matrix.
+
+    Writers swap in a new matrix (copy-on-write), so matching never
+    takes the lock.
+    """
+
+    def __init__(
+        self,
+        matrix: Optional[np.ndarray] = None,
+        people: Optional[List[Dict]] = None,
+        path: Optional[str] = None
+    ):
+        """
+        Initialize HouseholdFaceIndex.
+
+        Args:
+            matrix: (K, D) normalized embeddings (may be memory-mapped)
+            people: K metadata dicts (person_id, name, relationship, source)
+            path: File stem to persist to (None: memory only)
+        """
+        # (matrix, people) swapped as one reference
+        self._snapshot = (
+            matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32),
+            people or []
+        )
+        self.path = path
+        self._lock = threading.Lock()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """(K, D) normalized embeddings."""
+        return self._snapshot[0]
+
+    @property
+    def people(self) -> List[Dict]:
+        """Metadata of the K enrolled people, in matrix row order."""
+        return self._snapshot[1]
+
+    def __len__(self) -> int:
+        return len(self.people)
+
+    def entries(self, source: str) -> List[Dict]:
+        """`source`'s enrolments as replace() entries (person_id, embedding, name, relationship)."""
+        matrix, people = self._snapshot
+        return [
+            {
+                'person_id': person['person_id'],
+                'embedding': np.array(matrix[i]),
+                'name': person['name'],
+                'relationship': person['relationship']
+            }
+            for i, person in enumerate(people) if person.get('source') == source
+        ]
+
+    def add(
+        self,
+        embedding,
+        name: str,
+        relationship: str,
+        source: str = 'api',
+        person_id: Optional[str] = None
+    ) -> str:
+        """
+        Enroll one face.
+
+        Args:
+            embedding: Face embedding (D,)
+            name: Person's name
+            relationship: Relation to the elder (family, caregiver...)
+            source: Who enrolled it ('api', 'profile')
+            person_id: Stable ID (default: new UUID)
+
+        Returns:
+            The person ID
+        """
+        row = normalize_embeddings(embedding)
+        person = {
+            'person_id': person_id or str(uuid.uuid4()),
+            'name': name,
+            'relationship': relationship,
+            'source': source
+        }
+
+        with self._lock:
+            if len(self.people) and self.matrix.shape[1] != row.shape[1]:
+                logger.warning(
+                    f"Face embedding size changed ({self.matrix.shape[1]} -> {row.shape[1]}); "
+                    f"dropping {len(self.people)} stale enrolment(s)"
+                )
+                self._snapshot = (row[:0], [])
+
+            matrix = np.concatenate([self.matrix, row]) if len(self.people) else row
+            self._swap(matrix, self.people + [person])
+        return person['person_id']
+
+    def remove(self, source: Optional[str] = None) -> int:
+        """Drop every enrolment from `source` (all if None); returns how many."""
+        with self._lock:
+            keep = [
+                i for i, person in enumerate(self.people)
+                if source is not None and person.get('source') != source
+            ]
+            removed = len(self.people) - len(keep)
+            if removed:
+                self._swap(np.ascontiguousarray(self.matrix[keep]), [self.people[i] for i in keep])
+            return removed
+
+    def replace(self, source: str, entries: List[Dict]) -> bool:
+        """
+        Make `source`'s enrolments exactly `entries`.
+
+        Args:
+            source: Enrolment source to replace (e.g. 'profile')
+            entries: Dicts with person_id, embedding, name, relationship
+
+        Returns:
+            False (nothing written) if the enrolments were unchanged
+        """
+        wanted = [(e['person_id'], e['name'], e['relationship']) for e in entries]
+
+        with self._lock:
+            current = [
+                (p['person_id'], p['name'], p['relationship'])
+                for p in self.people if p.get('source') == source
+            ]
+            if current == wanted:
+                return False
+
+            keep = [i for i, person in enumerate(self.people) if person.get('source') != source]
+            kept_matrix = np.ascontiguousarray(self.matrix[keep])
+            kept_people = [self.people[i] for i in keep]
+
+            if not entries:
+                self._swap(kept_matrix, kept_people)
+                return True
+
+            rows = normalize_embeddings([entry['embedding'] for entry in entries])
+            if kept_people and kept_matrix.shape[1] != rows.shape[1]:
+                logger.warning(
+                    f"Face embedding size changed ({kept_matrix.shape[1]} -> {rows.shape[1]}); "
+                    f"dropping {len(kept_people)} stale enrolment(s)"
+                )
+                kept_people = []
+
+            self._swap(
+                np.concatenate([kept_matrix, rows]) if kept_people else rows,
+                kept_people + [
+                    {
+                        'person_id': entry['person_id'],
+                        'name': entry['name'],
+                        'relationship': entry['relationship'],
+                        'source': source
+                    }
+                    for entry in entries
+                ]
+            )
+            return True
+
+    def match(self, embeddings, threshold: float) -> List[Optional[Dict]]:
+        """
+        Match faces against the household in one matrix multiply.
+
+        Args:
+            embeddings: (F, D) face embeddings from one frame
+            threshold: Largest cosine distance that counts as a match
+
+        Returns:
+            For each face, the best-matching person's metadata (with
+            'distance') or None
+        """
+        matrix, people = self._snapshot
+        if len(embeddings) == 0:
+            return []
+        queries = normalize_embeddings(embeddings)
+        if not people or len(queries) == 0:
+            return [None] * len(queries)
+        if queries.shape[1] != matrix.shape[1]:
+            logger.warning(f"Face embedding size {queries.shape[1]} != index size {matrix.shape[1]}")
+            return [None] * len(queries)
+
+        # (F, K) cosine similarities -> best person per face
+        similarity = queries @ matrix.T
+        best = similarity.argmax(axis=1)
+        distance = 1.0 - similarity[np.arange(len(queries)), best]
+
+        return [
+            {**people[index], 'distance': round(float(dist), 4)} if dist < threshold else None
+            for index, dist in zip(best, distance)
+        ]
+
+    def _swap(self, matrix: np.ndarray, people: List[Dict]):
+        """Install new contents and persist them (caller holds the lock)."""
+        self._snapshot = (matrix, people)
+        if self.path is not None:
+            self._save()
+
+    def _save(self):
+        """Write `.npy` then `.json`, each atomically."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        with open(self.path + '.npy.tmp', 'wb') as f:
+            np.save(f, np.asarray(self.matrix, dtype=np.float32))
+        os.replace(self.path + '.npy.tmp', self.path + '.npy')
+
+        with open(self.path + '.json.tmp', 'w') as f:
+            json.dump(self.people, f)
+        os.replace(self.path + '.json.tmp', self.path + '.json')
+
+    @classmethod
+    def load(cls, path: str) -> 'HouseholdFaceIndex':
+        """Load a persisted index (embeddings memory-mapped), or an empty one."""
+        try:
+            with open(path + '.json') as f:
+                people = json.load(f)
+            matrix = np.load(path + '.npy', mmap_mode='r')
+        except FileNotFoundError:
+            return cls(path=path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Unreadable face index {path}: {e}")
+            return cls(path=path)
+
+        if matrix.ndim != 2 or len(matrix) != len(people):
+            logger.error(f"Face index {path} is inconsistent; starting empty")
+            return cls(path=path)
+        return cls(matrix, people, path)
+
+
+class EmbeddingCache:
+    """
+    Face embeddings of enrolment photos, keyed by photo content hash.
+
+    Embeddings are kept as `<key>.npy` files (plus a bounded in-memory
+    copy); a photo without a detectable face is cached as an empty
+    array so it is not retried. Each photo URL's ETag / Last-Modified
+    and content hash are remembered in `validators.json`, so unchanged
+    photos are not even downloaded again.
+    """
+
+    def __init__(self, directory: str, max_memory_entries: int = 4096):
+        """
+        Initialize EmbeddingCache.
+
+        Args:
+            directory: Persistence directory
+            max_memory_entries: Embeddings kept in memory
+        """
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+
+        self._embeddings: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+        self._validators: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content: bytes, model_name: str) -> str:
+        """Cache key: embedding model plus SHA-256 of the photo bytes."""
+        return f"{model_name}-{hashlib.sha256(content).hexdigest()}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npy')
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Cached embedding for a photo.
+
+        Returns:
+            The embedding, an empty array if the photo has no face, or
+            None if the photo was never embedded
+        """
+        with self._lock:
+            embedding = self._embeddings.get(key)
+            if embedding is not None:
+                self._embeddings.move_to_end(key)
+                return embedding
+
+        try:
+            embedding = np.load(self._path(key))
+        except (OSError, ValueError):
+            return None
+        self._remember(key, embedding)
+        return embedding
+
+    def put(self, key: str, embedding: Optional[np.ndarray]):
+        """Store a photo's embedding (None: the photo has no face)."""
+        embedding = (
+            np.asarray(embedding, dtype=np.float32) if embedding is not None
+            else np.zeros(0, dtype=np.float32)
+        )
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(key) + '.tmp', 'wb') as f:
+            np.save(f, embedding)
+        os.replace(self._path(key) + '.tmp', self._path(key))
+        self._remember(key, embedding)
+
+    def _remember(self, key: str, embedding: np.ndarray):
+        with self._lock:
+            self._embeddings[key] = embedding
+            self._embeddings.move_to_end(key)
+            while len(self._embeddings) > self.max_memory_entries:
+                self._embeddings.popitem(last=False)
+
+    def _load_validators(self) -> Dict[str, Dict]:
+        """URL validators, read from disk once (caller holds the lock)."""
+        if self._validators is None:
+            try:
+                with open(os.path.join(self.directory, 'validators.json')) as f:
+                    self._validators = json.load(f)
+            except (OSError, ValueError):
+                self._validators = {}
+        return self._validators
+
+    def validator(self, url: str) -> Optional[Dict]:
+        """Last seen ETag / Last-Modified and content key of a photo URL."""
+        with self._lock:
+            return self._load_validators().get(url)
+
+    def set_validator(
+        self,
+        url: str,
+        key: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        """Remember a photo URL's validators and content key."""
+        entry = {'key': key, 'etag': etag, 'last_modified': last_modified}
+        with self._lock:
+            validators = self._load_validators()
+            if validators.get(url) == entry:
+                return
+            validators[url] = entry
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, 'validators.json')
+            with open(path + '.tmp', 'w') as f:
+                json.dump(validators, f)
+            os.replace(path + '.tmp', path)
+
+
+class FaceIndexStore:
+    """
+    Household face indexes, loaded from disk on first use.
+
+    Configuration (environment):
+    - FACE_INDEX_DIR: where household indexes are persisted
+    - FACE_INDEX_MAX_HOUSEHOLDS: indexes kept open before closing the least recent
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_households: Optional[int] = None):
+        """
+        Initialize FaceIndexStore.
+
+        Args:
+            directory: Persistence directory
+            max_households: Open indexes kept in memory
+        """
+        self.directory = directory or os.getenv('FACE_INDEX_DIR', DEFAULT_INDEX_DIR)
+        self.max_households = max_households or int(os.getenv('FACE_INDEX_MAX_HOUSEHOLDS', 1000))
+
+        self._indexes: 'OrderedDict[str, HouseholdFaceIndex]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, user_id: str) -> str:
+        """File stem for a household (hashed: user IDs are not path-safe)."""
+        return os.path.join(self.directory, hashlib.sha1(user_id.encode()).hexdigest())
+
+    def get(self, user_id: str) -> HouseholdFaceIndex:
+        """A household's index (loaded from disk, or empty)."""
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        # Disk I/O outside the store lock; first loader wins
+        loaded = HouseholdFaceIndex.load(self._path(user_id))
+        with self._lock:
+            index = self._indexes.setdefault(user_id, loaded)
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_households:
+                self._indexes.popitem(last=False)
+            return index
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+
+__all__ = [
+    'normalize_embeddings',
+    'HouseholdFaceIndex',
+    'EmbeddingCache',
+    'FaceIndexStore'
+]
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Face Tracker
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Lightweight IoU tracker that carries face identities across frames.
+
+Face embedding (Facenet) is the expensive part of intruder detection,
+and most frames show the same people as the previous one. Face boxes
+are matched to the camera's existing tracks by overlap; a track keeps
+the identity it was given and is only embedded again when it is new
+or every FACE_TRACK_REVERIFY_S seconds. Tracks not seen for
+FACE_TRACK_MAX_AGE_S are dropped, so a person who leaves and comes
+back is identified afresh.
+"""
+
+import os
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+# (x1, y1, x2, y2) in pixels
+Box = Tuple[int, int, int, int]
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """(A, B) intersection-over-union of two sets of (x1, y1, x2, y2) boxes."""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a[:, None, :].astype(np.float32)
+    b = boxes_b[None, :, :].astype(np.float32)
+    width = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    height = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = width * height
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return intersection / np.maximum(area_a + area_b - intersection, 1e-6)
+
+
+class FaceTrack:
+    """One face followed across frames, with its identity label."""
+
+    __slots__ = ('track_id', 'box', 'label', 'verified_at', 'last_seen', 'hits')
+
+    def __init__(self, track_id: int, box: Box, now: float):
+        self.track_id = track_id
+        self.box = box
+        self.label: Optional[Dict] = None
+        self.verified_at: Optional[float] = None
+        self.last_seen = now
+        self.hits = 1
+
+
+class FaceTracker:
+    """
+    Per-camera face tracks with identity labels.
+
+    Configuration (environment):
+    - FACE_TRACK_IOU: overlap needed to continue a track
+    - FACE_TRACK_MAX_AGE_S: seconds a track survives without a match
+    - FACE_TRACK_REVERIFY_S: seconds before a tracked face is embedded again
+    - FACE_TRACK_MAX_CAMERAS: cameras tracked before evicting the least recent
+    """
+
+    def __init__(
+        self,
+        iou_threshold: Optional[float] = None,
+        max_age_s: Optional[float] = None,
+        reverify_s: Optional[float] = None,
+        max_cameras: Optional[int] = None
+    ):
+        """
+        Initialize FaceTracker.
+
+        Args:
+            iou_threshold: Minimum IoU to match a box to a track
+            max_age_s: Track lifetime without matches
+            reverify_s: Re-embedding interval for tracked faces
+            max_cameras: Maximum number of cameras tracked
+        """
+        self.iou_threshold = (
+            iou_threshold if iou_threshold is not None
+            else float(os.getenv('FACE_TRACK_IOU', 0.3))
+        )
+        self.max_age_s = max_age_s if max_age_s is not None else float(os.getenv('FACE_TRACK_MAX_AGE_S', 3.0))
+        self.reverify_s = reverify_s if reverify_s is not None else float(os.getenv('FACE_TRACK_REVERIFY_S', 30.0))
+        self.max_cameras = max_cameras or int(os.getenv('FACE_TRACK_MAX_CAMERAS', 5000))
+
+        self._tracks: 'OrderedDict[Hashable, List[FaceTrack]]' = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self._faces = 0
+        self._embeddings = 0
+
+    def update(
+        self,
+        camera: Hashable,
+        boxes: Sequence[Box],
+        now: Optional[float] = None
+    ) -> Tuple[List[FaceTrack], List[FaceTrack]]:
+        """
+        Match this frame's face boxes to the camera's tracks.
+
+        Boxes are matched greedily, highest IoU first; unmatched boxes
+        start new tracks and stale tracks are dropped.
+
+        Args:
+            camera: Camera the frame came from (e.g. (user ID, camera ID))
+            boxes: Face boxes in the frame
+            now: Frame time (default: now)
+
+        Returns:
+            (track for each box, tracks that need an embedding)
+        """
+        now = time.time() if now is None else now
+
+        with self._lock:
+            tracks = [
+                track for track in self._tracks.get(camera, [])
+                if now - track.last_seen <= self.max_age_s
+            ]
+
+            overlap = iou_matrix(
+                np.array([track.box for track in tracks], dtype=np.float32).reshape(-1, 4),
+                np.array(boxes, dtype=np.float32).reshape(-1, 4)
+            )
+            assigned: List[Optional[FaceTrack]] = [None] * len(boxes)
+            used = set()
+            for flat in np.argsort(-overlap, axis=None):
+                t, b = np.unravel_index(flat, overlap.shape)
+                if overlap[t, b] < self.iou_threshold:
+                    break
+                if t in used or assigned[b] is not None:
+                    continue
+                used.add(t)
+                assigned[b] = tracks[t]
+
+            for b, box in enumerate(boxes):
+                track = assigned[b]
+                if track is None:
+                    track = FaceTrack(next(self._ids), tuple(box), now)
+                    tracks.append(track)
+                    assigned[b] = track
+                else:
+                    track.box = tuple(box)
+                    track.last_seen = now
+                    track.hits += 1
+
+            self._tracks[camera] = tracks
+            self._tracks.move_to_end(camera)
+            while len(self._tracks) > self.max_cameras:
+                self._tracks.popitem(last=False)
+
+            stale = [
+                track for track in assigned
+                if track.verified_at is None or now - track.verified_at >= self.reverify_s
+            ]
+            self._faces += len(boxes)
+            self._embeddings += len(stale)
+            return assigned, stale
+
+    def label(self, track: FaceTrack, label: Optional[Dict], now: Optional[float] = None):
+        """Record a track's identity from a fresh embedding (None: unknown person)."""
+        with self._lock:
+            track.label = label
+            track.verified_at = time.time() if now is None else now
+
+    def get_stats(self) -> Dict:
+        """Share of faces that needed an embedding."""
+        with self._lock:
+            return {
+                'cameras': len(self._tracks),
+                'tracks': sum(len(tracks) for tracks in self._tracks.values()),
+                'faces_seen': self._faces,
+                'faces_embedded': self._embeddings,
+                'embed_ratio': round(self._embeddings / self._faces, 3) if self._faces else 0.0
+            }
+
+
+__all__ = [
+    'iou_matrix',
+    'FaceTrack',
+    'FaceTracker'
+]
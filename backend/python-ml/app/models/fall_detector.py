@@ -16,22 +16,74 @@ This is a CRITICAL safety component that can SAVE LIVES.
 """
 
 import numpy as np
-import cv2
-import base64
-import io
-import math
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
 from datetime import datetime
-from PIL import Image
 from loguru import logger
 
-# YOLOv8 import with robust fallback
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
-    logger.warning("YOLOv8 not available. Using mock fall detection.")
+from app.models.pose_estimator import pose_estimator, PoseEstimator
+from app.models.pose_history import PoseHistoryStore
+from app.models.keypoint_timeline import keypoint_timelines, sudden_drop_score, torso_midpoints
+from app.utils.frame_context import FrameContext
+
+
+# Keypoints below this confidence are treated as missing
+KEYPOINT_MIN_CONFIDENCE = 0.3
+
+
+def posture_metrics(
+    keypoints: np.ndarray,
+    image_shape: Tuple[int, int],
+    confidences: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Posture geometry for every detected person in one vectorized pass.
+    
+    COCO-17 indexing: 0: nose, 5-6: shoulders, 11-12: hips.
+    Missing keypoints - (0, 0) or below KEYPOINT_MIN_CONFIDENCE - are
+    left out: with one hip occluded the hip midpoint is the visible hip,
+    and tilts need both sides.
+    
+    Args:
+        keypoints: (N, 17, 2) pixel coordinates
+        image_shape: (height, width) of the frame
+        confidences: (N, 17) keypoint confidences (None: all visible)
+        
+    Returns:
+        (N,) arrays:
+        - body_angle: torso angle from horizontal in degrees
+          (90 = vertical / standing, 0 = horizontal / fallen)
+        - head_below_hip: nose lower in the image than the hips
+        - hip_height: hip height as a fraction of frame height (0 = top)
+        - shoulder_tilt, hip_tilt: left/right height difference as a
+          fraction of frame height
+    """
+    height = max(float(image_shape[0]), 1.0)
+    
+    visible = np.any(keypoints != 0, axis=2)
+    if confidences is not None:
+        visible &= confidences >= KEYPOINT_MIN_CONFIDENCE
+    
+    shoulders = keypoints[:, [5, 6]]
+    hips = keypoints[:, [11, 12]]
+    nose = keypoints[:, 0]
+    mid_shoulder, mid_hip, _ = torso_midpoints(keypoints, visible.astype(np.float32))
+    
+    # Torso vector (shoulder to hip); y increases downward, so fold the
+    # angle into 0-90° from horizontal
+    torso = mid_hip - mid_shoulder
+    body_angle = np.degrees(np.arctan2(np.abs(torso[:, 1]), np.abs(torso[:, 0])))
+    
+    return {
+        'body_angle': body_angle,
+        'head_below_hip': visible[:, 0] & visible[:, [11, 12]].any(axis=1) & (nose[:, 1] > mid_hip[:, 1]),
+        'hip_height': mid_hip[:, 1] / height,
+        'shoulder_tilt': np.where(
+            visible[:, 5] & visible[:, 6], np.abs(shoulders[:, 0, 1] - shoulders[:, 1, 1]) / height, 0.0
+        ),
+        'hip_tilt': np.where(
+            visible[:, 11] & visible[:, 12], np.abs(hips[:, 0, 1] - hips[:, 1, 1]) / height, 0.0
+        )
+    }
 
 
 class FallDetector:
@@ -42,6 +94,7 @@ class FallDetector:
     - Detect falls (body angle analysis)
     - Classify postures (standing, sitting, lying, fallen)
     - Detect unusual postures (excessive leaning)
+    - Evaluate every person in frame (vectorized over all keypoints)
     - Calculate confidence scores
     - Track pose history for pattern detection
     """
@@ -51,29 +104,50 @@ class FallDetector:
     LYING_THRESHOLD = 45        # Lying down
     SITTING_THRESHOLD = 70      # Sitting posture
     
-    def __init__(self):
-        """Initialize YOLOv8 Pose detector."""
-        self.is_available = YOLO_AVAILABLE
+    # Fractions of frame height
+    HIP_LOW_THRESHOLD = 0.6         # Hips in the lower 40% of the frame
+    UNUSUAL_TILT_THRESHOLD = 0.15   # Shoulder / hip height difference
+    
+    # Torso drop speed (torso lengths/s) that makes lying down a fall
+    FALL_DROP_VELOCITY = 1.2
+    
+    # Shoulders, hips, knees (COCO-17) used for landmark visibility
+    KEY_LANDMARKS = [5, 6, 11, 12, 13, 14]
+    
+    def __init__(self, estimator: Optional[PoseEstimator] = None):
+        """
+        Initialize FallDetector on the shared YOLOv8 pose estimator.
+        
+        Args:
+            estimator: Pose estimator to use (defaults to the shared instance)
+        """
+        self.pose_estimator = estimator or pose_estimator
+        self.is_available = self.pose_estimator.is_available
         
         if self.is_available:
-            self.pose = YOLO('yolov8n-pose.pt')
-            # Warm up
-            self.pose.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
             logger.info("✅ FallDetector initialized with YOLOv8 Pose")
         else:
-            self.pose = None
             logger.warning("⚠️ FallDetector running in mock mode (YOLO Pose not installed)")
         
-        # Pose history for pattern detection
-        self.pose_history = []
-        self.max_history = 30  # Keep last 30 frames
+        # Per-user pose history (bounded ring buffers) for pattern detection
+        self.pose_history = PoseHistoryStore()
+        
+        # Per-camera keypoints (shared with HealthStateDetector) for motion checks
+        self.keypoint_timelines = keypoint_timelines
     
-    def detect_fall(self, image_base64: str) -> Dict:
+    def detect_fall(
+        self,
+        image: Union[str, FrameContext],
+        user_id: Optional[str] = None,
+        camera_id: Optional[str] = None
+    ) -> Dict:
         """
         Detect if person has fallen from image.
         
         Args:
-            image_base64: Base64-encoded image string
+            image: Base64-encoded image string or shared FrameContext
+            user_id: Elder whose pose history is updated (None skips history)
+            camera_id: Camera the frame came from (keys the motion timeline)
             
         Returns:
             Dict with fall detection results:
@@ -85,12 +159,16 @@ class FallDetector:
                 'unusual_posture': False,
                 'pose_detected': True,
                 'landmarks_visible': 0.9,
+                'person_count': 1,
+                'fallen_count': 0,
+                'persons': [...],  # same fields for every person in frame
                 'timestamp': '2026-01-25T10:45:00'
             }
         """
         try:
-            # Decode image
-            image_array = self._decode_image(image_base64)
+            # Decode once (shared with other analyzers of the same frame)
+            frame = FrameContext.ensure(image)
+            image_array = frame.try_decode()
             
             if image_array is None:
                 return self._no_pose_detected(error="Failed to decode image")
@@ -99,61 +177,93 @@ class FallDetector:
             if not self.is_available:
                 return self._mock_detection(image_array)
             
-            # Predict pose using YOLO
-            results = self.pose(image_array, verbose=False)
-            
-            if not results or len(results) == 0 or not hasattr(results[0], 'keypoints') or results[0].keypoints is None or len(results[0].keypoints.xy[0]) == 0:
-                return self._no_pose_detected()
-            
-            # Extract keypoints xy coordinates
-            # shape is (N, 17, 2), we assume 1 person (N=0)
-            landmarks = results[0].keypoints.xy[0].cpu().numpy()
+            # Shared YOLO pose pass (memoized per frame across detectors)
+            pose = self.pose_estimator.estimate(image_array, frame_key=frame.key)
             
-            # If coordinates are 0, pose wasn't fully detected
-            if np.all(landmarks == 0):
+            # Every detected person is classified at once from the (N, 17, 2)
+            # keypoints. All-zero keypoints mean the pose wasn't detected.
+            valid = np.flatnonzero(np.any(pose.keypoints != 0, axis=(1, 2)))
+            if len(valid) == 0:
                 return self._no_pose_detected()
             
-            # Extract key body points
-            body_data = self._extract_body_data(landmarks)
-            
-            if body_data is None:
-                return self._no_pose_detected(error="Could not extract body landmarks")
-            
-            # Calculate body angle
-            body_angle = self._calculate_body_angle(body_data)
-            
-            # Classify posture
-            posture, fall_detected = self._classify_posture(
-                body_angle, 
-                body_data
+            keypoints = pose.keypoints[valid]
+            confidences = pose.confidences[valid] if pose.confidences is not None else None
+            metrics = posture_metrics(keypoints, pose.image_shape, confidences)
+            postures, falls, unusual = self._classify_postures(metrics)
+            visible = (
+                confidences[:, self.KEY_LANDMARKS].mean(axis=1) if confidences is not None
+                else np.ones(len(valid), dtype=np.float32)
             )
             
-            # Check for unusual posture
-            unusual_posture = self._detect_unusual_posture(landmarks)
-            
             # Calculate confidence using basic visible points logic
-            confidence = 0.85 # YOLO confidence placeholder
+            fall_confidence = np.full(len(valid), 0.85)  # YOLO confidence placeholder
+            
+            # Motion over the last seconds (primary person, the tracked
+            # elder): a fast drop into a horizontal posture is a fall even
+            # if the single frame looks like lying. Detection order is not
+            # stable, so the primary person is the one closest to the
+            # timeline's last torso position
+            motion = None
+            primary = 0
+            if user_id is not None:
+                timeline, primary = self.keypoint_timelines.record(
+                    user_id,
+                    keypoints,
+                    confidences,
+                    frame_key=frame.key,
+                    camera_id=camera_id
+                )
+                motion = timeline.motion()
+                suddenness = sudden_drop_score(motion, self.FALL_DROP_VELOCITY)
+                motion['suddenness'] = suddenness
+                
+                if suddenness >= 1.0 and postures[primary] in ('fallen', 'lying'):
+                    postures[primary], falls[primary] = 'fallen', True
+                    fall_confidence[primary] = 0.95
+                
+                # Store in history
+                self._update_history(
+                    user_id, str(postures[primary]), bool(falls[primary]),
+                    float(metrics['body_angle'][primary])
+                )
+            
+            persons = [
+                {
+                    'person': int(index),
+                    'posture': str(postures[i]),
+                    'fall_detected': bool(falls[i]),
+                    'confidence': round(float(fall_confidence[i]), 3),
+                    'body_angle': round(float(metrics['body_angle'][i]), 2),
+                    'unusual_posture': bool(unusual[i]),
+                    'landmarks_visible': round(float(visible[i]), 3)
+                }
+                for i, index in enumerate(valid)
+            ]
             
-            # Store in history
-            self._update_history({
-                'posture': posture,
-                'fall_detected': fall_detected,
-                'body_angle': body_angle,
-                'timestamp': datetime.now().isoformat()
-            })
+            # Top-level fields describe the first fallen person, else the primary one
+            fallen = [person for person in persons if person['fall_detected']]
+            subject = fallen[0] if fallen else persons[primary]
+            fall_detected = subject['fall_detected']
+            body_angle = subject['body_angle']
+            posture = subject['posture']
             
-            logger.debug(f"Pose: {posture}, Angle: {body_angle:.2f}, Fall: {fall_detected}, Confidence: {confidence:.2f}")
+            logger.debug(f"Pose: {posture}, Angle: {body_angle:.2f}, Fall: {fall_detected}, Persons: {len(persons)}")
             
             result = {
                 'fall_detected': fall_detected,
-                'confidence': round(confidence, 3),
-                'body_angle': round(body_angle, 2),
+                'confidence': subject['confidence'],
+                'body_angle': body_angle,
                 'posture': posture,
-                'unusual_posture': unusual_posture,
+                'unusual_posture': subject['unusual_posture'],
                 'pose_detected': True,
-                'landmarks_visible': round(confidence, 3),
+                'landmarks_visible': subject['landmarks_visible'],
+                'person_count': len(persons),
+                'fallen_count': len(fallen),
+                'persons': persons,
                 'timestamp': datetime.now().isoformat()
             }
+            if motion is not None:
+                result['motion'] = motion
             
             # Add fall alert if detected
             if fall_detected:
@@ -171,205 +281,48 @@ class FallDetector:
             logger.error(f"Fall detection error: {str(e)}")
             return self._no_pose_detected(error=str(e))
     
-    def _decode_image(self, image_base64: str) -> Optional[np.ndarray]:
-        """Decode base64 image to numpy array."""
-        try:
-            # Remove data URI prefix if present
-            if ',' in image_base64:
-                image_base64 = image_base64.split(',')[1]
-            
-            # Decode base64
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
-            image_array = np.array(image)
-            
-            # Ensure BGR format for OpenCV
-            if len(image_array.shape) == 2:  # Grayscale
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_GRAY2BGR)
-            elif image_array.shape[2] == 4:  # RGBA
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_RGBA2BGR)
-            elif image_array.shape[2] == 3:  # RGB
-                image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
-            
-            return image_array
-            
-        except Exception as e:
-            logger.error(f"Image decode error: {e}")
-            return None
-    
-    def _extract_body_data(self, landmarks) -> Optional[Dict]:
-        """
-        Extract key body points for posture analysis using YOLOv8 indexing.
-        YOLOv8 COCO format indexing:
-        0: nose, 5: l_shoulder, 6: r_shoulder, 11: l_hip, 12: r_hip, 
-        13: l_knee, 14: r_knee, 15: l_ankle, 16: r_ankle
-        """
-        try:
-            # Get key landmarks
-            left_shoulder = landmarks[5]
-            right_shoulder = landmarks[6]
-            left_hip = landmarks[11]
-            right_hip = landmarks[12]
-            left_knee = landmarks[13]
-            right_knee = landmarks[14]
-            left_ankle = landmarks[15]
-            right_ankle = landmarks[16]
-            nose = landmarks[0]
-            
-            return {
-                'shoulder_y': (left_shoulder[1] + right_shoulder[1]) / 2,
-                'shoulder_x': (left_shoulder[0] + right_shoulder[0]) / 2,
-                'hip_y': (left_hip[1] + right_hip[1]) / 2,
-                'hip_x': (left_hip[0] + right_hip[0]) / 2,
-                'knee_y': (left_knee[1] + right_knee[1]) / 2,
-                'knee_x': (left_knee[0] + right_knee[0]) / 2,
-                'ankle_y': (left_ankle[1] + right_ankle[1]) / 2,
-                'ankle_x': (left_ankle[0] + right_ankle[0]) / 2,
-                'head_y': nose[1],
-                'head_x': nose[0],
-                'left_shoulder': (left_shoulder[0], left_shoulder[1]),
-                'right_shoulder': (right_shoulder[0], right_shoulder[1]),
-                'left_hip': (left_hip[0], left_hip[1]),
-                'right_hip': (right_hip[0], right_hip[1])
-            }
-            
-        except Exception as e:
-            logger.error(f"Body data extraction error: {e}")
-            return None
-    
-    def _calculate_body_angle(self, body_data: Dict) -> float:
-        """
-        Calculate body angle from vertical axis.
-        
-        A standing person has angle ~90° from horizontal.
-        A fallen person has angle ~0° from horizontal.
-        
-        Args:
-            body_data: Extracted body point coordinates
-            
-        Returns:
-            Angle in degrees (0 = horizontal, 90 = vertical)
-        """
-        # Calculate torso vector (shoulder to hip)
-        dx = body_data['hip_x'] - body_data['shoulder_x']
-        dy = body_data['hip_y'] - body_data['shoulder_y']
-        
-        # Calculate angle from horizontal
-        # In image coordinates, y increases downward
-        angle_rad = math.atan2(dy, dx)
-        angle_deg = math.degrees(angle_rad)
-        
-        # Convert to angle from horizontal plane
-        # 90° = vertical (standing)
-        # 0° = horizontal (fallen)
-        body_angle = abs(angle_deg)
-        
-        # Handle cases where dy is negative (person upside down or leaning back)
-        if body_angle > 90:
-            body_angle = 180 - body_angle
-            
-        return body_angle
-    
-    def _classify_posture(
-        self, 
-        body_angle: float, 
-        body_data: Dict
-    ) -> Tuple[str, bool]:
+    def _classify_postures(self, metrics: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Classify body posture based on angle and position.
+        Classify every person's posture from posture_metrics().
         
         Args:
-            body_angle: Angle from horizontal in degrees
-            body_data: Extracted body point coordinates
+            metrics: (N,) arrays from posture_metrics
             
         Returns:
-            Tuple of (posture_name, fall_detected)
+            Tuple of (posture names, fall flags, unusual-posture flags), each (N,)
         """
-        # Check if head is below hip (strong fall indicator)
-        head_below_hip = body_data['head_y'] > body_data['hip_y']
-        
-        # Determine hip height (for sitting detection)
-        hip_is_low = body_data['hip_y'] > 0.6  # In lower 40% of frame
+        body_angle = metrics['body_angle']
         
         # Fall detection: body nearly horizontal OR head below hip
-        if body_angle < self.FALLEN_THRESHOLD or head_below_hip:
-            return ('fallen', True)
-        
-        # Lying down (horizontal but not emergency)
-        elif body_angle < self.LYING_THRESHOLD:
-            # Could be lying in bed - check context
-            return ('lying', False)
-        
-        # Sitting
-        elif body_angle < self.SITTING_THRESHOLD and hip_is_low:
-            return ('sitting', False)
-        
-        # Standing
-        else:
-            return ('standing', False)
-    
-    def _detect_unusual_posture(self, landmarks) -> bool:
-        """
-        Detect unusual or concerning postures using YOLOv8 indexing.
-        """
-        try:
-            left_shoulder = landmarks[5]
-            right_shoulder = landmarks[6]
-            left_hip = landmarks[11]
-            right_hip = landmarks[12]
-            
-            # Check shoulder tilt
-            shoulder_tilt = abs(left_shoulder[1] - right_shoulder[1])
-            
-            # Check hip tilt
-            hip_tilt = abs(left_hip[1] - right_hip[1])
-            
-            # Unusual if extreme tilt (leaning heavily to one side)
-            if shoulder_tilt > 0.15 or hip_tilt > 0.15:
-                return True
-            
-            # Check for hunched posture (shoulders significantly forward)
-            # This would require depth estimation, simplified here
-            
-            return False
-            
-        except Exception as e:
-            logger.debug(f"Unusual posture check failed: {e}")
-            return False
-    
-    def _calculate_confidence(self, landmarks) -> float:
-        """
-        Calculate detection confidence based on landmark visibility.
+        fallen = (body_angle < self.FALLEN_THRESHOLD) | metrics['head_below_hip']
+        # Lying down (horizontal but not emergency; could be lying in bed)
+        lying = ~fallen & (body_angle < self.LYING_THRESHOLD)
+        # Sitting: reclined torso with the hips in the lower part of the frame
+        sitting = (
+            ~fallen & ~lying
+            & (body_angle < self.SITTING_THRESHOLD)
+            & (metrics['hip_height'] > self.HIP_LOW_THRESHOLD)
+        )
         
-        Args:
-            landmarks: MediaPipe pose landmarks
-            
-        Returns:
-            Confidence score (0.0 to 1.0)
-        """
-        key_landmarks = [
-            self.mp_pose.PoseLandmark.LEFT_SHOULDER,
-            self.mp_pose.PoseLandmark.RIGHT_SHOULDER,
-            self.mp_pose.PoseLandmark.LEFT_HIP,
-            self.mp_pose.PoseLandmark.RIGHT_HIP,
-            self.mp_pose.PoseLandmark.LEFT_KNEE,
-            self.mp_pose.PoseLandmark.RIGHT_KNEE
-        ]
+        postures = np.select([fallen, lying, sitting], ['fallen', 'lying', 'sitting'], 'standing')
         
-        visibilities = [
-            landmarks[lm].visibility 
-            for lm in key_landmarks
-        ]
+        # Unusual if extreme tilt (leaning heavily to one side)
+        unusual = (
+            (metrics['shoulder_tilt'] > self.UNUSUAL_TILT_THRESHOLD)
+            | (metrics['hip_tilt'] > self.UNUSUAL_TILT_THRESHOLD)
+        )
         
-        return np.mean(visibilities)
+        return postures.astype(object), fallen, unusual
     
-    def _update_history(self, pose_data: Dict):
-        """Update pose history for pattern detection."""
-        self.pose_history.append(pose_data)
-        
-        # Keep only recent history
-        if len(self.pose_history) > self.max_history:
-            self.pose_history = self.pose_history[-self.max_history:]
+    def _update_history(
+        self,
+        user_id: str,
+        posture: str,
+        fall_detected: bool,
+        body_angle: float
+    ):
+        """Update a user's pose history for pattern detection."""
+        self.pose_history.record(user_id, posture, body_angle, fall_detected)
     
     def _no_pose_detected(self, error: Optional[str] = None) -> Dict:
         """Return default response when no pose is detected."""
@@ -406,10 +359,15 @@ class FallDetector:
             'timestamp': datetime.now().isoformat()
         }
     
-    def analyze_movement_pattern(self) -> Dict:
+    def analyze_movement_pattern(self, user_id: str) -> Dict:
         """
-        Analyze movement patterns from pose history.
+        Analyze a user's movement patterns from their pose history.
+        
+        O(1): reads the history's running counters.
         
+        Args:
+            user_id: Elder user ID
+            
         Returns:
             Movement pattern analysis:
             {
@@ -421,7 +379,10 @@ class FallDetector:
                 'time_lying_pct': 10.0
             }
         """
-        if len(self.pose_history) < 5:
+        history = self.pose_history.get(user_id)
+        summary = history.summary() if history is not None else None
+        
+        if summary is None or summary['total'] < 5:
             return {
                 'activity_level': 'unknown',
                 'posture_changes': 0,
@@ -431,32 +392,9 @@ class FallDetector:
                 'time_lying_pct': 0.0
             }
         
-        # Count postures
-        posture_counts = {
-            'standing': 0,
-            'sitting': 0,
-            'lying': 0,
-            'fallen': 0,
-            'unknown': 0
-        }
-        
-        posture_changes = 0
-        previous_posture = None
-        fall_events = 0
-        
-        for pose in self.pose_history:
-            posture = pose.get('posture', 'unknown')
-            posture_counts[posture] = posture_counts.get(posture, 0) + 1
-            
-            if previous_posture and posture != previous_posture:
-                posture_changes += 1
-            
-            if pose.get('fall_detected'):
-                fall_events += 1
-            
-            previous_posture = posture
-        
-        total = len(self.pose_history)
+        posture_counts = summary['posture_counts']
+        posture_changes = summary['posture_changes']
+        total = summary['total']
         
         # Calculate percentages
         standing_pct = (posture_counts['standing'] / total) * 100
@@ -476,7 +414,7 @@ class FallDetector:
         return {
             'activity_level': activity_level,
             'posture_changes': posture_changes,
-            'fall_events': fall_events,
+            'fall_events': summary['fall_events'],
             'time_standing_pct': round(standing_pct, 1),
             'time_sitting_pct': round(sitting_pct, 1),
             'time_lying_pct': round(lying_pct, 1)
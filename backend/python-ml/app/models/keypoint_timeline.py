@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Per-Camera Keypoint Timelines
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Recent pose keypoints per elder and camera, for motion-based fall /
+faint checks. Each camera gets its own timeline: keypoints from two
+rooms interleaved in one buffer would read as the torso jumping
+between them.
+
+Each timeline is a ring buffer of the primary person's COCO-17
+keypoints and confidences, stored as float16 (about 100 bytes per
+frame), filled from the shared pose pass - no extra inference. A frame
+recorded by several detectors (comprehensive analysis) is stored once.
+
+Motion is computed over the last frames in one vectorized pass: the
+torso centre (midway between the confidence-weighted shoulder and hip
+midpoints), its velocity and acceleration, expressed in torso lengths
+per second so the numbers do not depend on camera distance or
+resolution. Frames missing both shoulders or both hips are skipped; one
+occluded keypoint of a pair only shifts that pair's midpoint sideways.
+
+With several people in view the detector's person order is not stable
+between frames, so each frame records the person closest to the
+timeline's last torso centre, not simply the first one detected.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import numpy as np
+
+
+# COCO-17 indices: 5-6 shoulders, 11-12 hips
+SHOULDERS = [5, 6]
+HIPS = [11, 12]
+TORSO = SHOULDERS + HIPS
+
+
+class KeypointTimeline:
+    """Ring buffer of one camera's recent keypoints of a user."""
+
+    def __init__(self, capacity: int = 30):
+        """
+        Initialize KeypointTimeline.
+
+        Args:
+            capacity: Number of most recent frames kept
+        """
+        self.capacity = max(3, capacity)
+
+        self.keypoints = np.zeros((self.capacity, 17, 2), dtype=np.float16)
+        self.confidences = np.zeros((self.capacity, 17), dtype=np.float16)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+
+        self._next = 0
+        self.count = 0
+        self._last_key: Optional[Hashable] = None
+
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        keypoints: np.ndarray,
+        confidences: Optional[np.ndarray] = None,
+        timestamp: Optional[float] = None,
+        frame_key: Optional[Hashable] = None
+    ) -> bool:
+        """
+        Add one frame's keypoints, overwriting the oldest when full.
+
+        Args:
+            keypoints: (17, 2) pixel coordinates of the primary person
+            confidences: (17,) keypoint confidences (None: all visible)
+            timestamp: Capture time in seconds (default: now)
+            frame_key: Frame identity; a repeat of the last key is ignored
+
+        Returns:
+            False if the frame was already recorded
+        """
+        with self._lock:
+            if frame_key is not None and frame_key == self._last_key:
+                return False
+            self._last_key = frame_key
+
+            index = self._next
+            self.keypoints[index] = keypoints
+            self.confidences[index] = confidences if confidences is not None else 1.0
+            self.timestamps[index] = timestamp if timestamp is not None else time.time()
+
+            self._next = (index + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            return True
+
+    def window(self, frames: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Copy of the last `frames` entries (all by default), oldest first, as float32."""
+        with self._lock:
+            size = self.count if frames is None else min(frames, self.count)
+            order = (self._next - size + np.arange(size)) % self.capacity
+            return {
+                'keypoints': self.keypoints[order].astype(np.float32),
+                'confidences': self.confidences[order].astype(np.float32),
+                'timestamps': self.timestamps[order]
+            }
+
+    def nearest(self, keypoints: np.ndarray, confidences: np.ndarray) -> int:
+        """
+        Index of the person whose torso is closest to the last recorded one.
+
+        Args:
+            keypoints: (N, 17, 2) pixel coordinates of everyone in the frame
+            confidences: (N, 17) keypoint confidences
+
+        Returns:
+            0 if the timeline has no usable torso yet
+        """
+        data = self.window()
+        mid_shoulder, mid_hip, valid = torso_midpoints(data['keypoints'], data['confidences'])
+        if len(keypoints) < 2 or not valid.any():
+            return 0
+        last = np.flatnonzero(valid)[-1]
+        reference = (mid_shoulder[last] + mid_hip[last]) / 2
+
+        mid_shoulder, mid_hip, valid = torso_midpoints(keypoints, confidences)
+        distance = np.linalg.norm((mid_shoulder + mid_hip) / 2 - reference, axis=1)
+        return int(np.where(valid, distance, np.inf).argmin()) if valid.any() else 0
+
+    def motion(self, window_s: float = 3.0, max_gap_s: float = 1.5) -> Dict:
+        """
+        Torso velocity and acceleration over the last `window_s` seconds.
+
+        Image y grows downward, so positive vertical values mean the
+        torso is dropping.
+
+        Args:
+            window_s: How far back to look from the latest frame
+            max_gap_s: Frames before a gap this long are ignored
+                (the person left the view, the stream paused)
+
+        Returns:
+            {
+                'frames': 6,               # frames used
+                'speed': 0.4,              # latest centroid speed (torso lengths/s)
+                'peak_speed': 2.1,
+                'peak_drop_velocity': 1.9, # fastest downward movement
+                'peak_acceleration': 6.3,  # torso lengths/s²
+                'drop': 1.2                # net centroid drop over the window
+            }
+        """
+        data = self.window()
+        times = data['timestamps']
+        recent = times >= times[-1] - window_s if len(times) else np.zeros(0, dtype=bool)
+        return torso_motion(
+            data['keypoints'][recent],
+            data['confidences'][recent],
+            data['timestamps'][recent],
+            max_gap_s
+        )
+
+
+def torso_midpoints(
+    keypoints: np.ndarray,
+    confidences: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Confidence-weighted shoulder and hip midpoints.
+
+    Missing keypoints are (0, 0) and get no weight, so one occluded
+    keypoint of a pair leaves the midpoint on the visible one.
+
+    Args:
+        keypoints: (N, 17, 2) pixel coordinates
+        confidences: (N, 17) keypoint confidences
+
+    Returns:
+        (mid_shoulder, mid_hip, valid): (N, 2), (N, 2) and (N,) - valid
+        where at least one shoulder and one hip are visible
+    """
+    torso = keypoints[:, TORSO]
+    weights = (confidences[:, TORSO] * np.any(torso != 0, axis=2))[:, :, None]
+    shoulder_w, hip_w = weights[:, :2].sum(axis=1), weights[:, 2:].sum(axis=1)
+
+    mid_shoulder = (torso[:, :2] * weights[:, :2]).sum(axis=1) / np.maximum(shoulder_w, 1e-6)
+    mid_hip = (torso[:, 2:] * weights[:, 2:]).sum(axis=1) / np.maximum(hip_w, 1e-6)
+    valid = (shoulder_w[:, 0] > 0) & (hip_w[:, 0] > 0)
+    return mid_shoulder, mid_hip, valid
+
+
+def torso_motion(
+    keypoints: np.ndarray,
+    confidences: np.ndarray,
+    timestamps: np.ndarray,
+    max_gap_s: float = 1.5
+) -> Dict:
+    """
+    Vectorized torso kinematics for a keypoint sequence.
+
+    Args:
+        keypoints: (N, 17, 2) pixel coordinates, oldest first
+        confidences: (N, 17) keypoint confidences
+        timestamps: (N,) capture times in seconds
+
+    Returns:
+        Motion summary (see KeypointTimeline.motion)
+    """
+    mid_shoulder, mid_hip, valid = torso_midpoints(keypoints, confidences)
+
+    # Skip frames without a visible shoulder and hip, then keep the run
+    # of frames after the last long gap
+    mid_shoulder, mid_hip, times = mid_shoulder[valid], mid_hip[valid], timestamps[valid]
+    breaks = np.flatnonzero(np.diff(times) > max_gap_s)
+    if len(breaks):
+        start = breaks[-1] + 1
+        mid_shoulder, mid_hip, times = mid_shoulder[start:], mid_hip[start:], times[start:]
+    result = {
+        'frames': int(len(times)),
+        'speed': 0.0,
+        'peak_speed': 0.0,
+        'peak_drop_velocity': 0.0,
+        'peak_acceleration': 0.0,
+        'drop': 0.0
+    }
+    if len(times) < 2:
+        return result
+
+    centroid = (mid_shoulder + mid_hip) / 2
+
+    # Scale: longest shoulder-to-hip distance seen (the upright torso)
+    scale = max(float(np.linalg.norm(mid_hip - mid_shoulder, axis=1).max()), 1.0)
+
+    dt = np.maximum(np.diff(times), 1e-3)
+    velocity = np.diff(centroid, axis=0) / dt[:, None] / scale
+    speed = np.linalg.norm(velocity, axis=1)
+
+    result.update({
+        'speed': round(float(speed[-1]), 3),
+        'peak_speed': round(float(speed.max()), 3),
+        'peak_drop_velocity': round(float(max(velocity[:, 1].max(), 0.0)), 3),
+        'drop': round(float((centroid[-1, 1] - centroid[0, 1]) / scale), 3)
+    })
+
+    if len(velocity) >= 2:
+        mid_dt = np.maximum((dt[1:] + dt[:-1]) / 2, 1e-3)
+        acceleration = np.diff(velocity, axis=0) / mid_dt[:, None]
+        result['peak_acceleration'] = round(float(np.linalg.norm(acceleration, axis=1).max()), 3)
+
+    return result
+
+
+def sudden_drop_score(motion: Dict, drop_velocity: float = 1.2, min_drop: float = 0.5) -> float:
+    """
+    How fall-like a motion summary is (0-1).
+
+    1.0 once the torso dropped at `drop_velocity` torso lengths per
+    second or faster; 0 unless it ended at least `min_drop` torso
+    lengths lower than it started (a stumble that recovers, a bow).
+    Sitting down drops about one torso length at well under 1 per
+    second; a fall drops nearly two in about a second.
+    """
+    if motion['drop'] < min_drop:
+        return 0.0
+    return round(min(motion['peak_drop_velocity'] / drop_velocity, 1.0), 3)
+
+
+class KeypointTimelineStore:
+    """
+    Bounded registry of keypoint timelines, one per (user, camera).
+
+    Configuration (environment):
+    - KEYPOINT_TIMELINE_SIZE: frames kept per timeline
+    - KEYPOINT_TIMELINE_MAX_USERS: timelines tracked before evicting the least recent
+    """
+
+    def __init__(self, capacity: Optional[int] = None, max_users: Optional[int] = None):
+        """
+        Initialize KeypointTimelineStore.
+
+        Args:
+            capacity: Frames kept per timeline
+            max_users: Maximum number of (user, camera) timelines tracked
+        """
+        self.capacity = capacity or int(os.getenv('KEYPOINT_TIMELINE_SIZE', 16))
+        self.max_users = max_users or int(os.getenv('KEYPOINT_TIMELINE_MAX_USERS', 5000))
+
+        self._timelines: 'OrderedDict[Tuple[str, Optional[str]], KeypointTimeline]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        user_id: str,
+        camera_id: Optional[str] = None,
+        create: bool = False
+    ) -> Optional[KeypointTimeline]:
+        """Get a user's timeline for one camera, optionally creating it."""
+        key = (user_id, camera_id)
+        with self._lock:
+            timeline = self._timelines.get(key)
+            if timeline is not None:
+                self._timelines.move_to_end(key)
+            elif create:
+                timeline = KeypointTimeline(self.capacity)
+                self._timelines[key] = timeline
+                while len(self._timelines) > self.max_users:
+                    self._timelines.popitem(last=False)
+            return timeline
+
+    def record(
+        self,
+        user_id: str,
+        keypoints: np.ndarray,
+        confidences: Optional[np.ndarray] = None,
+        timestamp: Optional[float] = None,
+        frame_key: Optional[Hashable] = None,
+        camera_id: Optional[str] = None
+    ) -> Tuple[KeypointTimeline, int]:
+        """
+        Append a frame to a user's timeline for a camera (repeats of the same frame are ignored).
+
+        Args:
+            keypoints: (17, 2) keypoints of one person, or (N, 17, 2) of
+                everyone in the frame
+            confidences: Matching (17,) / (N, 17) confidences (None: all visible)
+
+        Returns:
+            (timeline, index of the person recorded): the person closest
+            to the timeline's last torso centre
+        """
+        keypoints = np.asarray(keypoints, dtype=np.float32).reshape(-1, 17, 2)
+        confidences = (
+            np.asarray(confidences, dtype=np.float32).reshape(-1, 17) if confidences is not None
+            else np.ones(keypoints.shape[:2], dtype=np.float32)
+        )
+        timeline = self.get(user_id, camera_id, create=True)
+        index = timeline.nearest(keypoints, confidences)
+        timeline.append(keypoints[index], confidences[index], timestamp, frame_key)
+        return timeline, index
+
+    def __len__(self) -> int:
+        return len(self._timelines)
+
+
+# Create global instance for import (shared by the fall and health-state detectors)
+keypoint_timelines = KeypointTimelineStore()
+
+
+__all__ = [
+    'KeypointTimeline',
+    'KeypointTimelineStore',
+    'torso_midpoints',
+    'torso_motion',
+    'sudden_drop_score',
+    'keypoint_timelines'
+]
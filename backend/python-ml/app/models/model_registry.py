@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Model Registry
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Central record of the heavy vision models and when they load.
+
+Importing the service no longer loads anything: each model registers
+a loader here, and the application lifespan decides when it runs
+(MODEL_LOADING):
+- eager: load everything before serving requests
+- background: serve immediately, load in a background thread; vision
+  endpoints answer 503 until loading finishes, while cheap endpoints
+  (risk, activity, emergency) work from the first second
+- lazy: load on first use (fast --reload during development)
+
+Each model loads at most once, whichever path asks for it first.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+
+
+class ModelsNotReady(Exception):
+    """Raised while registered models are still loading."""
+
+    def __init__(self, pending: List[str]):
+        self.pending = pending
+        super().__init__(f"Models still loading: {', '.join(pending)}")
+
+
+class _ModelEntry:
+    """Loader and load state for one registered model."""
+
+    __slots__ = ('name', 'loader', 'state', 'error', 'load_ms', 'lock')
+
+    def __init__(self, name: str, loader: Callable[[], None]):
+        self.name = name
+        self.loader = loader
+        self.state = 'pending'
+        self.error: Optional[str] = None
+        self.load_ms: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Registry of model loaders with single-flight loading.
+
+    Configuration (environment):
+    - MODEL_LOADING: 'background' (default), 'eager' or 'lazy'
+    """
+
+    MODES = ('eager', 'background', 'lazy')
+
+    def __init__(self, mode: Optional[str] = None):
+        """
+        Initialize ModelRegistry.
+
+        Args:
+            mode: Loading strategy applied by the application lifespan
+        """
+        self.mode = (mode or os.getenv('MODEL_LOADING', 'background')).lower()
+        if self.mode not in self.MODES:
+            logger.warning(f"Unknown MODEL_LOADING '{self.mode}'; using background")
+            self.mode = 'background'
+
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._background: Optional[threading.Thread] = None
+
+    def register(self, name: str, loader: Callable[[], None]):
+        """Register a model loader (called once, on first load)."""
+        self._entries[name] = _ModelEntry(name, loader)
+
+    def load(self, name: str) -> bool:
+        """
+        Load one model, or wait for a load already in progress.
+
+        Returns:
+            True if the model loaded, False if its loader failed
+        """
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.state == 'pending':
+                entry.state = 'loading'
+                start = time.perf_counter()
+                try:
+                    entry.loader()
+                    entry.state = 'ready'
+                except Exception as e:
+                    entry.state = 'failed'
+                    entry.error = str(e)
+                    logger.error(f"Model '{name}' failed to load: {e}")
+                entry.load_ms = round((time.perf_counter() - start) * 1000, 1)
+                logger.info(f"Model '{name}' {entry.state} in {entry.load_ms}ms")
+            return entry.state == 'ready'
+
+    def load_all(self) -> bool:
+        """Load every registered model in registration order (blocking)."""
+        results = [self.load(name) for name in list(self._entries)]
+        return all(results)
+
+    def start_background(self) -> threading.Thread:
+        """Load every registered model on a daemon thread."""
+        if self._background is None:
+            self._background = threading.Thread(
+                target=self.load_all,
+                name='model-loader',
+                daemon=True
+            )
+            self._background.start()
+        return self._background
+
+    @property
+    def loading(self) -> bool:
+        """True while the background loader is running."""
+        return self._background is not None and self._background.is_alive()
+
+    @property
+    def ready(self) -> bool:
+        """True once no model is pending or loading (failed ones count as settled)."""
+        return not self.pending()
+
+    def pending(self) -> List[str]:
+        """Names of models not loaded yet."""
+        return [
+            name for name, entry in self._entries.items()
+            if entry.state in ('pending', 'loading')
+        ]
+
+    def get_status(self) -> Dict:
+        """Readiness and per-model load state."""
+        return {
+            'mode': self.mode,
+            'ready': self.ready,
+            'models': {
+                name: {
+                    'state': entry.state,
+                    'load_ms': entry.load_ms,
+                    'error': entry.error
+                }
+                for name, entry in self._entries.items()
+            }
+        }
+
+
+# Create global instance for import
+model_registry = ModelRegistry()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - ONNX Runtime Inference Backend
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+CPU inference backend for the pose and emotion models.
+
+With INFERENCE_BACKEND=onnx, the YOLOv8-pose model and the FER2013
+emotion CNN run through ONNX Runtime instead of PyTorch / TensorFlow.
+Models are exported to ONNX once (from the native model, when it is
+installed), then cached in ONNX_MODEL_DIR. Outputs are converted to the same shapes the native
+backends produce, so detectors do not care which backend is active.
+
+ONNX_QUANTIZE=int8 opts into dynamic INT8 quantization. It is off by
+default: dynamic quantization targets MatMul-heavy models, and on these
+convolutional networks it tends to cost accuracy without a speedup.
+Check accuracy on your own frames before enabling it.
+
+Export ahead of time with: python training/export_onnx_models.py
+"""
+
+import os
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+import cv2
+from loguru import logger
+
+# ONNX Runtime import with fallback
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+
+# Default location of exported models
+DEFAULT_MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'trained_models', 'onnx'
+)
+
+
+def backend_name() -> str:
+    """Configured inference backend: 'native' or 'onnx'."""
+    return os.getenv('INFERENCE_BACKEND', 'native').lower()
+
+
+def use_onnx() -> bool:
+    """True if the ONNX backend is configured and ONNX Runtime is installed."""
+    if backend_name() != 'onnx':
+        return False
+    if not ONNX_AVAILABLE:
+        logger.warning("INFERENCE_BACKEND=onnx but onnxruntime is not installed; using native models")
+        return False
+    return True
+
+
+def create_session(model_path: str) -> 'ort.InferenceSession':
+    """
+    Create a CPU inference session tuned for small-batch latency.
+
+    Configuration (environment):
+    - ONNX_INTRA_OP_THREADS: threads per operator (default: all cores;
+      inference worker processes are given their share of the cores)
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = int(
+        os.getenv('ONNX_INTRA_OP_THREADS', os.cpu_count() or 1)
+    )
+    options.inter_op_num_threads = 1
+
+    return ort.InferenceSession(
+        model_path,
+        sess_options=options,
+        providers=['CPUExecutionProvider']
+    )
+
+
+def quantize_int8(source_path: str, target_path: str) -> str:
+    """Quantize a float32 ONNX model to INT8 weights (dynamic; opt-in, see module docstring)."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source_path, target_path, weight_type=QuantType.QUInt8)
+    logger.info(f"Quantized {os.path.basename(source_path)} -> {os.path.basename(target_path)}")
+    return target_path
+
+
+def resolve_model(
+    name: str,
+    export_fn: Optional[Callable[[str], str]] = None
+) -> Optional[str]:
+    """
+    Path of a ready-to-run ONNX model, exporting / quantizing if needed.
+
+    Configuration (environment):
+    - ONNX_MODEL_DIR: where exported models are cached
+    - ONNX_QUANTIZE: 'none' (default) or 'int8'
+
+    Args:
+        name: Model file stem (e.g. 'yolov8n-pose')
+        export_fn: Writes the float32 ONNX model to the given path;
+            None if the native model is not installed
+
+    Returns:
+        Model path, or None if it neither exists nor can be exported
+    """
+    model_dir = os.getenv('ONNX_MODEL_DIR', DEFAULT_MODEL_DIR)
+    quantize = os.getenv('ONNX_QUANTIZE', 'none').lower() == 'int8'
+
+    float_path = os.path.join(model_dir, f'{name}.onnx')
+    int8_path = os.path.join(model_dir, f'{name}.int8.onnx')
+    wanted = int8_path if quantize else float_path
+
+    if os.path.exists(wanted):
+        return wanted
+
+    if not os.path.exists(float_path):
+        if export_fn is None:
+            return None
+        os.makedirs(model_dir, exist_ok=True)
+        export_fn(float_path)
+
+    return quantize_int8(float_path, int8_path) if quantize else float_path
+
+
+# ━━━ Exporters (need the native frameworks) ━━━
+
+def export_pose_model(weights: str, target_path: str) -> str:
+    """Export YOLOv8-pose weights to ONNX with a dynamic batch axis."""
+    import shutil
+    from ultralytics import YOLO
+
+    exported = YOLO(weights).export(
+        format='onnx',
+        imgsz=OnnxPoseModel.INPUT_SIZE,
+        dynamic=True,
+        simplify=True
+    )
+    shutil.move(str(exported), target_path)
+    logger.info(f"Exported {weights} -> {target_path}")
+    return target_path
+
+
+def export_emotion_model(target_path: str) -> str:
+    """Export DeepFace's FER2013 emotion CNN to ONNX."""
+    import tensorflow as tf
+    import tf2onnx
+    from deepface import DeepFace
+
+    model = DeepFace.build_model('Emotion')
+    size = OnnxEmotionClassifier.INPUT_SIZE
+    tf2onnx.convert.from_keras(
+        model,
+        input_signature=[tf.TensorSpec((None, size, size, 1), tf.float32, name='face')],
+        opset=13,
+        output_path=target_path
+    )
+    logger.info(f"Exported DeepFace emotion model -> {target_path}")
+    return target_path
+
+
+# ━━━ Runtime wrappers ━━━
+
+def letterbox(image: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Resize keeping aspect ratio and pad to a square (YOLO preprocessing).
+
+    Returns:
+        (padded image, scale, (pad_x, pad_y))
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    padded = cv2.copyMakeBorder(
+        image, top, size - new_h - top, left, size - new_w - left,
+        cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+    return padded, scale, (left, top)
+
+
+def decode_pose_output(
+    output: np.ndarray,
+    scale: float,
+    pad: Tuple[float, float],
+    image_shape: Tuple[int, int],
+    conf_threshold: float = 0.25,
+    iou_threshold: float = 0.7,
+    max_detections: int = 300
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decode one image's raw YOLOv8-pose output.
+
+    Args:
+        output: (56, anchors) rows: cx, cy, w, h, score, 17 x (x, y, conf)
+        scale: Letterbox scale
+        pad: Letterbox padding (x, y)
+        image_shape: (height, width) of the source frame
+
+    Returns:
+        keypoints (N, 17, 2) and confidences (N, 17) in source pixels,
+        highest-scoring person first (same layout as ultralytics)
+    """
+    predictions = output.T
+    scores = predictions[:, 4]
+    candidates = predictions[scores > conf_threshold]
+    if len(candidates) == 0:
+        return np.zeros((0, 17, 2), dtype=np.float32), np.zeros((0, 17), dtype=np.float32)
+
+    boxes = candidates[:, :4].copy()
+    boxes[:, :2] -= boxes[:, 2:] / 2  # cx, cy, w, h -> x, y, w, h
+    keep = cv2.dnn.NMSBoxes(
+        boxes.tolist(), candidates[:, 4].tolist(), conf_threshold, iou_threshold
+    )
+    keep = np.asarray(keep, dtype=np.int64).reshape(-1)
+    keep = keep[np.argsort(-candidates[keep, 4])][:max_detections]
+
+    keypoints = candidates[keep, 5:].reshape(-1, 17, 3)
+    xy = (keypoints[..., :2] - np.asarray(pad, dtype=np.float32)) / scale
+    height, width = image_shape[:2]
+    np.clip(xy[..., 0], 0, width, out=xy[..., 0])
+    np.clip(xy[..., 1], 0, height, out=xy[..., 1])
+
+    return xy.astype(np.float32, copy=False), keypoints[..., 2].astype(np.float32, copy=False)
+
+
+class OnnxPoseModel:
+    """YOLOv8-pose running on ONNX Runtime (batched, CPU)."""
+
+    INPUT_SIZE = 640
+
+    def __init__(self, model_path: str):
+        """
+        Initialize OnnxPoseModel.
+
+        Args:
+            model_path: Exported (optionally quantized) model file
+        """
+        self.model_path = model_path
+        self.session = create_session(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, images: List[np.ndarray]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Run one batched forward pass.
+
+        Args:
+            images: BGR frames of any size
+
+        Returns:
+            (keypoints, confidences) per image, as decode_pose_output
+        """
+        letterboxed = [letterbox(image, self.INPUT_SIZE) for image in images]
+
+        # BGR HWC uint8 -> RGB NCHW float 0-1
+        batch = np.stack([padded for padded, _, _ in letterboxed])
+        batch = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+        batch /= 255.0
+
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+
+        return [
+            decode_pose_output(outputs[i], scale, pad, image.shape[:2])
+            for i, (image, (_, scale, pad)) in enumerate(zip(images, letterboxed))
+        ]
+
+
+class OnnxEmotionClassifier:
+    """
+    FER2013 emotion CNN running on ONNX Runtime.
+
+    predict() matches the Keras model's call, so it can stand in for
+    the classifier built by DeepFace.
+    """
+
+    INPUT_SIZE = 48
+
+    def __init__(self, model_path: str):
+        """
+        Initialize OnnxEmotionClassifier.
+
+        Args:
+            model_path: Exported (optionally quantized) model file
+        """
+        self.model_path = model_path
+        self.session = create_session(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """
+        Classify a batch of faces.
+
+        Args:
+            batch: (N, 48, 48, 1) float32 grayscale faces
+
+        Returns:
+            (N, 7) class probabilities
+        """
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+__all__ = [
+    'ONNX_AVAILABLE',
+    'backend_name',
+    'use_onnx',
+    'resolve_model',
+    'quantize_int8',
+    'export_pose_model',
+    'export_emotion_model',
+    'letterbox',
+    'decode_pose_output',
+    'OnnxPoseModel',
+    'OnnxEmotionClassifier'
+]
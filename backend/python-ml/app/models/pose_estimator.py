@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Shared Pose Estimator (YOLOv8)
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Single YOLOv8-pose model shared by every detector that needs keypoints:
+- FallDetector (posture / fall classification)
+- HealthStateDetector (fainting / sleep analysis)
+- IntruderDetector (behavior analysis)
+
+The model is loaded and warmed up once (on first use, or by the model
+registry at startup), and keypoints are memoized
+per frame, so one comprehensive-analysis request runs pose inference
+once no matter how many detectors consume it. Frames from concurrent
+requests are micro-batched into a single YOLO call.
+
+With INFERENCE_BACKEND=onnx the model runs on ONNX Runtime (optionally
+INT8-quantized) instead of PyTorch; see app.models.onnx_backend.
+
+Keypoints use the COCO-17 layout:
+0: nose, 1-2: eyes, 3-4: ears, 5-6: shoulders, 7-8: elbows,
+9-10: wrists, 11-12: hips, 13-14: knees, 15-16: ankles
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from app.models.model_registry import model_registry
+from app.models.onnx_backend import OnnxPoseModel, export_pose_model, resolve_model, use_onnx
+from app.utils.frame_context import FrameContext
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.model_loader import lazy_import
+
+# YOLOv8 (PyTorch) is imported on first model load, not at startup
+ultralytics = lazy_import('ultralytics')
+YOLO_AVAILABLE = ultralytics is not None
+if not YOLO_AVAILABLE:
+    logger.warning("YOLOv8 not available. Pose estimation disabled.")
+
+
+class PoseResult:
+    """
+    Keypoints for every person detected in a frame.
+
+    Attributes:
+        keypoints: (N, 17, 2) float32 pixel coordinates
+        confidences: (N, 17) float32 keypoint confidences
+        image_shape: (height, width) of the source frame
+    """
+
+    __slots__ = ('keypoints', 'confidences', 'image_shape')
+
+    def __init__(
+        self,
+        keypoints: np.ndarray,
+        confidences: Optional[np.ndarray] = None,
+        image_shape: tuple = (0, 0)
+    ):
+        self.keypoints = keypoints
+        self.confidences = confidences
+        self.image_shape = image_shape
+
+    @classmethod
+    def empty(cls, image_shape: tuple = (0, 0)) -> 'PoseResult':
+        """Result for a frame with no detected person."""
+        return cls(
+            np.zeros((0, 17, 2), dtype=np.float32),
+            np.zeros((0, 17), dtype=np.float32),
+            image_shape
+        )
+
+    @property
+    def num_persons(self) -> int:
+        """Number of detected persons."""
+        return int(self.keypoints.shape[0])
+
+    @property
+    def detected(self) -> bool:
+        """True if at least one person has non-zero keypoints."""
+        return self.num_persons > 0 and bool(np.any(self.keypoints[0]))
+
+    def primary(self) -> Optional[np.ndarray]:
+        """Keypoints (17, 2) of the first detected person."""
+        return self.keypoints[0] if self.detected else None
+
+    def face_boxes(self, min_confidence: float = 0.3) -> List[Tuple[int, int, int, int]]:
+        """
+        Square face regions derived from the head keypoints (0-4).
+
+        Needs at least two confident head keypoints per person; the box
+        size comes from the eye or ear distance, whichever is visible.
+
+        Args:
+            min_confidence: Minimum keypoint confidence to use a point
+
+        Returns:
+            (x1, y1, x2, y2) pixel boxes, one per person with a visible
+            face, in detection order
+        """
+        height, width = self.image_shape[:2]
+        boxes = []
+
+        for person in range(self.num_persons):
+            head = self.keypoints[person, :5]
+            conf = (
+                self.confidences[person, :5] if self.confidences is not None
+                else np.ones(5, dtype=np.float32)
+            )
+            visible = (conf >= min_confidence) & np.any(head != 0, axis=1)
+            if np.count_nonzero(visible) < 2:
+                continue
+
+            points = head[visible]
+            center_x, center_y = points.mean(axis=0)
+
+            # 1-2: eyes, 3-4: ears
+            if visible[1] and visible[2]:
+                side = 2.5 * float(np.linalg.norm(head[1] - head[2]))
+            elif visible[3] and visible[4]:
+                side = 1.4 * float(np.linalg.norm(head[3] - head[4]))
+            else:
+                side = 2.0 * float(np.ptp(points, axis=0).max())
+            side = max(side, 24.0)
+
+            x1 = int(max(0, center_x - side / 2))
+            y1 = int(max(0, center_y - side / 2))
+            x2 = int(min(width, center_x + side / 2))
+            y2 = int(min(height, center_y + side / 2))
+            if x2 - x1 >= 8 and y2 - y1 >= 8:
+                boxes.append((x1, y1, x2, y2))
+
+        return boxes
+
+
+class PoseEstimator:
+    """
+    Process-wide YOLOv8 pose model with per-frame memoization.
+
+    Concurrent requests for the same frame key are coalesced: the first
+    caller runs inference, the others wait for its result. Distinct
+    frames arriving within POSE_BATCH_WINDOW_MS of each other share one
+    batched model call (up to POSE_BATCH_MAX_SIZE frames).
+    """
+
+    MODEL_NAME = 'yolov8n-pose.pt'
+
+    def __init__(
+        self,
+        cache_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        batch_window_ms: Optional[float] = None
+    ):
+        """
+        Initialize PoseEstimator.
+
+        Args:
+            cache_size: Number of recent frames whose keypoints are kept
+            batch_size: Maximum frames per YOLO call (1 disables batching)
+            batch_window_ms: How long to wait for more frames to batch
+        """
+        self.cache_size = cache_size or int(os.getenv('POSE_CACHE_SIZE', 16))
+        self.backend = 'onnx' if use_onnx() else 'native'
+        self.is_available = YOLO_AVAILABLE or self.backend == 'onnx'
+        self.model = None
+
+        # Set to the InferenceWorkers pool when inference runs out of process
+        self.remote = None
+        # True while the model is left to inference worker processes
+        self.deferred = False
+
+        # Model loads on first use (or via the model registry)
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+        # YOLO predictors are not thread-safe; serialize model calls
+        self._model_lock = threading.Lock()
+
+        self._batcher = MicroBatcher(
+            name='pose',
+            batch_fn=self._infer_batch,
+            max_batch_size=batch_size or int(os.getenv('POSE_BATCH_MAX_SIZE', 8)),
+            window_ms=(
+                batch_window_ms if batch_window_ms is not None
+                else float(os.getenv('POSE_BATCH_WINDOW_MS', 10))
+            )
+        )
+
+        self._cache: 'OrderedDict[Hashable, PoseResult]' = OrderedDict()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._cache_lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+
+    def load(self):
+        """Load and warm up the model (once; later calls return at once)."""
+        with self._load_lock:
+            if self._loaded:
+                return
+
+            self.deferred = os.getenv('INFERENCE_TOPOLOGY', 'inprocess').lower() == 'workers'
+            if self.is_available and self.deferred:
+                logger.info("PoseEstimator: model is loaded by inference worker processes")
+            elif self.backend == 'onnx':
+                self._load_onnx()
+            elif self.is_available:
+                self._load_native()
+            else:
+                logger.warning("⚠️ PoseEstimator running without a model (YOLO Pose not installed)")
+
+            self._loaded = True
+
+    def _load_native(self):
+        """Load and warm up the ultralytics YOLO model."""
+        try:
+            self.model = ultralytics.YOLO(self.MODEL_NAME)
+            # Warm up
+            self.model.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+            logger.info("✅ PoseEstimator initialized with YOLOv8 Pose")
+        except Exception as e:
+            self.is_available = False
+            self.model = None
+            logger.error(f"PoseEstimator: failed to load {self.MODEL_NAME}: {e}")
+
+    def _load_onnx(self):
+        """Load the ONNX model (exporting it first if needed), else fall back."""
+        try:
+            path = resolve_model(
+                os.path.splitext(self.MODEL_NAME)[0],
+                (lambda target: export_pose_model(self.MODEL_NAME, target)) if YOLO_AVAILABLE else None
+            )
+            if path is None:
+                raise FileNotFoundError("no exported model and ultralytics is not installed")
+            self.model = OnnxPoseModel(path)
+            # Warm up
+            self.model.predict([np.zeros((64, 64, 3), dtype=np.uint8)])
+            logger.info(f"✅ PoseEstimator initialized with ONNX Runtime ({os.path.basename(path)})")
+        except Exception as e:
+            logger.error(f"PoseEstimator: ONNX backend unavailable ({e}); using native model")
+            self.backend = 'native'
+            self.model = None
+            self.is_available = YOLO_AVAILABLE
+            if self.is_available:
+                self._load_native()
+
+    def estimate(
+        self,
+        image: np.ndarray,
+        frame_key: Optional[Hashable] = None
+    ) -> PoseResult:
+        """
+        Get keypoints for a BGR frame, reusing cached results when possible.
+
+        Args:
+            image: BGR numpy array
+            frame_key: Identity of the frame (FrameContext.key);
+                None disables memoization
+
+        Returns:
+            PoseResult for the frame
+        """
+        if frame_key is None:
+            return self._infer(image)
+
+        with self._cache_lock:
+            cached = self._cache.get(frame_key)
+            if cached is not None:
+                self._cache.move_to_end(frame_key)
+                self._hits += 1
+                return cached
+
+            pending = self._in_flight.get(frame_key)
+            if pending is None:
+                pending = Future()
+                self._in_flight[frame_key] = pending
+                owner = True
+                self._misses += 1
+            else:
+                owner = False
+                self._hits += 1
+
+        if not owner:
+            return pending.result()
+
+        try:
+            result = self._infer(image)
+        except Exception as e:
+            with self._cache_lock:
+                self._in_flight.pop(frame_key, None)
+            pending.set_exception(e)
+            raise
+
+        with self._cache_lock:
+            self._in_flight.pop(frame_key, None)
+            self._cache[frame_key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        pending.set_result(result)
+        return result
+
+    def face_boxes(self, frame: FrameContext) -> List[Tuple[int, int, int, int]]:
+        """
+        Face regions for a frame from its (usually cached) pose keypoints.
+
+        Returns an empty list when no model is loaded or no head
+        keypoints are visible; callers then fall back to a face detector.
+        """
+        if not self._loaded:
+            self.load()
+        if self.model is None and self.remote is None and not self.deferred:
+            return []
+        return self.estimate(frame.bgr, frame_key=frame.key).face_boxes()
+
+    def _infer(self, image: np.ndarray) -> PoseResult:
+        """Run the YOLO model on one frame (via the micro-batcher)."""
+        if not self._loaded:
+            self.load()
+        if self.remote is None and self.deferred:
+            raise RuntimeError("INFERENCE_TOPOLOGY=workers but the inference workers are not running")
+        if self.model is None and self.remote is None:
+            return PoseResult.empty(tuple(image.shape[:2]))
+        return self._batcher.submit(image)
+
+    def _infer_batch(self, images: List[np.ndarray]) -> List[PoseResult]:
+        """Run the pose model once on a batch of frames."""
+        if self.remote is not None:
+            return self.remote.pose_batch(images)
+
+        if self.backend == 'onnx':
+            return [
+                PoseResult(keypoints, confidences, tuple(image.shape[:2]))
+                for image, (keypoints, confidences) in zip(images, self.model.predict(images))
+            ]
+
+        with self._model_lock:
+            results = self.model(images, verbose=False)
+
+        return [
+            self._to_pose_result(
+                results[i] if i < len(results) else None,
+                tuple(image.shape[:2])
+            )
+            for i, image in enumerate(images)
+        ]
+
+    @staticmethod
+    def _to_pose_result(result, image_shape: tuple) -> PoseResult:
+        """Convert one ultralytics Results object into a PoseResult."""
+        keypoints = getattr(result, 'keypoints', None) if result is not None else None
+        if keypoints is None or len(keypoints.xy) == 0 or len(keypoints.xy[0]) == 0:
+            return PoseResult.empty(image_shape)
+
+        xy = keypoints.xy.cpu().numpy().astype(np.float32, copy=False)
+        conf = keypoints.conf
+        conf = (
+            conf.cpu().numpy().astype(np.float32, copy=False)
+            if conf is not None else np.ones(xy.shape[:2], dtype=np.float32)
+        )
+        return PoseResult(xy, conf, image_shape)
+
+    def get_stats(self) -> Dict:
+        """Get memoization and batching counters."""
+        with self._cache_lock:
+            total = self._hits + self._misses
+            stats = {
+                'backend': self.backend,
+                'model_loaded': self.model is not None,
+                'remote': self.remote is not None,
+                'cached_frames': len(self._cache),
+                'cache_hits': self._hits,
+                'cache_misses': self._misses,
+                'hit_rate': round(self._hits / total, 3) if total else 0.0
+            }
+        stats['batching'] = self._batcher.get_stats()
+        return stats
+
+    def shutdown(self):
+        """Stop the batching thread."""
+        self._batcher.shutdown()
+
+
+# Create global instance for import
+pose_estimator = PoseEstimator()
+model_registry.register('pose', pose_estimator.load)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Per-User Pose History
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Fixed-size ring buffers of recent postures, one per elder.
+
+Each ring stores posture code, body angle, fall flag and timestamp in
+preallocated numpy arrays and keeps running counters (posture counts,
+posture changes, falls) that are updated on insert and eviction, so a
+movement-pattern summary is O(1) regardless of history length.
+
+The number of tracked users is bounded too: the least recently seen
+elder's ring is evicted first.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+import numpy as np
+
+
+# Posture codes stored in the ring buffers
+POSTURES = ('unknown', 'standing', 'sitting', 'lying', 'fallen')
+POSTURE_CODES = {name: code for code, name in enumerate(POSTURES)}
+
+
+class PoseHistory:
+    """Ring buffer of one user's recent postures with running counters."""
+
+    def __init__(self, capacity: int = 30):
+        """
+        Initialize PoseHistory.
+
+        Args:
+            capacity: Number of most recent frames kept
+        """
+        self.capacity = max(2, capacity)
+
+        self.postures = np.zeros(self.capacity, dtype=np.int8)
+        self.angles = np.zeros(self.capacity, dtype=np.float32)
+        self.falls = np.zeros(self.capacity, dtype=bool)
+        self.timestamps = np.zeros(self.capacity, dtype=np.float64)
+
+        self._start = 0
+        self.count = 0
+
+        # Running counters over the entries currently in the ring
+        self.posture_counts = np.zeros(len(POSTURES), dtype=np.int64)
+        self.posture_changes = 0
+        self.fall_events = 0
+
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        posture: str,
+        body_angle: float,
+        fall_detected: bool,
+        timestamp: Optional[float] = None
+    ):
+        """Add a frame, evicting the oldest one when full."""
+        code = POSTURE_CODES.get(posture, 0)
+
+        with self._lock:
+            if self.count == self.capacity:
+                self._evict_oldest()
+
+            if self.count > 0:
+                last = (self._start + self.count - 1) % self.capacity
+                if self.postures[last] != code:
+                    self.posture_changes += 1
+
+            index = (self._start + self.count) % self.capacity
+            self.postures[index] = code
+            self.angles[index] = body_angle
+            self.falls[index] = fall_detected
+            self.timestamps[index] = timestamp if timestamp is not None else time.time()
+            self.count += 1
+
+            self.posture_counts[code] += 1
+            self.fall_events += int(fall_detected)
+
+    def _evict_oldest(self):
+        """Drop the oldest entry and back its contribution out of the counters."""
+        oldest = self._start
+        following = (oldest + 1) % self.capacity
+
+        self.posture_counts[self.postures[oldest]] -= 1
+        self.fall_events -= int(self.falls[oldest])
+        if self.count > 1 and self.postures[oldest] != self.postures[following]:
+            self.posture_changes -= 1
+
+        self._start = following
+        self.count -= 1
+
+    def summary(self) -> Dict:
+        """Consistent snapshot of the running counters."""
+        with self._lock:
+            return {
+                'total': self.count,
+                'posture_counts': {
+                    name: int(self.posture_counts[code])
+                    for code, name in enumerate(POSTURES)
+                },
+                'posture_changes': self.posture_changes,
+                'fall_events': self.fall_events,
+                'last_timestamp': (
+                    float(self.timestamps[(self._start + self.count - 1) % self.capacity])
+                    if self.count else None
+                )
+            }
+
+    def ordered(self) -> Dict[str, np.ndarray]:
+        """Copy of the buffered frames, oldest first."""
+        with self._lock:
+            order = (self._start + np.arange(self.count)) % self.capacity
+            return {
+                'postures': self.postures[order],
+                'angles': self.angles[order],
+                'falls': self.falls[order],
+                'timestamps': self.timestamps[order]
+            }
+
+
+class PoseHistoryStore:
+    """
+    Bounded registry of per-user pose histories.
+
+    Configuration (environment):
+    - POSE_HISTORY_SIZE: frames kept per user
+    - POSE_HISTORY_MAX_USERS: users tracked before evicting the least recent
+    """
+
+    def __init__(self, capacity: Optional[int] = None, max_users: Optional[int] = None):
+        """
+        Initialize PoseHistoryStore.
+
+        Args:
+            capacity: Frames kept per user
+            max_users: Maximum number of users tracked
+        """
+        self.capacity = capacity or int(os.getenv('POSE_HISTORY_SIZE', 30))
+        self.max_users = max_users or int(os.getenv('POSE_HISTORY_MAX_USERS', 5000))
+
+        self._histories: 'OrderedDict[str, PoseHistory]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, create: bool = False) -> Optional[PoseHistory]:
+        """Get a user's history, optionally creating it."""
+        with self._lock:
+            history = self._histories.get(user_id)
+            if history is not None:
+                self._histories.move_to_end(user_id)
+            elif create:
+                history = PoseHistory(self.capacity)
+                self._histories[user_id] = history
+                while len(self._histories) > self.max_users:
+                    self._histories.popitem(last=False)
+            return history
+
+    def record(
+        self,
+        user_id: str,
+        posture: str,
+        body_angle: float,
+        fall_detected: bool,
+        timestamp: Optional[float] = None
+    ):
+        """Append a frame to a user's history."""
+        self.get(user_id, create=True).append(posture, body_angle, fall_detected, timestamp)
+
+    def __len__(self) -> int:
+        return len(self._histories)
+
+
+__all__ = [
+    'POSTURES',
+    'PoseHistory',
+    'PoseHistoryStore'
+]
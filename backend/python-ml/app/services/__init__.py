@@ -8,6 +8,13 @@ This package contains core services:
 - EmergencyDetector: Emergency situation detection
 - AlertService: Family notification system
 - DataAggregator: Firestore data fetching
+- UserDataCache: Per-user cache of aggregated Firestore data
+- DailyRollups: Per-user daily summary documents for risk windows
+- InferenceExecutor: Bounded per-model-family inference pools
+- CameraSessionManager: WebSocket camera stream sessions
+- MotionGate: Skips inference for static scenes
+- InferenceWorkers: Out-of-process model inference
+- ClipAnalyzer: Video clip analysis with adaptive frame sampling
 
 These services work together to provide comprehensive
 elderly care monitoring capabilities.
@@ -17,7 +24,14 @@ from app.services.vision_service import VisionService, vision_service
 from app.services.multi_modal_risk_predictor import MultiModalRiskPredictor, risk_predictor
 from app.services.emergency_detector import EmergencyDetector, emergency_detector
 from app.services.alert_service import AlertService, alert_service
-from app.services.data_aggregator import DataAggregator, data_aggregator
+from app.services.data_aggregator import DataAggregator, UserData, USER_DATA_SOURCES, data_aggregator
+from app.services.user_data_cache import UserDataCache
+from app.services.daily_rollups import DailyRollups, daily_rollups
+from app.services.inference_executor import InferenceExecutor, InferenceQueueFull, inference_executor
+from app.services.camera_session import CameraSession, CameraSessionManager, camera_sessions
+from app.services.motion_gate import MotionGate, motion_gate
+from app.services.inference_workers import InferenceWorkers, inference_workers
+from app.services.clip_analyzer import ClipAnalyzer, ClipDecodeError, clip_analyzer
 
 __all__ = [
     'VisionService',
@@ -29,5 +43,23 @@ __all__ = [
     'AlertService',
     'alert_service',
     'DataAggregator',
-    'data_aggregator'
+    'UserData',
+    'USER_DATA_SOURCES',
+    'data_aggregator',
+    'UserDataCache',
+    'DailyRollups',
+    'daily_rollups',
+    'InferenceExecutor',
+    'InferenceQueueFull',
+    'inference_executor',
+    'CameraSession',
+    'CameraSessionManager',
+    'camera_sessions',
+    'MotionGate',
+    'motion_gate',
+    'InferenceWorkers',
+    'inference_workers',
+    'ClipAnalyzer',
+    'ClipDecodeError',
+    'clip_analyzer'
 ]
@@ -23,10 +23,11 @@ from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from loguru import logger
 
+from app.utils.firebase_client import firebase_client, FirebaseClient
+
 # Firebase imports with fallback
 try:
-    import firebase_admin
-    from firebase_admin import credentials, messaging, firestore
+    from firebase_admin import messaging, firestore
     FIREBASE_AVAILABLE = True
 except ImportError:
     FIREBASE_AVAILABLE = False
@@ -53,25 +54,23 @@ class AlertService:
     ALERT_COOLDOWN_MINUTES = 30  # Minimum time between same alert type
     MAX_ALERTS_PER_HOUR = 10     # Maximum alerts per elder per hour
     
-    def __init__(self, initialize_firebase: bool = True):
+    def __init__(self, initialize_firebase: bool = True, firebase: Optional[FirebaseClient] = None):
         """
         Initialize AlertService with Firebase and Twilio.
         
         Args:
-            initialize_firebase: Whether to initialize Firebase connection
+            initialize_firebase: Whether to use Firebase (False: mock alerts)
+            firebase: Firestore / FCM access layer (default: the shared client)
         """
-        self.firebase_initialized = False
+        self.firebase = firebase or firebase_client
+        self.firebase_initialized = initialize_firebase and self.firebase.is_available
         self.twilio_initialized = False
-        self.db = None
         self.twilio_client = None
         self.twilio_phone = None
         
         # Alert history for rate limiting (in-memory cache)
         self.alert_history: Dict[str, List[datetime]] = {}
         
-        if initialize_firebase and FIREBASE_AVAILABLE:
-            self._initialize_firebase()
-        
         if TWILIO_AVAILABLE:
             self._initialize_twilio()
         
@@ -79,50 +78,6 @@ class AlertService:
         logger.info(f"   Firebase: {'enabled' if self.firebase_initialized else 'disabled'}")
         logger.info(f"   Twilio: {'enabled' if self.twilio_initialized else 'disabled'}")
     
-    def _initialize_firebase(self):
-        """Initialize Firebase Admin SDK."""
-        try:
-            # Check if already initialized
-            try:
-                firebase_admin.get_app()
-                self.firebase_initialized = True
-                self.db = firestore.client()
-                return
-            except ValueError:
-                pass  # App not initialized yet
-            
-            # Try environment-based initialization
-            project_id = os.getenv('FIREBASE_PROJECT_ID')
-            private_key = os.getenv('FIREBASE_PRIVATE_KEY', '').replace('\\n', '\n')
-            client_email = os.getenv('FIREBASE_CLIENT_EMAIL')
-            
-            if project_id and private_key and client_email:
-                cred = credentials.Certificate({
-                    'type': 'service_account',
-                    'project_id': project_id,
-                    'private_key': private_key,
-                    'client_email': client_email,
-                    'token_uri': 'https://oauth2.googleapis.com/token'
-                })
-                firebase_admin.initialize_app(cred)
-                self.db = firestore.client()
-                self.firebase_initialized = True
-                logger.info("Firebase initialized from environment variables")
-            else:
-                # Try service account file
-                service_account_path = os.getenv('FIREBASE_SERVICE_ACCOUNT_PATH')
-                if service_account_path and os.path.exists(service_account_path):
-                    cred = credentials.Certificate(service_account_path)
-                    firebase_admin.initialize_app(cred)
-                    self.db = firestore.client()
-                    self.firebase_initialized = True
-                    logger.info(f"Firebase initialized from {service_account_path}")
-                else:
-                    logger.warning("Firebase credentials not found. FCM disabled.")
-                    
-        except Exception as e:
-            logger.error(f"Firebase initialization error: {e}")
-    
     def _initialize_twilio(self):
         """Initialize Twilio client."""
         try:
@@ -369,7 +324,7 @@ class AlertService:
         results: Dict
     ):
         """Log alert to Firestore for audit trail."""
-        if not self.firebase_initialized or not self.db:
+        if not self.firebase_initialized:
             logger.debug("Firestore not available. Skipping alert log.")
             return
         
@@ -387,7 +342,7 @@ class AlertService:
                 'acknowledged': False
             }
             
-            self.db.collection('alerts').add(alert_doc)
+            await self.firebase.add_document('alerts', alert_doc)
             logger.debug("Alert logged to Firestore")
             
         except Exception as e:
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Camera Sessions
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Per-connection state for cameras streaming frames over WebSocket.
+
+A session keeps only the latest frame a camera has sent: if frames
+arrive faster than the server analyzes them (or faster than the
+session's target FPS), older frames are dropped instead of queued, so
+results always describe what the camera sees now.
+"""
+
+import os
+import asyncio
+import math
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+from loguru import logger
+
+from app.utils.frame_context import FrameContext
+
+
+class CameraSession:
+    """
+    State for one streaming camera connection.
+
+    Frame-rate control is server side: next_frame() never returns
+    frames more often than `fps` per second.
+    """
+
+    def __init__(self, user_id: str, fps: float = 2.0, camera_id: Optional[str] = None):
+        """
+        Initialize CameraSession.
+
+        Args:
+            user_id: Elder user ID the camera belongs to
+            fps: Maximum frames analyzed per second
+            camera_id: Client-supplied camera identifier
+        """
+        self.session_id = str(uuid.uuid4())
+        self.user_id = user_id
+        self.camera_id = camera_id or self.session_id
+        self.started_at = datetime.now()
+
+        self.fps = fps
+        self._pending: Optional[FrameContext] = None
+        self._frame_ready = asyncio.Event()
+        self._last_analysis = 0.0
+
+        self.frames_received = 0
+        self.frames_analyzed = 0
+        self.frames_dropped = 0
+        self.alerts_sent = 0
+        self.last_result: Optional[Dict] = None
+
+    @property
+    def fps(self) -> float:
+        """Target analysis rate in frames per second."""
+        return self._fps
+
+    @fps.setter
+    def fps(self, value: float):
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError(f"fps must be finite, got {value}")
+        self._fps = min(max(value, 0.1), CameraSessionManager.MAX_FPS)
+
+    def offer(self, frame: FrameContext):
+        """Hand the session a new frame, replacing any unanalyzed one."""
+        self.frames_received += 1
+        if self._pending is not None:
+            self.frames_dropped += 1
+        self._pending = frame
+        self._frame_ready.set()
+
+    async def next_frame(self) -> FrameContext:
+        """Wait for the next frame to analyze, honouring the target FPS."""
+        while True:
+            await self._frame_ready.wait()
+
+            delay = self._last_analysis + 1.0 / self.fps - time.monotonic()
+            if delay > 0:
+                # Newer frames arriving meanwhile replace the pending one
+                await asyncio.sleep(delay)
+
+            frame = self._pending
+            self._pending = None
+            self._frame_ready.clear()
+            if frame is not None:
+                self._last_analysis = time.monotonic()
+                return frame
+
+    def record(self, result: Dict):
+        """Store the latest analysis result."""
+        self.frames_analyzed += 1
+        self.last_result = result
+        if result.get('alerts'):
+            self.alerts_sent += 1
+
+    def get_stats(self) -> Dict:
+        """Get session counters."""
+        return {
+            'session_id': self.session_id,
+            'user_id': self.user_id,
+            'camera_id': self.camera_id,
+            'fps': self.fps,
+            'started_at': self.started_at.isoformat(),
+            'frames_received': self.frames_received,
+            'frames_analyzed': self.frames_analyzed,
+            'frames_dropped': self.frames_dropped,
+            'alerts_sent': self.alerts_sent
+        }
+
+
+class CameraSessionManager:
+    """
+    Registry of open camera sessions.
+
+    Configuration (environment):
+    - CAMERA_STREAM_FPS: default analysis rate per camera
+    - CAMERA_STREAM_MAX_FPS: upper bound clients may request
+    """
+
+    MAX_FPS = float(os.getenv('CAMERA_STREAM_MAX_FPS', 10))
+
+    def __init__(self):
+        """Initialize CameraSessionManager."""
+        self.default_fps = float(os.getenv('CAMERA_STREAM_FPS', 2))
+        self.sessions: Dict[str, CameraSession] = {}
+
+    def valid_fps(self, fps) -> bool:
+        """Whether a client-requested rate is a finite number in (0, MAX_FPS]."""
+        # bool is an int subclass
+        if not isinstance(fps, (int, float)) or isinstance(fps, bool):
+            return False
+        return math.isfinite(fps) and 0 < fps <= self.MAX_FPS
+
+    def open(
+        self,
+        user_id: str,
+        fps: Optional[float] = None,
+        camera_id: Optional[str] = None
+    ) -> CameraSession:
+        """Create and register a session for a newly connected camera."""
+        session = CameraSession(user_id, fps or self.default_fps, camera_id)
+        self.sessions[session.session_id] = session
+        logger.info(f"📹 Camera session opened: {session.camera_id} (user {user_id}, {session.fps} fps)")
+        return session
+
+    def close(self, session: CameraSession):
+        """Unregister a session when its camera disconnects."""
+        self.sessions.pop(session.session_id, None)
+        logger.info(
+            f"📹 Camera session closed: {session.camera_id} "
+            f"({session.frames_analyzed} analyzed, {session.frames_dropped} dropped)"
+        )
+
+    def get_stats(self) -> Dict:
+        """Get open session counts."""
+        return {
+            'open_sessions': len(self.sessions),
+            'sessions': [session.get_stats() for session in self.sessions.values()]
+        }
+
+
+# Create global instance for import
+camera_sessions = CameraSessionManager()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Video Clip Analyzer
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Analyzes short motion-triggered camera clips (webm / mp4).
+
+The clip is decoded frame by frame with OpenCV; only one decoded frame
+plus the current analysis batch is held in memory, whatever the clip
+length. Frames are sampled adaptively: every CLIP_MOTION_INTERVAL_S a
+frame is checked against the last analyzed one (motion gate
+thumbnail); it is analyzed if the scene changed, or if
+CLIP_SAMPLE_INTERVAL_S passed without a sample. Still scenes cost one
+frame per second, movement (a fall) is covered densely.
+
+Sampled frames go through the usual pose / emotion pools in batches of
+CLIP_BATCH_SIZE, so the micro-batchers fold them into batched model
+calls. Clips share those pools with live cameras: at most
+CLIP_MAX_IN_FLIGHT clip frames (across all clips) are in the pools at
+once, and a frame rejected by a full pool is retried with backoff; one
+that stays rejected is marked skipped instead of failing the clip. The
+result is a per-sample timeline plus clip-level fall and emotion
+verdicts.
+"""
+
+import os
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import cv2
+from loguru import logger
+
+from app.services.inference_executor import inference_executor, InferenceQueueFull
+from app.services.motion_gate import MotionGate
+from app.services.vision_service import vision_service
+from app.utils.frame_context import FrameContext
+
+
+# (timestamp seconds, frame index, frame, motion score)
+ClipSample = Tuple[float, int, FrameContext, float]
+
+DISTRESS_ORDER = ['low', 'medium', 'high', 'critical']
+SEVERITY_ORDER = {'critical': 3, 'high': 2, 'medium': 1, 'low': 0}
+
+
+class ClipDecodeError(ValueError):
+    """Raised when a clip cannot be opened as video."""
+
+
+class _ClipReader:
+    """Streaming decoder yielding adaptively sampled frames."""
+
+    def __init__(self, path: str, analyzer: 'ClipAnalyzer'):
+        self.analyzer = analyzer
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            self.capture.release()
+            raise ClipDecodeError("Could not decode video clip")
+
+        # Container FPS is unreliable for webm; only a fallback for timestamps
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 0 < fps <= 240 else 25.0
+
+        self.frames_read = 0
+        self.duration_s = 0.0
+        self._samples = self._iterate()
+
+    def _timestamp(self, index: int) -> float:
+        """Presentation time of the frame just grabbed, in seconds."""
+        position = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+        return position / 1000.0 if position > 0 or index == 0 else index / self.fps
+
+    def _iterate(self) -> Iterator[ClipSample]:
+        analyzer = self.analyzer
+        last_check: Optional[float] = None
+        last_sample: Optional[float] = None
+        reference = None
+        # Half a frame of slack: timestamps land on frame boundaries
+        slack = 0.5 / self.fps
+
+        # grab() advances without converting the frame; only frames
+        # that are checked for motion are retrieved as BGR arrays
+        while self.capture.grab():
+            index = self.frames_read
+            self.frames_read += 1
+            t = self._timestamp(index)
+            self.duration_s = max(self.duration_s, t)
+
+            if last_check is not None and t - last_check < analyzer.motion_interval_s - slack:
+                continue
+            last_check = t
+
+            ok, bgr = self.capture.retrieve()
+            if not ok:
+                continue
+            frame = FrameContext.from_array(bgr)
+
+            thumbnail = analyzer.motion.thumbnail(frame)
+            score = 1.0 if reference is None else analyzer.motion.motion_score(thumbnail, reference)
+            due = last_sample is None or t - last_sample >= analyzer.sample_interval_s - slack
+
+            if score > analyzer.motion_threshold or due:
+                reference = thumbnail
+                last_sample = t
+                yield t, index, frame, score
+
+    def take(self, count: int) -> List[ClipSample]:
+        """Decode until `count` more samples are ready (blocking)."""
+        batch = []
+        for sample in self._samples:
+            batch.append(sample)
+            if len(batch) >= count:
+                break
+        return batch
+
+    def close(self):
+        """Release the decoder."""
+        self._samples.close()
+        self.capture.release()
+
+
+class ClipAnalyzer:
+    """
+    Adaptive-sampling analyzer for uploaded video clips.
+
+    Configuration (environment):
+    - CLIP_SAMPLE_INTERVAL_S: seconds between samples in a still scene
+    - CLIP_MOTION_INTERVAL_S: seconds between motion checks (and samples
+      while the scene keeps changing)
+    - CLIP_MOTION_THRESHOLD: changed-pixel share that counts as motion
+    - CLIP_BATCH_SIZE: sampled frames decoded ahead per batch
+    - CLIP_MAX_IN_FLIGHT: clip frames in the inference pools at once,
+      across all clips (default: half the pose / emotion workers)
+    - CLIP_QUEUE_RETRIES: retries of a frame rejected by a full pool
+    - CLIP_MAX_SAMPLES: most frames analyzed per clip
+    - CLIP_MAX_MB: largest accepted upload
+    """
+
+    # First retry delay after a full pool; doubles per attempt
+    RETRY_BACKOFF_S = 0.1
+
+    def __init__(
+        self,
+        sample_interval_s: Optional[float] = None,
+        motion_interval_s: Optional[float] = None,
+        motion_threshold: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_samples: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        queue_retries: Optional[int] = None
+    ):
+        """
+        Initialize ClipAnalyzer.
+
+        Args:
+            sample_interval_s: Longest gap between samples
+            motion_interval_s: Gap between motion checks
+            motion_threshold: Changed-pixel share (0-1) that counts as motion
+            batch_size: Samples decoded ahead per batch
+            max_samples: Most samples analyzed per clip
+            max_in_flight: Clip frames in the inference pools at once
+            queue_retries: Retries of a frame rejected by a full pool
+        """
+        self.sample_interval_s = sample_interval_s or float(os.getenv('CLIP_SAMPLE_INTERVAL_S', 1.0))
+        self.motion_interval_s = motion_interval_s or float(os.getenv('CLIP_MOTION_INTERVAL_S', 0.2))
+        self.motion_threshold = (
+            motion_threshold if motion_threshold is not None
+            else float(os.getenv('CLIP_MOTION_THRESHOLD', 0.02))
+        )
+        self.batch_size = batch_size or int(os.getenv('CLIP_BATCH_SIZE', 8))
+        self.max_samples = max_samples or int(os.getenv('CLIP_MAX_SAMPLES', 300))
+        self.max_bytes = int(float(os.getenv('CLIP_MAX_MB', 100)) * 1024 * 1024)
+
+        # Clips are background work: leave most pool capacity to live cameras
+        pool_workers = min(
+            inference_executor.pool('pose').workers,
+            inference_executor.pool('emotion').workers
+        )
+        self.max_in_flight = max_in_flight or int(
+            os.getenv('CLIP_MAX_IN_FLIGHT', max(1, pool_workers // 2))
+        )
+        self.queue_retries = (
+            queue_retries if queue_retries is not None
+            else int(os.getenv('CLIP_QUEUE_RETRIES', 5))
+        )
+        # Created per event loop on first use
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Thumbnail / motion score helpers shared with the camera motion gate
+        self.motion = MotionGate(enabled=True, threshold=self.motion_threshold)
+
+        logger.info(
+            f"✅ ClipAnalyzer initialized (sample every {self.sample_interval_s}s, "
+            f"{self.motion_interval_s}s on motion, batch {self.batch_size}, "
+            f"{self.max_in_flight} in flight)"
+        )
+
+    def _in_flight_slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding clip frames in the pools (shared by all clips)."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _analyze_sample(
+        self,
+        frame: FrameContext,
+        detect_emotion: bool,
+        detect_fall: bool
+    ) -> Optional[Dict]:
+        """
+        Analyze one sampled frame in the clip lane.
+
+        Returns:
+            The analysis, or None if the pools stayed full through every retry
+        """
+        async with self._in_flight_slots():
+            for attempt in range(self.queue_retries + 1):
+                try:
+                    return await vision_service.analyze_frame(
+                        frame,
+                        user_id=None,
+                        detect_emotion=detect_emotion,
+                        detect_fall=detect_fall
+                    )
+                except InferenceQueueFull as e:
+                    if attempt == self.queue_retries:
+                        logger.warning(f"Skipping clip frame: {e}")
+                        return None
+                    await asyncio.sleep(self.RETRY_BACKOFF_S * 2 ** attempt)
+
+    async def analyze_clip(
+        self,
+        path: str,
+        user_id: str,
+        detect_emotion: bool = True,
+        detect_fall: bool = True
+    ) -> Dict:
+        """
+        Analyze a clip file.
+
+        Args:
+            path: Video file on disk (streamed, never read whole)
+            user_id: Elder user ID
+            detect_emotion: Whether to run emotion detection
+            detect_fall: Whether to run fall detection
+
+        Returns:
+            Clip metadata, per-sample timeline and aggregated verdicts
+
+        Raises:
+            ClipDecodeError: If the file is not a decodable video
+        """
+        reader = await asyncio.to_thread(_ClipReader, path, self)
+        timeline: List[Dict] = []
+        emotion_totals: Counter = Counter()
+        truncated = False
+        skipped = 0
+
+        try:
+            while len(timeline) < self.max_samples:
+                count = min(self.batch_size, self.max_samples - len(timeline))
+                batch = await asyncio.to_thread(reader.take, count)
+                if not batch:
+                    break
+
+                # Concurrent calls are folded into batched model runs
+                results = await asyncio.gather(*(
+                    self._analyze_sample(frame, detect_emotion, detect_fall)
+                    for _, _, frame, _ in batch
+                ))
+
+                for (t, index, _, score), result in zip(batch, results):
+                    timeline.append(self._timeline_entry(t, index, score, result))
+                    if result is None:
+                        skipped += 1
+                        continue
+                    emotion = result.get('emotion') or {}
+                    if emotion.get('face_detected'):
+                        emotion_totals.update(emotion.get('all_emotions', {}))
+            else:
+                # Hit max_samples: truncated only if the clip had more to sample
+                truncated = bool(await asyncio.to_thread(reader.take, 1))
+        finally:
+            await asyncio.to_thread(reader.close)
+
+        if not timeline and reader.frames_read == 0:
+            raise ClipDecodeError("Clip contains no decodable frames")
+
+        fall = self._fall_verdict(timeline)
+        emotion = self._emotion_verdict(timeline, emotion_totals)
+
+        return {
+            'user_id': user_id,
+            'clip': {
+                'duration_s': round(reader.duration_s, 2),
+                'fps': round(reader.fps, 2),
+                'frames_decoded': reader.frames_read,
+                'frames_sampled': len(timeline),
+                'frames_skipped': skipped,
+                'truncated': truncated
+            },
+            'timeline': timeline,
+            'fall': fall,
+            'emotion': emotion,
+            # Flat view in the shape EmergencyDetector expects
+            'verdict': {
+                'fall_detected': fall['fall_detected'],
+                'distress_level': emotion['distress_level'],
+                'pain_detected': emotion['pain_frames'] > 0,
+                'pain_expression_count': emotion['pain_frames']
+            },
+            'alert': self._clip_alert(timeline),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    @staticmethod
+    def _timeline_entry(t: float, index: int, score: float, result: Optional[Dict]) -> Dict:
+        """Compact per-sample record (result None: skipped, pools were full)."""
+        skipped = result is None
+        result = result or {}
+        pose = result.get('pose') or {}
+        emotion = result.get('emotion') or {}
+        face = bool(emotion.get('face_detected'))
+        alert = result.get('alert')
+
+        return {
+            't': round(t, 2),
+            'frame': index,
+            'motion': round(score, 4),
+            'posture': pose.get('posture'),
+            'fall_detected': bool(pose.get('fall_detected')),
+            'fall_confidence': pose.get('confidence'),
+            'emotion': emotion.get('emotion') if face else None,
+            'emotion_confidence': emotion.get('confidence') if face else None,
+            'emotion_score': emotion.get('emotion_score') if face else None,
+            'distress_level': emotion.get('distress_level') if face else None,
+            'pain_detected': bool(emotion.get('pain_detected')),
+            'alert': alert,
+            'skipped': skipped
+        }
+
+    @staticmethod
+    def _fall_verdict(timeline: List[Dict]) -> Dict:
+        """Clip-level fall verdict."""
+        falls = [entry for entry in timeline if entry['fall_detected']]
+        postures = Counter(entry['posture'] for entry in timeline if entry['posture'])
+
+        return {
+            'fall_detected': bool(falls),
+            'fall_frames': len(falls),
+            'first_fall_at_s': falls[0]['t'] if falls else None,
+            'max_confidence': max((entry['fall_confidence'] or 0.0 for entry in falls), default=0.0),
+            'posture_counts': dict(postures)
+        }
+
+    @staticmethod
+    def _emotion_verdict(timeline: List[Dict], emotion_totals: Counter) -> Dict:
+        """Clip-level emotion verdict (mean emotion distribution over faces)."""
+        faces = [entry for entry in timeline if entry['emotion'] is not None]
+        distress = [entry['distress_level'] for entry in faces if entry['distress_level'] in DISTRESS_ORDER]
+
+        mean_emotions = {
+            label: round(total / len(faces), 3) for label, total in emotion_totals.items()
+        } if faces else {}
+
+        return {
+            'dominant_emotion': max(mean_emotions, key=mean_emotions.get) if mean_emotions else None,
+            'all_emotions': mean_emotions,
+            'avg_emotion_score': (
+                round(sum(entry['emotion_score'] or 0.0 for entry in faces) / len(faces), 3)
+                if faces else None
+            ),
+            'face_frames': len(faces),
+            'pain_frames': sum(1 for entry in timeline if entry['pain_detected']),
+            'distress_level': max(distress, key=DISTRESS_ORDER.index) if distress else 'low'
+        }
+
+    @staticmethod
+    def _clip_alert(timeline: List[Dict]) -> Optional[Dict]:
+        """Highest-severity sample alert, with the time it occurred."""
+        alerts = [
+            {**entry['alert'], 't': entry['t']}
+            for entry in timeline if entry['alert']
+        ]
+        if not alerts:
+            return None
+        return max(alerts, key=lambda alert: SEVERITY_ORDER.get(alert.get('severity'), 0))
+
+
+# Create global instance for import
+clip_analyzer = ClipAnalyzer()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Daily Rollups
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Per-user, per-day summaries of the raw collections behind risk
+assessment (chats, moods, vision_logs, activities, medicines, alerts).
+
+One small document per elder and UTC day in `dailyRollups`
+({userId}_{YYYY-MM-DD}) holds mergeable counters: sentiment sum and
+count, keyword hits, sad / happy moods, falls / distress / pain,
+camera gaps, meals, sleep and doses. A 30-day risk window reads at
+most 30 of them instead of every raw document.
+
+Rollups are maintained when read:
+- missing days are computed from the raw documents;
+- today only folds in documents timestamped after the rollup's
+  `through` mark, so a late upload stamped earlier in the day is
+  missed until the day closes;
+- a closed day is recomputed from its start on every read while it is
+  within DAILY_ROLLUP_GRACE_H, picking up such late uploads, and once
+  the grace period is over one last time, then marked final.
+A day's document is always rewritten whole and derived only from raw
+data, so repeating or racing a recomputation is harmless.
+"""
+
+import os
+import asyncio
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from app.utils.firebase_client import firebase_client, FirebaseClient
+
+
+ROLLUP_COLLECTION = 'dailyRollups'
+ROLLUP_VERSION = 1
+
+# Raw collection -> field holding the elder's user ID
+SOURCE_COLLECTIONS = {
+    'chats': 'userId',
+    'moods': 'userId',
+    'vision_logs': 'userId',
+    'activities': 'userId',
+    'medicines': 'userId',
+    'alerts': 'elderId'
+}
+
+# Fields each raw collection is read with (projection): the fold
+# never needs e.g. a chat's aiResponse text
+SOURCE_FIELDS = {
+    'chats': ['timestamp', 'sentiment.score', 'userMessage'],
+    'moods': ['timestamp', 'score'],
+    'vision_logs': ['timestamp', 'emotionScore', 'fallDetected', 'distressLevel', 'painDetected'],
+    'activities': ['timestamp', 'type', 'data.sleepHours'],
+    'medicines': ['timestamp', 'taken'],
+    'alerts': ['timestamp', 'type']
+}
+
+LONELY_KEYWORDS = ["alone", "lonely", "nobody", "no one", "isolated", "miss", "wish someone"]
+HEALTH_KEYWORDS = [
+    "pain", "hurt", "ache", "sick", "ill", "doctor", "medicine", "hospital",
+    "dizzy", "weak", "tired", "can't breathe", "chest pain"
+]
+
+
+def empty_summary() -> Dict:
+    """Counters for a day without documents."""
+    return {
+        'chat': {'sentiment_sum': 0.0, 'messages': 0, 'lonely_mentions': 0, 'health_complaints': 0},
+        'mood': {'sad': 0, 'happy': 0, 'logs': 0},
+        'vision': {
+            'emotion_sum': 0.0, 'logs': 0, 'falls': 0, 'distress': 0, 'pain': 0,
+            # Epoch seconds of the first / last log and the longest gap between logs
+            'first_at': None, 'last_at': None, 'max_gap_s': 0.0
+        },
+        'activity': {'meals': 0, 'sleep_hours_sum': 0.0, 'sleep_logs': 0, 'movements': 0},
+        'health': {'doses': 0, 'doses_taken': 0, 'emergency_presses': 0}
+    }
+
+
+def to_epoch(value) -> Optional[float]:
+    """Epoch seconds of a Firestore timestamp (naive datetimes are UTC)."""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def fold_document(summary: Dict, collection: str, data: Dict) -> Dict:
+    """
+    Add one raw document to a summary (in place).
+
+    Vision logs must be folded in timestamp order for the gap counters.
+
+    Args:
+        summary: Counters from empty_summary()
+        collection: Raw collection the document came from
+        data: Document data
+
+    Returns:
+        The same summary
+    """
+    if collection == 'chats':
+        chat = summary['chat']
+        sentiment = data.get('sentiment', {})
+        chat['sentiment_sum'] += sentiment.get('score', 0) if isinstance(sentiment, dict) else 0
+        chat['messages'] += 1
+
+        text = data.get('userMessage', '').lower()
+        # Counted once per message
+        if any(keyword in text for keyword in LONELY_KEYWORDS):
+            chat['lonely_mentions'] += 1
+        if any(keyword in text for keyword in HEALTH_KEYWORDS):
+            chat['health_complaints'] += 1
+
+    elif collection == 'moods':
+        mood = summary['mood']
+        mood['logs'] += 1
+        score = data.get('score', 0)
+        if score == -1:
+            mood['sad'] += 1
+        elif score == 1:
+            mood['happy'] += 1
+
+    elif collection == 'vision_logs':
+        vision = summary['vision']
+        vision['emotion_sum'] += data.get('emotionScore', 0)
+        vision['logs'] += 1
+        vision['falls'] += bool(data.get('fallDetected'))
+        vision['distress'] += data.get('distressLevel') in ['high', 'critical']
+        vision['pain'] += bool(data.get('painDetected'))
+
+        t = to_epoch(data.get('timestamp'))
+        if t is not None:
+            if vision['last_at'] is not None:
+                vision['max_gap_s'] = max(vision['max_gap_s'], t - vision['last_at'])
+            if vision['first_at'] is None:
+                vision['first_at'] = t
+            vision['last_at'] = t
+
+    elif collection == 'activities':
+        activity = summary['activity']
+        kind = data.get('type')
+        if kind == 'eating':
+            activity['meals'] += 1
+        elif kind == 'sleeping':
+            activity['sleep_hours_sum'] += (data.get('data') or {}).get('sleepHours', 0)
+            activity['sleep_logs'] += 1
+        elif kind == 'movement':
+            activity['movements'] += 1
+
+    elif collection == 'medicines':
+        health = summary['health']
+        health['doses'] += 1
+        health['doses_taken'] += bool(data.get('taken'))
+
+    elif collection == 'alerts':
+        if data.get('type') == 'emergency_button':
+            summary['health']['emergency_presses'] += 1
+
+    return summary
+
+
+def merge_summaries(earlier: Dict, later: Dict) -> Dict:
+    """Combine two summaries; every document of `later` is newer than those of `earlier`."""
+    merged = empty_summary()
+    for section, counters in merged.items():
+        for name in counters:
+            if name not in ('first_at', 'last_at', 'max_gap_s'):
+                counters[name] = earlier[section][name] + later[section][name]
+
+    a, b, vision = earlier['vision'], later['vision'], merged['vision']
+    vision['max_gap_s'] = max(a['max_gap_s'], b['max_gap_s'])
+    if a['last_at'] is not None and b['first_at'] is not None:
+        vision['max_gap_s'] = max(vision['max_gap_s'], b['first_at'] - a['last_at'])
+    vision['first_at'] = a['first_at'] if a['first_at'] is not None else b['first_at']
+    vision['last_at'] = b['last_at'] if b['last_at'] is not None else a['last_at']
+    return merged
+
+
+def window_metrics(summaries: List[Dict], days: int, now: Optional[datetime] = None) -> Dict:
+    """
+    Risk inputs for a window of day summaries (oldest first).
+
+    Returns:
+        {'chat': {...}, 'mood': {...}, 'vision': {...}, 'activity': {...},
+         'health': {...}} in DataAggregator's fetch_* formats
+    """
+    now = now or datetime.now(timezone.utc)
+    total = empty_summary()
+    mood_days = meal_days = 0
+    for summary in summaries:
+        total = merge_summaries(total, summary)
+        mood_days += summary['mood']['logs'] > 0
+        meal_days += summary['activity']['meals'] > 0
+
+    chat, mood, vision = total['chat'], total['mood'], total['vision']
+    activity, health = total['activity'], total['health']
+
+    # Camera inactivity: longest gap between logs, or since the last one
+    if vision['logs'] and vision['last_at'] is not None:
+        max_gap_hours = max(vision['max_gap_s'], to_epoch(now) - vision['last_at']) / 3600
+    else:
+        max_gap_hours = days * 24.0
+
+    # Eating: 3 meals a day is ideal
+    expected_meals = days * 3
+    eating_irregularity = max(0.0, 1.0 - activity['meals'] / expected_meals) if expected_meals > 0 else 1.0
+
+    # Sleep: 7-9 hours scores 1.0
+    avg_sleep = activity['sleep_hours_sum'] / activity['sleep_logs'] if activity['sleep_logs'] else 0
+    sleep_quality = 0.0
+    if 7 <= avg_sleep <= 9:
+        sleep_quality = 1.0
+    elif avg_sleep > 0:
+        sleep_quality = max(0.0, 1.0 - (abs(8 - avg_sleep) / 8))
+
+    return {
+        'chat': {
+            'avg_sentiment': round(chat['sentiment_sum'] / chat['messages'], 3) if chat['messages'] else 0.0,
+            'lonely_mentions': chat['lonely_mentions'],
+            'health_complaints': chat['health_complaints'],
+            'message_count': chat['messages']
+        },
+        'mood': {
+            'sad_count': mood['sad'],
+            'happy_count': mood['happy'],
+            'inactive_days': max(0, days - mood_days)
+        },
+        'vision': {
+            'emotion_score': round(vision['emotion_sum'] / vision['logs'], 3) if vision['logs'] else 0.0,
+            'fall_count': vision['falls'],
+            'distress_count': vision['distress'],
+            'pain_count': vision['pain'],
+            'inactivity_hours': round(max_gap_hours, 2)
+        },
+        'activity': {
+            'eating_irregularity': round(eating_irregularity, 2),
+            'sleep_quality': round(sleep_quality, 2),
+            'days_without_eating': max(0, days - meal_days),
+            'max_inactivity_hours': 0.0,
+            # Individual logs are not kept in rollups
+            'meal_logs': [],
+            'sleep_logs': [],
+            'activity_logs': []
+        },
+        'health': {
+            'medicine_missed': health['doses'] - health['doses_taken'],
+            'medicine_adherence': round(health['doses_taken'] / health['doses'], 2) if health['doses'] else 1.0,
+            'emergency_presses': health['emergency_presses']
+        }
+    }
+
+
+def day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """[start, end) of a UTC day."""
+    start = datetime.combine(day, dt_time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+class DailyRollups:
+    """
+    Maintains and reads per-user daily rollup documents.
+
+    Configuration (environment):
+    - DAILY_ROLLUPS_ENABLED: serve risk inputs from daily rollups
+      instead of scanning raw documents (off by default: the composite
+      indexes in firestore.indexes.json must be deployed first)
+    - DAILY_ROLLUP_GRACE_H: hours after a UTC day ends during which late
+      documents are still folded in before the day is finalized
+    """
+
+    def __init__(
+        self,
+        firebase: Optional[FirebaseClient] = None,
+        enabled: Optional[bool] = None,
+        grace_h: Optional[float] = None
+    ):
+        """
+        Initialize DailyRollups.
+
+        Args:
+            firebase: Firestore access layer (default: the shared client)
+            enabled: Whether DataAggregator reads rollups
+            grace_h: Late-upload window after a day ends
+        """
+        self.firebase = firebase or firebase_client
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv('DAILY_ROLLUPS_ENABLED', 'false').lower() == 'true'
+        )
+        self.grace = timedelta(hours=grace_h if grace_h is not None else float(os.getenv('DAILY_ROLLUP_GRACE_H', 6)))
+
+        self._days_read = 0
+        self._days_recomputed = 0
+        self._days_incremental = 0
+
+    async def window(self, user_id: str, days: int, now: Optional[datetime] = None) -> Dict:
+        """
+        Risk inputs for the last `days` UTC days (today included).
+
+        Returns:
+            Metrics per source (see window_metrics)
+        """
+        now = now or datetime.now(timezone.utc)
+        summaries = await self.day_summaries(user_id, days, now)
+        return window_metrics(summaries, days, now)
+
+    async def day_summaries(self, user_id: str, days: int, now: Optional[datetime] = None) -> List[Dict]:
+        """
+        Up-to-date summaries for the last `days` UTC days, oldest first.
+
+        Stored rollups are read with one query; days that are missing,
+        open or due for finalization are brought up to date and written back.
+        """
+        now = now or datetime.now(timezone.utc)
+        today = now.astimezone(timezone.utc).date()
+        dates = [today - timedelta(days=offset) for offset in range(max(1, days) - 1, -1, -1)]
+
+        stored = {
+            doc['date']: doc for doc in await self.firebase.query(
+                ROLLUP_COLLECTION,
+                [('userId', '==', user_id), ('date', '>=', dates[0].isoformat())]
+            )
+        }
+        self._days_read += len(stored)
+
+        # (day, fold from, fold until, summary to extend or None for a full recompute)
+        updates = []
+        for day in dates:
+            doc = stored.get(day.isoformat())
+            if doc is not None and doc.get('final') and doc.get('version') == ROLLUP_VERSION:
+                continue
+
+            start, end = day_bounds(day)
+            until = min(now, end)
+            # Only the open day is extended; a closed day in its grace
+            # period is re-read from its start for late uploads
+            if doc is not None and doc.get('version') == ROLLUP_VERSION and now < end and doc.get('through'):
+                updates.append((day, doc['through'], until, doc['summary']))
+            else:
+                updates.append((day, start, until, None))
+
+        if updates:
+            fresh = await self._update_days(user_id, updates, now)
+            for day, doc in fresh.items():
+                stored[day.isoformat()] = doc
+
+        return [
+            stored[day.isoformat()]['summary'] if day.isoformat() in stored else empty_summary()
+            for day in dates
+        ]
+
+    async def rebuild(self, user_id: str, days: int, now: Optional[datetime] = None) -> int:
+        """
+        Recompute the last `days` days from raw documents, ignoring stored rollups.
+
+        Returns:
+            Number of days written
+        """
+        now = now or datetime.now(timezone.utc)
+        today = now.astimezone(timezone.utc).date()
+        updates = []
+        for offset in range(max(1, days)):
+            day = today - timedelta(days=offset)
+            start, end = day_bounds(day)
+            updates.append((day, start, min(now, end), None))
+        return len(await self._update_days(user_id, updates, now))
+
+    async def _update_days(self, user_id: str, updates: List[Tuple], now: datetime) -> Dict[date, Dict]:
+        """Fold raw documents into the given days and write their rollups."""
+        # (from, until, summary) per day; documents are folded as they stream in
+        targets = [(to_epoch(start), to_epoch(until), empty_summary()) for _, start, until, _ in updates]
+        span_start = min(update[1] for update in updates)
+        span_end = max(update[2] for update in updates)
+
+        # One query per raw collection covers every day being updated
+        await asyncio.gather(*(
+            self._fold_collection(user_id, collection, span_start, span_end, targets)
+            for collection in SOURCE_COLLECTIONS
+        ))
+
+        written = {}
+        for (day, _, until, base), (_, _, summary) in zip(updates, targets):
+            if base is not None:
+                summary = merge_summaries(base, summary)
+                self._days_incremental += 1
+            else:
+                self._days_recomputed += 1
+
+            _, end = day_bounds(day)
+            written[day] = {
+                'userId': user_id,
+                'date': day.isoformat(),
+                'version': ROLLUP_VERSION,
+                'summary': summary,
+                'through': until,
+                # Only a full recompute after the grace period is final
+                'final': base is None and now >= end + self.grace,
+                'computedAt': now
+            }
+
+        await asyncio.gather(*(
+            self.firebase.set_document(ROLLUP_COLLECTION, f"{user_id}_{day.isoformat()}", doc)
+            for day, doc in written.items()
+        ))
+        logger.debug(f"Rolled up {len(written)} day(s) for {user_id}")
+        return written
+
+    async def _fold_collection(
+        self,
+        user_id: str,
+        collection: str,
+        start: datetime,
+        end: datetime,
+        targets: List[Tuple[float, float, Dict]]
+    ):
+        """Stream a collection's documents in [start, end), oldest first, into the day targets."""
+        async for data in self.firebase.stream(
+            collection,
+            [
+                (SOURCE_COLLECTIONS[collection], '==', user_id),
+                ('timestamp', '>=', start),
+                ('timestamp', '<', end)
+            ],
+            order_by='timestamp',
+            fields=SOURCE_FIELDS[collection]
+        ):
+            timestamp = to_epoch(data.get('timestamp'))
+            if timestamp is None:
+                continue
+            for lo, hi, summary in targets:
+                if lo <= timestamp < hi:
+                    fold_document(summary, collection, data)
+                    break
+
+    def get_stats(self) -> Dict:
+        """Rollup days read and recomputed."""
+        return {
+            'enabled': self.enabled,
+            'days_read': self._days_read,
+            'days_recomputed': self._days_recomputed,
+            'days_incremental': self._days_incremental
+        }
+
+
+# Create global instance for import
+daily_rollups = DailyRollups()
+
+
+__all__ = [
+    'DailyRollups',
+    'daily_rollups',
+    'empty_summary',
+    'fold_document',
+    'merge_summaries',
+    'window_metrics',
+    'ROLLUP_COLLECTION',
+    'SOURCE_COLLECTIONS',
+    'SOURCE_FIELDS'
+]
@@ -6,23 +6,55 @@ PART 9: DATA AGGREGATOR SERVICE
 
 Fetches and aggregates ALL user data from Firestore for risk prediction.
 This service bridges the ML models with the database.
+
+Callers that need only part of it pass `sources=`: the alert path
+reads just the profile (one document), emergency checks just activity
+and health.
+
+With daily rollups enabled, chat, mood, vision, activity and health
+come from per-day summary documents (see daily_rollups) rather than a
+scan of every raw document in the window.
 """
 
-import os
 import asyncio
-from typing import Dict, List, Optional, Any, Union
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Any, Tuple, TypedDict, Union
+from datetime import date, datetime, timedelta, timezone
 from loguru import logger
 
-# Firebase imports with fallback
-try:
-    import firebase_admin
-    from firebase_admin import credentials, firestore
-    from google.cloud.firestore_v1 import FieldFilter
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
-    logger.warning("Firebase Admin SDK not available. Using mock data.")
+from app.services.daily_rollups import (
+    DailyRollups, daily_rollups, empty_summary, fold_document, to_epoch, window_metrics,
+    SOURCE_COLLECTIONS, SOURCE_FIELDS
+)
+from app.services.user_data_cache import UserDataCache
+from app.utils.firebase_client import firebase_client, FirebaseClient
+
+
+# Sources fetch_user_data can load; 'profile' fills elder_name and family_members
+USER_DATA_SOURCES: Tuple[str, ...] = (
+    'profile', 'chat', 'mood', 'vision', 'activity', 'health', 'events', 'risk_history'
+)
+
+
+# Sources served from daily rollups when enabled
+ROLLUP_SOURCES = ('chat', 'mood', 'vision', 'activity', 'health')
+
+# Profile fields fetch_user_data reads (see _source_fields)
+PROFILE_FIELDS = ['fullName', 'connectedFamily']
+
+
+class UserData(TypedDict, total=False):
+    """fetch_user_data result: only the requested sources' keys are present."""
+    elder_name: str
+    family_members: List[str]
+    chat: Dict
+    mood: Dict
+    vision: Dict
+    activity: Dict
+    health: Dict
+    events: List[Dict]
+    risk_history: List[Dict]
+    period_days: int
+    fetched_at: str
 
 
 class DataAggregator:
@@ -30,513 +62,276 @@ class DataAggregator:
     Data aggregator for multi-modal risk assessment.
     
     Fetches data from multiple sources in Firestore and
-    prepares it for the risk prediction model.
+    prepares it for the risk prediction model. Queries go through
+    the process-wide async Firestore client, so concurrent users
+    cost awaiting coroutines rather than executor threads.
+    
+    Each source is cached per user (UserDataCache); writes made
+    through record_risk_score / flag_emergency invalidate what
+    they change.
     """
     
-    def __init__(self, initialize_firebase: bool = True):
+    def __init__(
+        self,
+        initialize_firebase: bool = True,
+        firebase: Optional[FirebaseClient] = None,
+        cache: Optional[UserDataCache] = None,
+        rollups: Optional[DailyRollups] = None
+    ):
         """
         Initialize DataAggregator.
         
         Args:
-            initialize_firebase: Whether to initialize Firebase connection
+            initialize_firebase: Whether to use Firebase (False: mock data)
+            firebase: Firestore access layer (default: the shared client)
+            cache: Per-user source cache (default: configured from environment)
+            rollups: Daily rollup reader (default: the shared one for the shared client)
         """
-        self.firebase_initialized = False
-        self.db = None
-        
-        if initialize_firebase and FIREBASE_AVAILABLE:
-            self._initialize_firebase()
+        self.firebase = firebase or firebase_client
+        self.firebase_initialized = initialize_firebase and self.firebase.is_available
+        self.cache = cache or UserDataCache()
+        self.rollups = rollups or (daily_rollups if firebase is None else DailyRollups(firebase=self.firebase))
         
         logger.info(f"✅ DataAggregator initialized (Firebase: {self.firebase_initialized})")
     
-    def _initialize_firebase(self):
-        """Initialize Firebase Admin SDK."""
-        try:
-            # Check if already initialized
-            try:
-                app = firebase_admin.get_app()
-                self.db = firestore.client()
-                self.firebase_initialized = True
-                return
-            except ValueError:
-                pass
-            
-            # Environment-based initialization
-            project_id = os.getenv('FIREBASE_PROJECT_ID')
-            private_key = os.getenv('FIREBASE_PRIVATE_KEY', '').replace('\\n', '\n')
-            client_email = os.getenv('FIREBASE_CLIENT_EMAIL')
-            
-            if project_id and private_key and client_email:
-                cred = credentials.Certificate({
-                    'type': 'service_account',
-                    'project_id': project_id,
-                    'private_key': private_key,
-                    'client_email': client_email,
-                    'token_uri': 'https://oauth2.googleapis.com/token'
-                })
-                firebase_admin.initialize_app(cred)
-                self.db = firestore.client()
-                self.firebase_initialized = True
-            else:
-                logger.warning("Firebase credentials not found")
-                
-        except Exception as e:
-            logger.error(f"Firebase initialization error: {e}")
-    
     async def fetch_user_data(
         self,
         user_id: str,
-        days: int = 7
-    ) -> Dict[str, Any]:
+        days: int = 7,
+        sources: Optional[Iterable[str]] = None
+    ) -> UserData:
         """
-        Fetch all user data for risk assessment using parallel queries.
+        Fetch user data for risk assessment using parallel queries.
         
         Args:
             user_id: Elder's user ID
             days: Number of days to look back
+            sources: Sources to load (default: all of USER_DATA_SOURCES)
             
         Returns:
-            Dict containing aggregated data from all sources
+            Aggregated data for the requested sources, plus
+            period_days and fetched_at
+            
+        Raises:
+            ValueError: If an unknown source is requested
         """
+        wanted = self._resolve_sources(sources)
+        
         if not self.firebase_initialized:
             logger.debug(f"Using mock data for user {user_id}")
-            return self._get_mock_data(user_id, days)
+            return self._get_mock_data(user_id, days, wanted)
         
         start_time = datetime.now()
         try:
             cutoff_date = datetime.now() - timedelta(days=days)
             
-            # 1. Fetch User Profile first (we might need family info)
-            user_profile = await self._fetch_user_profile(user_id)
+            # (loader, cache variant) per source
+            loaders = {
+                'profile': (lambda: self._read_user_profile(user_id, PROFILE_FIELDS), None),
+                'chat': (lambda: self.fetch_chat_data(user_id, days), days),
+                'mood': (lambda: self.fetch_mood_data(user_id, days), days),
+                'vision': (lambda: self.fetch_vision_data(user_id, days), days),
+                'activity': (lambda: self.fetch_activity_data(user_id, days), days),
+                'health': (lambda: self.fetch_health_data(user_id, days), days),
+                'events': (lambda: self._fetch_recent_events(user_id, cutoff_date), days),
+                'risk_history': (lambda: self._fetch_risk_history(user_id), None)
+            }
+            if self.rollups.enabled:
+                for source in ROLLUP_SOURCES:
+                    loaders[source] = (lambda source=source: self._rollup_source(user_id, days, source), days)
             
-            # 2. Parallel fetch for all other collections
+            # Every source is served from the cache when fresh; misses
+            # and refreshes run in parallel
             results = await asyncio.gather(
-                self.fetch_chat_data(user_id, days),
-                self.fetch_mood_data(user_id, days),
-                self.fetch_vision_data(user_id, days),
-                self.fetch_activity_data(user_id, days),
-                self.fetch_health_data(user_id, days),
-                self._fetch_recent_events(user_id, cutoff_date),
-                self._fetch_risk_history(user_id),
+                *(self.cache.get(user_id, source, *loaders[source]) for source in wanted),
                 return_exceptions=True
             )
             
-            # Unpack results
-            chat_data = results[0] if not isinstance(results[0], Exception) else self._get_default_chat_data()
-            mood_data = results[1] if not isinstance(results[1], Exception) else self._get_default_mood_data()
-            vision_data = results[2] if not isinstance(results[2], Exception) else self._get_default_vision_data()
-            activity_data = results[3] if not isinstance(results[3], Exception) else self._get_default_activity_data()
-            health_data = results[4] if not isinstance(results[4], Exception) else self._get_default_health_data()
-            events = results[5] if not isinstance(results[5], Exception) else []
-            risk_history = results[6] if not isinstance(results[6], Exception) else []
-            
-            # Log any exceptions
-            for i, res in enumerate(results):
-                if isinstance(res, Exception):
-                    logger.error(f"Error in parallel fetch index {i}: {res}")
+            data: UserData = {}
+            for source, result in zip(wanted, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error fetching {source} data for {user_id}: {result}")
+                    result = self._default_source(source)
+                data.update(self._source_fields(source, result))
 
             duration_ms = (datetime.now() - start_time).microseconds / 1000
-            logger.info(f"Data fetch for {user_id} completed in {duration_ms}ms")
+            logger.info(f"Data fetch for {user_id} ({', '.join(wanted)}) completed in {duration_ms}ms")
 
-            return {
-                'elder_name': user_profile.get('fullName', 'Elder'),
-                'family_members': user_profile.get('connectedFamily', []),
-                'chat': chat_data,
-                'mood': mood_data,
-                'vision': vision_data,
-                'activity': activity_data,
-                'health': health_data,
-                'events': events,
-                'risk_history': risk_history,
-                'period_days': days,
-                'fetched_at': datetime.now().isoformat()
-            }
+            data['period_days'] = days
+            data['fetched_at'] = datetime.now().isoformat()
+            return data
             
         except Exception as e:
             logger.error(f"Critical error fetching user data: {e}")
-            return self._get_mock_data(user_id, days)
+            return self._get_mock_data(user_id, days, wanted)
+
+    async def _rollup_source(self, user_id: str, days: int, source: str) -> Dict:
+        """One source's metrics from the user's daily rollups (one shared read per window)."""
+        window = await self.cache.get(
+            user_id, 'rollups', lambda: self.rollups.window(user_id, days), days
+        )
+        return window[source]
+
+    @staticmethod
+    def _resolve_sources(sources: Optional[Iterable[str]]) -> Tuple[str, ...]:
+        """Validate requested sources, in USER_DATA_SOURCES order."""
+        if sources is None:
+            return USER_DATA_SOURCES
+        
+        requested = set(sources)
+        unknown = requested.difference(USER_DATA_SOURCES)
+        if unknown:
+            raise ValueError(f"Unknown user data sources: {', '.join(sorted(unknown))}")
+        return tuple(source for source in USER_DATA_SOURCES if source in requested)
+
+    @staticmethod
+    def _source_fields(source: str, value: Any) -> UserData:
+        """Result keys a loaded source fills."""
+        if source == 'profile':
+            return {
+                'elder_name': value.get('fullName', 'Elder'),
+                'family_members': value.get('connectedFamily', [])
+            }
+        return {source: value}
+
+    def _default_source(self, source: str) -> Any:
+        """Fallback value for a source that failed to load."""
+        defaults = {
+            'profile': dict,
+            'chat': self._get_default_chat_data,
+            'mood': self._get_default_mood_data,
+            'vision': self._get_default_vision_data,
+            'activity': self._get_default_activity_data,
+            'health': self._get_default_health_data,
+            'events': list,
+            'risk_history': list
+        }
+        return defaults[source]()
+
+    async def _read_user_profile(self, user_id: str, fields: Optional[List[str]] = None) -> Dict:
+        """Read the user profile document, or only `fields` of it (raises on Firestore errors)."""
+        return await self.firebase.get_document('users', user_id, fields=fields) or {}
 
     async def _fetch_user_profile(self, user_id: str) -> Dict:
         """Fetch user profile document."""
         try:
-            doc = self.db.collection('users').document(user_id).get()
-            if doc.exists:
-                return doc.to_dict()
-            return {}
+            return await self._read_user_profile(user_id)
         except Exception as e:
             logger.error(f"Error fetching user profile: {e}")
             return {}
 
+    async def record_risk_score(self, user_id: str, risk_doc: Dict, profile_fields: Dict):
+        """
+        Save a risk assessment: riskScores history plus the profile's latest risk.
+        
+        Args:
+            user_id: Elder user ID
+            risk_doc: riskScores document
+            profile_fields: Fields to update on the user profile
+        """
+        try:
+            await self.firebase.add_document('riskScores', risk_doc)
+            await self.firebase.update_document('users', user_id, profile_fields)
+        finally:
+            self.cache.invalidate(user_id, ['risk_history', 'profile'])
+    
+    async def flag_emergency(self, user_id: str, emergency_fields: Dict):
+        """
+        Set emergency flags on the user profile (isEmergency, emergencyType, ...).
+        
+        Only the cached profile is dropped: other sources stay cached
+        so a camera alerting on every frame does not refetch them.
+        """
+        try:
+            await self.firebase.update_document('users', user_id, emergency_fields)
+        finally:
+            self.cache.invalidate(user_id, ['profile'])
+    
+    def invalidate(self, user_id: str, sources: Optional[List[str]] = None):
+        """Drop a user's cached sources (all by default) after an external write."""
+        self.cache.invalidate(user_id, sources)
+    
     async def fetch_family_members(self, user_id: str) -> List[str]:
         """Fetch list of family member UIDs."""
         profile = await self._fetch_user_profile(user_id)
         return profile.get('connectedFamily', [])
 
     async def fetch_chat_data(self, user_id: str, days: int) -> Dict:
-        """
-        Query Firestore chats collection and calculate metrics.
-        """
+        """Query Firestore chats collection and calculate metrics."""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            # Note: Assuming chats are stored as subcollections primarily or root collection
-            # Based on requirements: "CHATS COLLECTION: Query: WHERE userId == elderId"
-            # Adjusting query to likely root collection 'chats' with userId filter or similar.
-            # Usually chat apps have 'chats/{chatId}/messages'.
-            # Requirement says "CHATS COLLECTION... Query: WHERE userId == elderId". 
-            # This implies a flattened structure or specific query. 
-            # I will assume a 'chats' collection where documents are messages OR conversations.
-            # Requirement mentions "userMessage", "aiResponse". This sounds like message level.
-            # But normally you don't scan ALL messages in root. 
-            # I will try to query 'chats' collection where 'userId' == user_id. 
-            # If that fails, I might fallback to subcollections if I knew the structure better.
-            # Assuming 'chats' is a collection of message logs for the bot interaction.
-            
-            messages_ref = self.db.collection('chats')
-            query = (
-                messages_ref
-                .where(filter=FieldFilter('userId', '==', user_id))
-                .where(filter=FieldFilter('timestamp', '>=', cutoff_date))
-                .order_by('timestamp', direction='DESCENDING')
-            )
-            
-            # Stream all messages
-            # Note: stream() is blocking in some versions, but in async context with google-cloud-firestore
-            # we should ideally use the async client. 
-            # For now, running in thread executor if needed, but standard calls are synchronous in the sync client.
-            # The 'firestore.client()' returns a sync client. 
-            # To be truly async, we'd need AsyncClient. 
-            # However, for simplicity in this generated file (and typical usage in these envs), 
-            # we will assume standard sync client wrapped or just use it (will block event loop slightly).
-            # To strictly follow "Parallel queries", we should wrap in run_in_executor if client is sync.
-            
-            # Creating a sync wrapper for thread execution
-            def _query_sync():
-                return list(query.stream())
-
-            loop = asyncio.get_event_loop()
-            messages = await loop.run_in_executor(None, _query_sync)
-            
-            sentiments = []
-            lonely_mentions = 0
-            health_complaints = 0
-            
-            lonely_keywords = ["alone", "lonely", "nobody", "no one", "isolated", "miss", "wish someone"]
-            health_keywords = ["pain", "hurt", "ache", "sick", "ill", "doctor", "medicine", "hospital", "dizzy", "weak", "tired", "can't breathe", "chest pain"]
-            
-            for msg in messages:
-                data = msg.to_dict()
-                
-                # Sentiment
-                # Structure: sentiment{score, label}
-                sentiment_data = data.get('sentiment', {})
-                if isinstance(sentiment_data, dict):
-                    score = sentiment_data.get('score', 0)
-                else:
-                    score = 0 # Default or parsing error
-                sentiments.append(score)
-                
-                # Keywords in userMessage
-                text = data.get('userMessage', '').lower()
-                
-                for k in lonely_keywords:
-                    if k in text:
-                        lonely_mentions += 1
-                        break # Count once per message
-                
-                for k in health_keywords:
-                    if k in text:
-                        health_complaints += 1
-                        break
-            
-            avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0.0
-            
-            return {
-                'avg_sentiment': round(avg_sentiment, 3),
-                'lonely_mentions': lonely_mentions,
-                'health_complaints': health_complaints,
-                'message_count': len(sentiments)
-            }
-            
+            return (await self._fold_window(user_id, days, ['chats']))['chat']
         except Exception as e:
             logger.error(f"Error fetching chat data: {e}")
-            return self._get_default_chat_data()
+            raise
 
     async def fetch_mood_data(self, user_id: str, days: int) -> Dict:
         """Query Firestore moods collection."""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            def _query_sync():
-                return list(
-                    self.db.collection('moods')
-                    .where(filter=FieldFilter('userId', '==', user_id))
-                    .where(filter=FieldFilter('timestamp', '>=', cutoff_date))
-                    .order_by('timestamp', direction='DESCENDING')
-                    .stream()
-                )
-            
-            loop = asyncio.get_event_loop()
-            moods = await loop.run_in_executor(None, _query_sync)
-            
-            sad_count = 0
-            happy_count = 0
-            mood_dates = set()
-            
-            for m in moods:
-                data = m.to_dict()
-                score = data.get('score', 0)
-                # Timestamp to date
-                ts = data.get('timestamp')
-                if isinstance(ts, datetime):
-                    mood_dates.add(ts.date())
-                
-                if score == -1:
-                    sad_count += 1
-                elif score == 1:
-                    happy_count += 1
-            
-            # Inactive days calculation
-            # Unique dates in 7 day window
-            today = datetime.now().date()
-            expected_dates = {today - timedelta(days=i) for i in range(days)}
-            # Find which expected dates are missing
-            # (Simplification: just count total unique dates found vs days)
-            # Requirements say: "Count days in 7-day window WITHOUT mood logs"
-            inactive_days_count = max(0, days - len(mood_dates))
-            
-            return {
-                'sad_count': sad_count,
-                'happy_count': happy_count,
-                'inactive_days': inactive_days_count
-            }
-            
+            return (await self._fold_window(user_id, days, ['moods']))['mood']
         except Exception as e:
             logger.error(f"Error fetching mood data: {e}")
-            return self._get_default_mood_data()
+            raise
 
     async def fetch_vision_data(self, user_id: str, days: int) -> Dict:
         """Query Firestore vision_logs collection."""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            def _query_sync():
-                return list(
-                    self.db.collection('vision_logs')
-                    .where(filter=FieldFilter('userId', '==', user_id))
-                    .where(filter=FieldFilter('timestamp', '>=', cutoff_date))
-                    # .order_by('timestamp', direction='DESCENDING') # Composite index might be needed
-                    .stream()
-                )
-            
-            loop = asyncio.get_event_loop()
-            logs = await loop.run_in_executor(None, _query_sync)
-            
-            # Sort locally if index missing or just to be safe for gap calculation
-            logs_data = [l.to_dict() for l in logs]
-            # Filter out items without timestamp just in case
-            logs_data = [d for d in logs_data if d.get('timestamp')]
-            logs_data.sort(key=lambda x: x['timestamp'], reverse=False) # Ascending for gap check
-            
-            emotion_scores = []
-            fall_count = 0
-            distress_count = 0
-            pain_expression_count = 0
-            
-            for data in logs_data:
-                score = data.get('emotionScore', 0)
-                emotion_scores.append(score)
-                
-                if data.get('fallDetected'):
-                    fall_count += 1
-                
-                if data.get('distressLevel') in ['high', 'critical']:
-                    distress_count += 1
-                    
-                if data.get('painDetected'):
-                    pain_expression_count += 1
-            
-            # Camera inactivity (longest gap)
-            max_gap_hours = 0.0
-            if logs_data:
-                # Add "now" as the final point to check gap from last log
-                timestamps = [d['timestamp'].timestamp() for d in logs_data]
-                timestamps.append(datetime.now().timestamp())
-                
-                for i in range(1, len(timestamps)):
-                    diff = timestamps[i] - timestamps[i-1]
-                    gap_hours = diff / 3600
-                    if gap_hours > max_gap_hours:
-                        max_gap_hours = gap_hours
-            else:
-                max_gap_hours = days * 24.0 # No logs at all
-            
-            avg_emotion = sum(emotion_scores) / len(emotion_scores) if emotion_scores else 0.0
-            
-            return {
-                'emotion_score': round(avg_emotion, 3),
-                'fall_count': fall_count,
-                'distress_count': distress_count,
-                'pain_count': pain_expression_count,
-                'inactivity_hours': round(max_gap_hours, 2)
-            }
-            
+            return (await self._fold_window(user_id, days, ['vision_logs']))['vision']
         except Exception as e:
             logger.error(f"Error fetching vision data: {e}")
-            return self._get_default_vision_data()
+            raise
 
     async def fetch_activity_data(self, user_id: str, days: int) -> Dict:
         """Query Firestore activities collection."""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            
-            def _query_sync():
-                return list(
-                    self.db.collection('activities')
-                    .where(filter=FieldFilter('userId', '==', user_id))
-                    .where(filter=FieldFilter('timestamp', '>=', cutoff_date))
-                    .stream()
-                )
-            
-            loop = asyncio.get_event_loop()
-            activities = await loop.run_in_executor(None, _query_sync)
-            
-            meal_logs = []
-            sleep_logs = []
-            activity_logs = []
-            
-            for act in activities:
-                data = act.to_dict()
-                atype = data.get('type')
-                adata = data.get('data', {})
-                timestamp = data.get('timestamp')
-                
-                if atype == 'eating':
-                     # Extract meal logs
-                     meal_logs.append({
-                         'timestamp': timestamp,
-                         'mealType': adata.get('mealType', 'unknown')
-                     })
-                elif atype == 'sleeping':
-                    # Extract sleep logs
-                    sleep_logs.append({
-                        'date': timestamp, # Or data.get('date')
-                        'sleepHours': adata.get('sleepHours', 0),
-                        'interruptions': adata.get('interruptions', 0)
-                    })
-                elif atype == 'movement':
-                    activity_logs.append({
-                        'timestamp': timestamp,
-                        'activityDetected': adata.get('activityDetected')
-                    })
-            
-            # metrics
-            # 1. Eating irregularity (Placeholder logic matching requirements)
-            # "Pass to ActivityAnalyzer" -> We'll do simplified logic here
-            meal_dates = set()
-            for m in meal_logs:
-                if isinstance(m['timestamp'], datetime):
-                    meal_dates.add(m['timestamp'].date())
-            
-            days_without_eating = max(0, days - len(meal_dates))
-            
-            # Simple irregularity metric: 1 - (meals / (days * 3))
-            # Assuming 3 meals a day is ideal
-            expected_total_meals = days * 3
-            actual_meals = len(meal_logs)
-            eating_irregularity = 1.0
-            if expected_total_meals > 0:
-                eating_irregularity = max(0.0, 1.0 - (actual_meals / expected_total_meals))
-            
-            # 2. Sleep quality
-            total_sleep = sum(s['sleepHours'] for s in sleep_logs)
-            avg_sleep = total_sleep / len(sleep_logs) if sleep_logs else 0
-            # Simple score: normalized around 7-8 hours.
-            # If 7-9, score 1.0. Else penalize.
-            sleep_quality = 0.0
-            if 7 <= avg_sleep <= 9:
-                sleep_quality = 1.0
-            elif avg_sleep > 0:
-                sleep_quality = max(0.0, 1.0 - (abs(8 - avg_sleep) / 8))
-            
-            # Activity max inactivity
-            max_inactivity_hours = 0.0 
-            # (Could derive from movement logs similar to vision logs, but 
-            # requirement description only listed specific metrics for this section)
-            
-            return {
-                'eating_irregularity': round(eating_irregularity, 2),
-                'sleep_quality': round(sleep_quality, 2),
-                'days_without_eating': days_without_eating,
-                'max_inactivity_hours': 0.0, # Placeholder or calc if needed
-                'meal_logs': meal_logs,
-                'sleep_logs': sleep_logs,
-                'activity_logs': activity_logs
-            }
-            
+            return (await self._fold_window(user_id, days, ['activities']))['activity']
         except Exception as e:
             logger.error(f"Error fetching activity data: {e}")
-            return self._get_default_activity_data()
+            raise
 
     async def fetch_health_data(self, user_id: str, days: int) -> Dict:
         """Query medicines and alerts."""
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-            loop = asyncio.get_event_loop()
-            
-            # Parallel query for medicines and alerts
-            def _query_medicines():
-                return list(
-                    self.db.collection('medicines')
-                    .where(filter=FieldFilter('userId', '==', user_id))
-                    .where(filter=FieldFilter('timestamp', '>=', cutoff_date))
-                    .stream()
-                )
-            
-            def _query_alerts():
-                # 'ALERTS' collection
-                return list(
-                     self.db.collection('alerts')
-                    .where(filter=FieldFilter('elderId', '==', user_id))
-                    .where(filter=FieldFilter('timestamp', '>=', cutoff_date))
-                    .stream()
-                )
-
-            medicines, alerts = await asyncio.gather(
-                loop.run_in_executor(None, _query_medicines),
-                loop.run_in_executor(None, _query_alerts)
-            )
-            
-            # Medicine calculations
-            medicine_missed = 0
-            scheduled_count = 0
-            taken_count = 0
-            
-            for med in medicines:
-                data = med.to_dict()
-                scheduled_count += 1
-                if data.get('taken'):
-                    taken_count += 1
-                else:
-                    medicine_missed += 1
-            
-            adherence = taken_count / scheduled_count if scheduled_count > 0 else 1.0
-            
-            # Alerts calculations
-            emergency_presses = 0
-            for alert in alerts:
-                data = alert.to_dict()
-                if data.get('type') == 'emergency_button':
-                    emergency_presses += 1
-            
-            return {
-                'medicine_missed': medicine_missed,
-                'medicine_adherence': round(adherence, 2),
-                'emergency_presses': emergency_presses
-            }
-            
+            return (await self._fold_window(user_id, days, ['medicines', 'alerts']))['health']
         except Exception as e:
             logger.error(f"Error fetching health data: {e}")
-            return self._get_default_health_data()
+            raise
+
+    async def _fold_window(self, user_id: str, days: int, collections: List[str]) -> Dict:
+        """
+        Stream raw collections over the last `days` days into metrics.
+        
+        Only the fields the metrics use are read (SOURCE_FIELDS), and
+        each document is folded into its day's counters as it arrives,
+        so memory grows with the days in the window, not the documents.
+        
+        Returns:
+            Metrics per source (see daily_rollups.window_metrics)
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=days)
+        # One summary per UTC day (mood / meal day counts need the split)
+        days_seen: Dict[date, Dict] = {}
+        
+        async def fold(collection: str):
+            # Oldest first, as the vision gap counters require
+            async for data in self.firebase.stream(
+                collection,
+                [(SOURCE_COLLECTIONS[collection], '==', user_id), ('timestamp', '>=', cutoff)],
+                order_by='timestamp',
+                fields=SOURCE_FIELDS[collection]
+            ):
+                timestamp = to_epoch(data.get('timestamp'))
+                if timestamp is None:
+                    continue
+                day = datetime.fromtimestamp(timestamp, timezone.utc).date()
+                if day not in days_seen:
+                    days_seen[day] = empty_summary()
+                fold_document(days_seen[day], collection, data)
+        
+        # Parallel queries (medicines and alerts for health)
+        await asyncio.gather(*(fold(collection) for collection in collections))
+        
+        return window_metrics([days_seen[day] for day in sorted(days_seen)], days, now)
 
     async def _fetch_recent_events(
         self,
@@ -550,41 +345,34 @@ class DataAggregator:
     async def _fetch_risk_history(self, user_id: str) -> List[Dict]:
         """Fetch historical risk scores from RISK_SCORES collection."""
         try:
-            def _query_sync():
-                return list(
-                    self.db.collection('risk_scores')
-                    .where(filter=FieldFilter('userId', '==', user_id))
-                    .order_by('timestamp', direction='DESCENDING')
-                    .limit(10)
-                    .stream()
-                )
-            
-            loop = asyncio.get_event_loop()
-            docs = await loop.run_in_executor(None, _query_sync)
-            
-            return [d.to_dict() for d in docs]
+            return await self.firebase.query(
+                'riskScores',
+                [('userId', '==', user_id)],
+                order_by='timestamp',
+                descending=True,
+                limit=10
+            )
             
         except Exception as e:
             logger.error(f"Error fetching risk history: {e}")
-            return []
+            raise
 
     # -- Default Data Helpers --
 
-    def _get_mock_data(self, user_id: str, days: int) -> Dict:
+    def _get_mock_data(
+        self,
+        user_id: str,
+        days: int,
+        sources: Tuple[str, ...] = USER_DATA_SOURCES
+    ) -> UserData:
         """Return mock data for testing when Firebase unavailable."""
-        return {
-            'elder_name': 'Test Elder',
-            'family_members': [],
-            'chat': self._get_default_chat_data(),
-            'mood': self._get_default_mood_data(),
-            'vision': self._get_default_vision_data(),
-            'activity': self._get_default_activity_data(),
-            'health': self._get_default_health_data(),
-            'events': [],
-            'risk_history': [],
-            'period_days': days,
-            'fetched_at': datetime.now().isoformat()
-        }
+        data: UserData = {}
+        for source in sources:
+            value = {'fullName': 'Test Elder'} if source == 'profile' else self._default_source(source)
+            data.update(self._source_fields(source, value))
+        data['period_days'] = days
+        data['fetched_at'] = datetime.now().isoformat()
+        return data
 
     def _get_default_chat_data(self) -> Dict:
         return {
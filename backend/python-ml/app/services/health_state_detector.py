@@ -1,61 +1,56 @@
-import cv2
 import numpy as np
-import base64
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import logging
 
-# Robust YOLOv8 import
-try:
-    from ultralytics import YOLO
-    YOLO_AVAILABLE = True
-except ImportError:
-    YOLO_AVAILABLE = False
+from app.models.pose_estimator import pose_estimator, PoseEstimator
+from app.models.fall_detector import posture_metrics
+from app.models.keypoint_timeline import keypoint_timelines, sudden_drop_score
+from app.services.inference_executor import inference_executor
+from app.utils.frame_context import FrameContext
 
 logger = logging.getLogger(__name__)
 
 class HealthStateDetector:
-    def __init__(self):
-        try:
-            if YOLO_AVAILABLE:
-                self.pose = YOLO('yolov8n-pose.pt')
-                self.pose.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
-            else:
-                self.pose = None
-        except Exception as e:
-            logger.error(f"Error initializing YOLOv8 components: {e}")
-            self.pose = None
+    def __init__(self, estimator: Optional[PoseEstimator] = None):
+        # Shared YOLOv8 pose model (loaded once for all detectors)
+        self.pose_estimator = estimator or pose_estimator
         
         self.face_detection = None # Handled by YOLO natively
         self.state_history = {}  # User ID → state timeline
+        self.keypoint_timelines = keypoint_timelines  # Shared with FallDetector
         
         # Thresholds
         self.SUDDEN_CHANGE_THRESHOLD = 2.0  # seconds
         self.OVERSLEEP_THRESHOLD = 3 * 60 * 60  # 3 hours
         self.NORMAL_NAP_DURATION = 45 * 60  # 45 minutes
+        self.FAINT_DROP_VELOCITY = 1.2  # torso lengths/s
         
     async def analyze_health_state(
         self,
         user_id: str,
-        image_base64: str,
-        timestamp: datetime
+        image: Union[str, FrameContext],
+        timestamp: datetime,
+        camera_id: Optional[str] = None
     ) -> Dict:
         """
         Analyze if user is sleeping normally, fainting, or in distress
+        (camera_id keys the motion timeline)
         """
-        # Decode image
-        image = self._decode_image(image_base64)
-        if image is None:
+        frame = FrameContext.ensure(image)
+        # Decode + pose inference run on the pose pool, off the event loop
+        features = await inference_executor.run('pose', self._extract_features, frame)
+        if features is None:
              return self._get_empty_result()
         
-        # Extract features
-        pose_result = self._detect_pose(image)
-        face_result = self._detect_face(image)
+        pose_result, face_result = features
         
         if not pose_result['detected']:
              return self._get_empty_result()
 
-        movement = self._analyze_movement(user_id, pose_result, timestamp)
+        movement = self._analyze_movement(user_id, pose_result, timestamp, camera_id)
+        # The state follows the person the keypoint timeline tracks
+        pose_result['body_angle'] = float(pose_result['body_angles'][movement['person']])
         
         # Get user history
         history = self.state_history.get(user_id, [])
@@ -81,65 +76,76 @@ class HealthStateDetector:
         
         return {
             **state_result,
+            'person_count': pose_result['person_count'],
+            'body_angles': pose_result['body_angles'],
             'alert_level': alert['level'],
             'recommendation': alert['recommendation']
         }
     
-    def _decode_image(self, image_base64: str) -> Optional[np.ndarray]:
-        try:
-            if "," in image_base64:
-                image_base64 = image_base64.split(",")[1]
-            nparr = np.frombuffer(base64.b64decode(image_base64), np.uint8)
-            return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        except Exception as e:
-            logger.error(f"Image decode error: {e}")
+    def _extract_features(self, frame: FrameContext) -> Optional[tuple]:
+        """Decode frame and run pose/face extraction (blocking)."""
+        image = frame.try_decode()
+        if image is None:
+            logger.error("Image decode error")
             return None
+        return self._detect_pose(image, frame.key), self._detect_face(image)
 
-    def _detect_pose(self, image: np.ndarray) -> Dict:
-        # Convert BGR to RGB
-        if not self.pose:
+    def _detect_pose(self, image: np.ndarray, frame_key=None) -> Dict:
+        if not self.pose_estimator.is_available:
             return {'detected': False, 'body_angle': 90, 'head_angle': 0}
             
-        results = self.pose(image, verbose=False)
-        
-        if not results or len(results) == 0 or not hasattr(results[0], 'keypoints') or results[0].keypoints is None or len(results[0].keypoints.xy[0]) == 0:
+        # Shared YOLO pose pass (memoized per frame across detectors)
+        pose = self.pose_estimator.estimate(image, frame_key=frame_key)
+        valid = np.flatnonzero(np.any(pose.keypoints != 0, axis=(1, 2)))
+        if len(valid) == 0:
             return {'detected': False, 'body_angle': 90, 'head_angle': 0}
-            
-        landmarks = results[0].keypoints.xy[0].cpu().numpy()
-        if np.all(landmarks == 0):
-            return {'detected': False, 'body_angle': 90, 'head_angle': 0}
-        
-        # Calculate body angle
-        # 11: left_hip, 12: right_hip, 5: left_shoulder, 6: right_shoulder
-        left_shoulder = landmarks[5]
-        right_shoulder = landmarks[6]
-        left_hip = landmarks[11]
-        right_hip = landmarks[12]
-        
-        mid_shoulder = np.array([(left_shoulder[0] + right_shoulder[0])/2, (left_shoulder[1] + right_shoulder[1])/2])
-        mid_hip = np.array([(left_hip[0] + right_hip[0])/2, (left_hip[1] + right_hip[1])/2])
-        
-        # Vector from hip to shoulder
-        vector = mid_shoulder - mid_hip
-        dx, dy = vector[0], vector[1]
         
-        angle_rad = np.arctan2(abs(dy), abs(dx))
-        angle_deg = np.degrees(angle_rad)
+        # Body angle of every person at once (hip-to-shoulder vector);
+        # the state timeline picks the tracked person among them
+        confidences = pose.confidences[valid] if pose.confidences is not None else None
+        body_angles = posture_metrics(pose.keypoints[valid], pose.image_shape, confidences)['body_angle']
         
         return {
             'detected': True,
-            'body_angle': angle_deg,
-            'head_angle': 0
+            'body_angle': float(body_angles[0]),
+            'head_angle': 0,
+            'person_count': len(valid),
+            'body_angles': [round(float(angle), 2) for angle in body_angles],
+            'keypoints': pose.keypoints[valid],
+            'confidences': confidences,
+            'frame_key': frame_key
         }
 
     def _detect_face(self, image: np.ndarray) -> Dict:
          # Face is inherently detected if pose is detected in YOLOv8
          return {'detected': True}
 
-    def _analyze_movement(self, user_id: str, pose: Dict, timestamp: datetime) -> Dict:
-        # In a real system, compare landmarks with previous frame for speed
-        # Here we simulate or calculate if possible
-        return {'speed': 0, 'suddenness': 0}
+    def _analyze_movement(
+        self,
+        user_id: str,
+        pose: Dict,
+        timestamp: datetime,
+        camera_id: Optional[str] = None
+    ) -> Dict:
+        # Torso velocity from the camera's keypoint timeline (filled by the
+        # shared pose pass, so no extra inference). Timeline entries use
+        # arrival time, like FallDetector, so both can write to it; both
+        # record the person closest to the timeline's last torso position.
+        timeline, person = self.keypoint_timelines.record(
+            user_id,
+            pose['keypoints'],
+            pose.get('confidences'),
+            frame_key=pose.get('frame_key'),
+            camera_id=camera_id
+        )
+        motion = timeline.motion()
+        return {
+            'person': person,
+            'speed': motion['speed'],
+            'suddenness': sudden_drop_score(motion, self.FAINT_DROP_VELOCITY),
+            'peak_drop_velocity': motion['peak_drop_velocity'],
+            'peak_acceleration': motion['peak_acceleration']
+        }
 
     def _classify_state(
         self,
@@ -220,6 +226,10 @@ class HealthStateDetector:
         }
 
     def _is_fainting(self, body_angle: float, movement_suddenness: float, history: List, current_time: datetime) -> bool:
+        # Torso dropped fast into a horizontal position
+        if body_angle < 30 and movement_suddenness >= 1.0:
+            return True
+        
         if not history:
             return False
             
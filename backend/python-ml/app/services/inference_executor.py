@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Inference Executor
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Runs blocking model inference (DeepFace, YOLO) off the event loop.
+
+Each model family gets its own bounded pool:
+- emotion: DeepFace emotion analysis
+- pose: YOLOv8 pose estimation
+- face: DeepFace face embeddings (intruder detection)
+
+When a family's queue is full, new work is rejected immediately with
+InferenceQueueFull instead of piling up behind a slow model, so the
+API stays responsive (including /health) under load.
+
+Pools are thread pools: the models release the GIL during inference,
+and callers submit bound detector methods, which cannot be pickled.
+Out-of-process inference is INFERENCE_TOPOLOGY=workers (see
+app.services.inference_workers).
+"""
+
+import os
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+
+
+class InferenceQueueFull(RuntimeError):
+    """Raised when a model family has no free worker or queue slot."""
+
+    def __init__(self, family: str, capacity: int):
+        super().__init__(
+            f"Inference queue for '{family}' is full ({capacity} in flight)"
+        )
+        self.family = family
+        self.capacity = capacity
+
+
+class InferencePool:
+    """
+    Bounded worker pool for a single model family.
+
+    At most `workers + queue_size` calls may be in flight at once;
+    anything beyond that is rejected rather than queued. A call holds
+    its slot until its worker thread finishes, even if the awaiting
+    task is cancelled first.
+    """
+
+    def __init__(
+        self,
+        family: str,
+        workers: int = 1,
+        queue_size: int = 8
+    ):
+        """
+        Initialize InferencePool.
+
+        Args:
+            family: Model family name (emotion, pose, face)
+            workers: Number of worker threads
+            queue_size: Calls allowed to wait for a free worker
+        """
+        self.family = family
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+        # Counters for /health reporting
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._rejected = 0
+        self._total_latency_ms = 0.0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of calls in flight (running + queued)."""
+        return self.workers + self.queue_size
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Create the underlying executor on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix=f"inference-{self.family}"
+                    )
+        return self._executor
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking callable in this pool.
+
+        Raises:
+            InferenceQueueFull: If the pool is at capacity
+        """
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise InferenceQueueFull(self.family, self.capacity)
+            self._in_flight += 1
+            self._submitted += 1
+
+        call = functools.partial(fn, *args, **kwargs)
+        start = time.perf_counter()
+        # Set when the caller stops waiting; the thread may still be running
+        abandoned = threading.Event()
+
+        def release(future):
+            # Runs once the call has finished or was cancelled before starting
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._lock:
+                self._in_flight -= 1
+                if future.cancelled() or abandoned.is_set():
+                    self._cancelled += 1
+                    return
+                if future.exception() is not None:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                self._total_latency_ms += elapsed_ms
+
+        try:
+            future = self._get_executor().submit(call)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+                self._failed += 1
+            raise
+        future.add_done_callback(release)
+
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            abandoned.set()
+            raise
+
+    def get_stats(self) -> Dict:
+        """Get pool utilisation counters."""
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'in_flight': self._in_flight,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'cancelled': self._cancelled,
+                'rejected': self._rejected,
+                'avg_latency_ms': round(
+                    self._total_latency_ms / finished, 2
+                ) if finished else 0.0
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the underlying executor."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class InferenceExecutor:
+    """
+    Registry of per-family inference pools.
+
+    Configuration (environment):
+    - INFERENCE_QUEUE_SIZE: default queue slots per family
+    - INFERENCE_<FAMILY>_WORKERS / _QUEUE_SIZE: per-family overrides
+    """
+
+    # Default worker counts per model family. Pose and emotion workers
+    # mostly wait on their micro-batchers, so more of them means larger
+    # model batches.
+    DEFAULT_WORKERS = {
+        'emotion': 4,
+        'pose': 4,
+        'face': 1
+    }
+
+    def __init__(self):
+        """Initialize InferenceExecutor from environment configuration."""
+        default_queue = int(os.getenv('INFERENCE_QUEUE_SIZE', 8))
+
+        self.pools: Dict[str, InferencePool] = {}
+        for family, workers in self.DEFAULT_WORKERS.items():
+            prefix = f"INFERENCE_{family.upper()}"
+            self.pools[family] = InferencePool(
+                family=family,
+                workers=int(os.getenv(f"{prefix}_WORKERS", workers)),
+                queue_size=int(os.getenv(f"{prefix}_QUEUE_SIZE", default_queue))
+            )
+
+        logger.info(
+            "✅ InferenceExecutor initialized: " + ", ".join(
+                f"{name}={pool.workers} thread(s)/{pool.queue_size} queued"
+                for name, pool in self.pools.items()
+            )
+        )
+
+    def pool(self, family: str) -> InferencePool:
+        """Get the pool for a model family."""
+        if family not in self.pools:
+            raise KeyError(f"Unknown inference family: {family}")
+        return self.pools[family]
+
+    async def run(self, family: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking inference callable in the family's pool.
+
+        Args:
+            family: Model family (emotion, pose, face)
+            fn: Blocking callable
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            Return value of fn
+        """
+        return await self.pool(family).run(fn, *args, **kwargs)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Get utilisation counters for every family."""
+        return {name: pool.get_stats() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait: bool = True):
+        """Shut down all pools."""
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
+
+
+# Create global instance for import
+inference_executor = InferenceExecutor()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Inference Worker Processes
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Optional topology that moves model inference out of the API process.
+
+With INFERENCE_TOPOLOGY=workers, YOLO pose, DeepFace emotion and
+face detection / Facenet embedding run in dedicated worker processes
+(one model copy each), so TensorFlow, PyTorch and OpenCV stop
+competing with request handling for the GIL. Decoded frames reach the
+workers through a shared-memory ring; only (slot, shape, dtype) is
+pickled.
+
+The API process keeps everything stateful and cheap: per-frame pose
+memoization, micro-batching of pose and emotion frames (a worker runs
+one task at a time, so batches are formed before dispatch), pose face
+boxes, pose history, health-state tracking and alerting. Worker count
+is set independently of uvicorn workers. If the workers cannot start
+with their models, start() raises and vision calls fail rather than
+returning empty results.
+"""
+
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Hashable, Iterator, List, Optional
+import numpy as np
+from loguru import logger
+
+from app.models.face_tracker import Box
+from app.models.model_registry import model_registry
+from app.utils.frame_context import FrameContext
+from app.utils.shared_frame_ring import FrameSpec, SharedFrameRing
+
+
+# ━━━ Worker process side ━━━
+
+# Ring attached by each worker process at startup
+_worker_ring: Optional[SharedFrameRing] = None
+
+
+def _init_worker(ring_name: str, slots: int, slot_bytes: int, threads: int):
+    """Worker initializer: attach the ring and load the models."""
+    global _worker_ring
+
+    # This worker's share of the cores (an explicit setting still wins)
+    os.environ.setdefault('ONNX_INTRA_OP_THREADS', str(threads))
+    # Models inside a worker must run in-process, never re-dispatch
+    os.environ['INFERENCE_TOPOLOGY'] = 'inprocess'
+    _worker_ring = SharedFrameRing.attach(ring_name, slots, slot_bytes)
+
+    from app.models.pose_estimator import pose_estimator
+    from app.models.emotion_detector import emotion_detector
+    from app.services.intruder_detector import intruder_detector
+    pose_estimator.load()
+    emotion_detector.load()
+    intruder_detector.load()
+
+
+def _worker_frame(spec: FrameSpec, key: Optional[Hashable] = None) -> FrameContext:
+    """Frame in the ring as a FrameContext (valid until the caller releases the slot)."""
+    return FrameContext.from_array(_worker_ring.view(spec), key=key)
+
+
+def _worker_pose_batch(specs: List[FrameSpec]) -> list:
+    """Run one batched YOLO pose call on frames in the ring."""
+    from app.models.pose_estimator import pose_estimator, PoseResult
+
+    images = [_worker_ring.view(spec) for spec in specs]
+    if pose_estimator.model is None:
+        return [PoseResult.empty(tuple(image.shape[:2])) for image in images]
+    return pose_estimator._infer_batch(images)
+
+
+def _worker_emotion_batch(specs: List[FrameSpec], boxes: List[Optional[Box]]) -> List[Dict]:
+    """Run emotion analysis on a batch of frames in the ring (one classifier call)."""
+    from app.models.emotion_detector import emotion_detector
+
+    return emotion_detector.analyze_faces([_worker_frame(spec) for spec in specs], boxes)
+
+
+def _worker_face_boxes(spec: FrameSpec) -> List[Box]:
+    """Run the face detector on a frame in the ring."""
+    from app.services.intruder_detector import intruder_detector
+
+    return intruder_detector._extract_face_boxes(_worker_frame(spec))
+
+
+def _worker_embed_faces(spec: FrameSpec, boxes: Optional[List[Box]]) -> List[Optional[np.ndarray]]:
+    """Facenet embeddings of face boxes in a frame in the ring (None: its first face)."""
+    from app.services.intruder_detector import intruder_detector
+
+    frame = _worker_frame(spec)
+    if boxes is None:
+        return [intruder_detector._embed_frame(frame)]
+    return intruder_detector._embed_boxes(frame, boxes)
+
+
+def _worker_status() -> Dict:
+    """Report the worker's process ID and whether it holds the models (startup check)."""
+    from app.models.pose_estimator import pose_estimator
+    from app.models.emotion_detector import emotion_detector
+
+    return {
+        'pid': os.getpid(),
+        'models_loaded': not (pose_estimator.deferred or emotion_detector.deferred)
+    }
+
+
+# ━━━ API process side ━━━
+
+class InferenceWorkers:
+    """
+    Pool of inference worker processes fed through a shared-memory ring.
+
+    Configuration (environment):
+    - INFERENCE_TOPOLOGY: 'inprocess' (default) or 'workers'
+    - INFERENCE_PROCESSES: number of worker processes
+    - INFERENCE_RING_SLOTS: frames that can be in flight at once
+    - INFERENCE_RING_SLOT_MB: largest decoded frame accepted per slot
+    """
+
+    def __init__(self):
+        """Initialize InferenceWorkers from environment configuration."""
+        self.enabled = os.getenv('INFERENCE_TOPOLOGY', 'inprocess').lower() == 'workers'
+        self.processes = int(os.getenv('INFERENCE_PROCESSES', max(1, (os.cpu_count() or 2) // 2)))
+        self.slots = int(os.getenv('INFERENCE_RING_SLOTS', 16))
+        self.slot_bytes = int(float(os.getenv('INFERENCE_RING_SLOT_MB', 6.5)) * 1024 * 1024)
+        self.slot_timeout = 5.0
+
+        self._ring: Optional[SharedFrameRing] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        self._calls = 0
+        self._total_ms = 0.0
+
+    @property
+    def threads_per_process(self) -> int:
+        """Inference threads each worker gets, so workers do not oversubscribe the cores."""
+        return max(1, (os.cpu_count() or 1) // self.processes)
+
+    @property
+    def running(self) -> bool:
+        """True once worker processes are up."""
+        return self._executor is not None
+
+    def start(self):
+        """Create the ring, spawn workers and route detectors to them."""
+        if not self.enabled or self.running:
+            return
+
+        from app.models.pose_estimator import pose_estimator
+        from app.models.emotion_detector import emotion_detector
+        from app.services.intruder_detector import intruder_detector
+
+        self._ring = SharedFrameRing(self.slots, self.slot_bytes)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            # Spawn: never fork a process holding model thread pools
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self._ring.name, self.slots, self.slot_bytes, self.threads_per_process)
+        )
+
+        # Start every worker now rather than on the first frame
+        try:
+            statuses = [f.result() for f in [self._executor.submit(_worker_status) for _ in range(self.processes)]]
+            if not all(status['models_loaded'] for status in statuses):
+                raise RuntimeError("inference workers started without their models")
+        except Exception:
+            self._shutdown()
+            raise
+        pids = {status['pid'] for status in statuses}
+
+        pose_estimator.remote = self
+        emotion_detector.remote = self
+        intruder_detector.remote = self
+        logger.info(
+            f"✅ Inference workers started: {len(pids)} process(es), "
+            f"{self.slots} x {self.slot_bytes // (1024 * 1024)}MB frame slots"
+        )
+
+    def stop(self):
+        """Route detectors back in-process and stop the workers."""
+        if not self.running:
+            return
+
+        from app.models.pose_estimator import pose_estimator
+        from app.models.emotion_detector import emotion_detector
+        from app.services.intruder_detector import intruder_detector
+
+        pose_estimator.remote = None
+        emotion_detector.remote = None
+        intruder_detector.remote = None
+
+        self._shutdown()
+        logger.info("Inference workers stopped")
+
+    def _shutdown(self):
+        """Stop the processes and free the ring."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        self._ring.close()
+        self._ring = None
+
+    def _write(self, frame: np.ndarray) -> FrameSpec:
+        """Copy a frame into a free ring slot."""
+        slot = self._ring.acquire(timeout=self.slot_timeout)
+        try:
+            return self._ring.write(slot, np.ascontiguousarray(frame))
+        except Exception:
+            self._ring.release(slot)
+            raise
+
+    @contextmanager
+    def _in_ring(self, images: List[np.ndarray]) -> Iterator[List[FrameSpec]]:
+        """Frames copied into ring slots for one worker call; slots are freed after it."""
+        start = time.perf_counter()
+        specs = []
+        try:
+            for image in images:
+                specs.append(self._write(image))
+            yield specs
+        finally:
+            for spec in specs:
+                self._ring.release(spec[0])
+            self._record(start)
+
+    def _record(self, start: float):
+        with self._lock:
+            self._calls += 1
+            self._total_ms += (time.perf_counter() - start) * 1000
+
+    def pose_batch(self, images: List[np.ndarray]) -> list:
+        """
+        Run a pose batch in a worker (blocking).
+
+        Returns:
+            One PoseResult per image
+        """
+        with self._in_ring(images) as specs:
+            return self._executor.submit(_worker_pose_batch, specs).result()
+
+    def analyze_emotion_batch(self, frames: List[FrameContext], boxes: List[Optional[Box]]) -> List[Dict]:
+        """
+        Run emotion analysis for a batch of frames in a worker (blocking).
+
+        Args:
+            frames: Decoded frames
+            boxes: Pose face box per frame (None: the worker detects the face)
+
+        Returns:
+            One analysis dict per frame
+        """
+        with self._in_ring([frame.bgr for frame in frames]) as specs:
+            return self._executor.submit(_worker_emotion_batch, specs, boxes).result()
+
+    def face_boxes(self, frame: FrameContext) -> List[Box]:
+        """Run the face detector on a frame in a worker (blocking)."""
+        with self._in_ring([frame.bgr]) as (spec,):
+            return self._executor.submit(_worker_face_boxes, spec).result()
+
+    def embed_faces(self, frame: FrameContext, boxes: Optional[List[Box]]) -> List[Optional[np.ndarray]]:
+        """Facenet embeddings of face boxes (None: the frame's first face) in a worker (blocking)."""
+        with self._in_ring([frame.bgr]) as (spec,):
+            return self._executor.submit(_worker_embed_faces, spec, boxes).result()
+
+    def get_stats(self) -> Dict:
+        """Get worker and ring utilisation."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'running': self.running,
+                'processes': self.processes,
+                'threads_per_process': self.threads_per_process,
+                'ring_slots': self.slots,
+                'ring_slots_in_use': self._ring.in_use if self._ring else 0,
+                'calls': self._calls,
+                'avg_call_ms': round(self._total_ms / self._calls, 2) if self._calls else 0.0
+            }
+
+
+# Create global instance for import
+inference_workers = InferenceWorkers()
+model_registry.register('inference_workers', inference_workers.start)
@@ -1,124 +1,316 @@
-try:
-    from deepface import DeepFace
-    FACE_REC_AVAILABLE = True
-except ImportError:
-    FACE_REC_AVAILABLE = False
-import numpy as np
+import os
+import asyncio
 import base64
-import cv2
+import numpy as np
 import logging
-import uuid
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple, Union
 import time
+import httpx
+
+from app.models.pose_estimator import pose_estimator, PoseEstimator
+from app.models.face_index import EmbeddingCache, FaceIndexStore, HouseholdFaceIndex
+from app.models.face_tracker import Box, FaceTracker
+from app.services.inference_executor import inference_executor
+from app.utils.frame_context import FrameContext
+from app.utils.model_loader import lazy_import
+
+# DeepFace (TensorFlow) is imported on first face embedding, not at startup
+DeepFace = lazy_import('deepface.DeepFace')
+FACE_REC_AVAILABLE = DeepFace is not None
 
 logger = logging.getLogger(__name__)
 
 class IntruderDetector:
-    def __init__(self):
-        # YOLOv8 Pose for behavior analysis - robust loading
-        try:
-            from ultralytics import YOLO
-            self.pose_detector = YOLO('yolov8n-pose.pt')
-            # Initialize with empty run to load weights
-            self.pose_detector.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
-        except Exception as e:
-            self.pose_detector = None
-            logger.error(f"IntruderDetector: YOLO Pose module NOT available: {e}")
+    def __init__(self, estimator: Optional[PoseEstimator] = None):
+        # Shared YOLOv8 pose model for behavior analysis
+        self.pose_estimator = estimator or pose_estimator
+        if not self.pose_estimator.is_available:
+            logger.error("IntruderDetector: YOLO Pose module NOT available")
         
         # Thresholds
         self.FACE_MATCH_THRESHOLD = 0.4  # Lower = stricter (Cosine distance)
         self.ALERT_COOLDOWN = 300  # 5 minutes
         
-        # Mock database for known faces (In prod, load from Firestore/SQL)
-        # Structure: user_id -> { person_id: { encoding: [...], name: '...', relation: '...' } }
-        self.known_faces_db = {} 
+        # Known faces per household: normalized embedding matrices, persisted
+        # to disk so enrolments survive restarts
+        self.face_index = FaceIndexStore()
         self.last_sync_time = {}
         
+        # Profile photo sync: runs in the background, embeds only new or
+        # changed photos (embeddings cached by content hash / ETag)
+        self.SYNC_INTERVAL = 60  # seconds
+        self.FACE_MODEL = "Facenet"
+        self.embedding_cache = EmbeddingCache(os.path.join(self.face_index.directory, 'embeddings'))
+        self._sync_tasks: Dict[str, asyncio.Task] = {}
+        
+        # Photo URLs come from user-editable profiles: only these hosts are
+        # fetched (a leading dot allows subdomains), redirects included
+        self.photo_hosts = [
+            host.strip().lower()
+            for host in os.getenv(
+                'FACE_PHOTO_HOSTS',
+                'firebasestorage.googleapis.com,storage.googleapis.com,.googleusercontent.com'
+            ).split(',')
+            if host.strip()
+        ]
+        
+        # Tracks carry identities across frames: only new faces (and each
+        # track every FACE_TRACK_REVERIFY_S) are embedded
+        self.face_tracker = FaceTracker()
+        
+        # Embed faces cropped from pose keypoints instead of detecting them
+        self.face_roi_from_pose = os.getenv('FACE_ROI_FROM_POSE', 'false').lower() == 'true'
+        
+        # Set to the InferenceWorkers pool when face detection and
+        # Facenet run out of process
+        self.remote = None
+        
         if not FACE_REC_AVAILABLE:
             logger.warning("IntruderDetector: DeepFace not available. Running in MOCK mode.")
 
-    async def _sync_and_get_known_faces(self, user_id: str):
-        """Sync familiar faces from Firestore every 60 seconds."""
+    def load(self):
+        """Build the Facenet model now rather than on the first face (inference workers)."""
+        if FACE_REC_AVAILABLE:
+            DeepFace.build_model(self.FACE_MODEL)
+
+    async def _sync_and_get_known_faces(self, user_id: str) -> HouseholdFaceIndex:
+        """
+        Known faces for a household, right away.
+        
+        Every SYNC_INTERVAL seconds a background task refreshes the
+        profile's family photos; detection never waits for it.
+        """
         now = time.time()
         last_sync = self.last_sync_time.get(user_id, 0)
         
-        if now - last_sync > 60:
-            try:
-                from app.services.data_aggregator import data_aggregator
-                profile = await data_aggregator._fetch_user_profile(user_id)
-                manual_members = profile.get('manualFamilyMembers', [])
-                
-                # Re-enroll from fresh profile
-                if manual_members:
-                    self.known_faces_db[user_id] = {} # Clear existing
-                    for member in manual_members:
-                        photo_url = member.get('photoURL')
-                        if photo_url:
-                            self.enroll_face(user_id, member.get('name', 'Unknown'), member.get('relation', 'Family'), photo_url)
-                
-                self.last_sync_time[user_id] = now
-            except Exception as e:
-                logger.error(f"Failed to sync family members for {user_id}: {e}")
+        if now - last_sync > self.SYNC_INTERVAL and user_id not in self._sync_tasks:
+            self.last_sync_time[user_id] = now
+            task = asyncio.create_task(self._sync_family_photos(user_id))
+            self._sync_tasks[user_id] = task
+            task.add_done_callback(lambda _: self._sync_tasks.pop(user_id, None))
                 
-        return self.known_faces_db.get(user_id, {})
+        return self.face_index.get(user_id)
 
-    async def detect_intruder(
-        self,
-        user_id: str,
-        image_base64: str,
-        timestamp: datetime
-    ) -> Dict:
+    async def _sync_family_photos(self, user_id: str) -> bool:
         """
-        Detect if unknown/suspicious person is present
+        Enroll the profile's manualFamilyMembers photos.
+        
+        Photos are fetched conditionally (ETag / Last-Modified) and only
+        embedded when their content hash is new; profile enrolments are
+        rewritten only if they changed. A member whose photo cannot be
+        fetched or embedded keeps their previous enrolment.
+        
+        Returns:
+            True if the household's profile enrolments changed
         """
-        # Decode image
-        image = self._decode_image(image_base64)
-        if image is None:
-             return self._get_empty_result(timestamp)
+        try:
+            from app.services.data_aggregator import data_aggregator
+            profile = await data_aggregator._fetch_user_profile(user_id)
+            if not profile:
+                return False
+            members = [m for m in profile.get('manualFamilyMembers', []) if m.get('photoURL')]
+            
+            index = self.face_index.get(user_id)
+            previous = {entry['person_id']: entry for entry in index.entries('profile')}
+            
+            entries = []
+            async with self._http_client() as client:
+                for member in members:
+                    try:
+                        key, embedding = await self._photo_embedding(client, member['photoURL'])
+                    except Exception as e:
+                        logger.error(f"Failed to fetch family photo of {member.get('name', 'Unknown')} for {user_id}: {e}")
+                        key, embedding = self._last_photo_key(member['photoURL']), None
+                    
+                    if embedding is None:
+                        # Keep the member enrolled with their last good photo
+                        embedding = previous.get(f"profile-{key}", {}).get('embedding')
+                    if embedding is None or embedding.size == 0:
+                        continue
+                    entries.append({
+                        'person_id': f"profile-{key}",
+                        'embedding': embedding,
+                        'name': member.get('name', 'Unknown'),
+                        'relationship': member.get('relation', 'Family')
+                    })
+            
+            changed = await asyncio.to_thread(index.replace, 'profile', entries)
+            if changed:
+                logger.info(f"Synced {len(entries)} family face(s) for {user_id}")
+            return changed
+        except Exception as e:
+            logger.error(f"Failed to sync family members for {user_id}: {e}")
+            return False
+
+    def _http_client(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+        """HTTP client for downloading enrolment photos (allowed hosts only)."""
+        return httpx.AsyncClient(
+            timeout=10.0,
+            follow_redirects=True,
+            transport=transport,
+            # Runs for every request, so redirects are checked too
+            event_hooks={'request': [self._check_photo_request]}
+        )
+
+    def _photo_host_allowed(self, url: httpx.URL) -> bool:
+        """True for https URLs on a FACE_PHOTO_HOSTS host."""
+        host = url.host.lower()
+        return url.scheme == 'https' and any(
+            host.endswith(allowed) if allowed.startswith('.') else host == allowed
+            for allowed in self.photo_hosts
+        )
 
-        # 1. Detect faces using DeepFace
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    async def _check_photo_request(self, request: httpx.Request):
+        """Refuse photo requests (and redirects) to hosts not in FACE_PHOTO_HOSTS."""
+        if not self._photo_host_allowed(request.url):
+            raise ValueError(f"Photo host not allowed: {request.url.scheme}://{request.url.host}")
+
+    def _last_photo_key(self, photo_url: str) -> Optional[str]:
+        """Cache key of a photo's last successful sync, None if unknown."""
+        if photo_url.startswith(('http://', 'https://')):
+            validator = self.embedding_cache.validator(photo_url)
+            return validator['key'] if validator else None
+        try:
+            return EmbeddingCache.key(base64.b64decode(photo_url.split(',', 1)[-1]), self.FACE_MODEL)
+        except ValueError:
+            return None
+
+    async def _photo_embedding(self, client: httpx.AsyncClient, photo_url: str) -> Tuple[str, Optional[np.ndarray]]:
+        """
+        Embedding of one enrolment photo (URL or base64 / data URI).
+        
+        Returns:
+            (cache key, embedding); the embedding is empty if the photo
+            has no face, None if it could not be fetched or embedded
+        """
+        if photo_url.startswith(('http://', 'https://')):
+            key, content = await self._fetch_photo(client, photo_url)
+        else:
+            content = base64.b64decode(photo_url.split(',', 1)[-1])
+            key = EmbeddingCache.key(content, self.FACE_MODEL)
+        
+        embedding = await asyncio.to_thread(self.embedding_cache.get, key)
+        if embedding is not None:
+            return key, embedding
+        
+        if content is None:
+            # Not modified, but the embedding was never cached: fetch it again
+            key, content = await self._fetch_photo(client, photo_url, conditional=False)
         
         if not FACE_REC_AVAILABLE:
-            logger.debug("Mocking intruder detection (DeepFace unavailable)")
-            return self._get_empty_result(timestamp)
+            return key, None
+        embedding = await inference_executor.run('face', self._embed_photo, content)
+        await asyncio.to_thread(self.embedding_cache.put, key, embedding)
+        return key, embedding
 
+    async def _fetch_photo(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        conditional: bool = True
+    ) -> Tuple[str, Optional[bytes]]:
+        """
+        Download a photo unless it is unchanged since the last sync.
+        
+        Returns:
+            (cache key, photo bytes); bytes are None when the server
+            answered 304 Not Modified
+        """
+        validator = self.embedding_cache.validator(url) if conditional else None
+        headers = {}
+        if validator:
+            if validator.get('etag'):
+                headers['If-None-Match'] = validator['etag']
+            if validator.get('last_modified'):
+                headers['If-Modified-Since'] = validator['last_modified']
+        
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304 and validator:
+            return validator['key'], None
+        response.raise_for_status()
+        
+        content = response.content
+        key = EmbeddingCache.key(content, self.FACE_MODEL)
+        await asyncio.to_thread(
+            self.embedding_cache.set_validator,
+            url, key,
+            response.headers.get('etag'),
+            response.headers.get('last-modified')
+        )
+        return key, content
+
+    def _embed_photo(self, content: bytes) -> Optional[np.ndarray]:
+        """Face embedding of an encoded photo, None if it has no face (blocking)."""
+        frame = FrameContext.from_bytes(memoryview(content))
+        if frame.try_decode() is None:
+            return None
+        return self._embed_frame(frame)
+
+    def _embed_frame(self, frame: FrameContext) -> Optional[np.ndarray]:
+        """Embedding of the first face in a decoded frame (blocking)."""
+        if self.remote is not None:
+            return self.remote.embed_faces(frame, None)[0]
         try:
-            # Extract face embeddings for all faces in image
-            face_encodings = DeepFace.represent(img_path=image_rgb, model_name="Facenet", enforce_detection=True)
-            face_locations = [face.get('facial_area', {}) for face in face_encodings]
+            encodings = DeepFace.represent(img_path=frame.rgb, model_name=self.FACE_MODEL, enforce_detection=True)
         except ValueError:
             # DeepFace raises ValueError if no face is detected
-            return self._get_empty_result(timestamp)
+            encodings = []
+        if not encodings:
+            return None
+        return np.asarray(encodings[0]['embedding'], dtype=np.float32)
+
+    async def detect_intruder(
+        self,
+        user_id: str,
+        image: Union[str, FrameContext],
+        timestamp: datetime,
+        camera_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Detect if unknown/suspicious person is present
+        (camera_id keys the face tracks: boxes only match tracks of the same camera)
+        """
+        frame = FrameContext.ensure(image)
+        # 1. Decode + locate faces on the face pool (detection only, no embedding)
+        face_boxes = await inference_executor.run('face', self._detect_face_boxes, frame)
+        if face_boxes is None:
+             return self._get_empty_result(timestamp)
         
-        if len(face_locations) == 0:
+        if len(face_boxes) == 0:
             return self._get_empty_result(timestamp)
             
-        # 2. Compare with known faces
+        # 2. Compare with known faces: tracked faces keep their identity,
+        # only new tracks and tracks due for re-verification are embedded
         known_faces = await self._sync_and_get_known_faces(user_id)
         
-        unknown_faces_count = 0
-        known_people_names = []
+        tracks, to_embed = self.face_tracker.update((user_id, camera_id), face_boxes)
+        if to_embed:
+            embeddings = await inference_executor.run(
+                'face', self._embed_boxes, frame, [track.box for track in to_embed]
+            )
+            for track, match in zip(to_embed, self._match_faces(embeddings, known_faces)):
+                self.face_tracker.label(track, match)
         
-        for encoding in face_encodings:
-            match = self._match_face(encoding, known_faces)
-            if match:
-                known_people_names.append(match['name'])
-            else:
-                unknown_faces_count += 1
+        matches = [track.label for track in tracks]
+        known_people_names = [match['name'] for match in matches if match]
+        unknown_faces_count = len(matches) - len(known_people_names)
                 
         # 3. Behavior Analysis (if unknown person)
         suspicious_behavior = False
         behavior_type = None
-        if unknown_faces_count > 0 and self.pose_detector:
-            # Simple behavior check using YOLO Pose
-            results = self.pose_detector.predict(image_rgb, verbose=False)
-            if results and len(results) > 0 and hasattr(results[0], 'keypoints') and results[0].keypoints is not None:
+        if unknown_faces_count > 0 and self.pose_estimator.is_available:
+            # Simple behavior check using the shared YOLO pose pass
+            # (usually a cache hit: fall/health detectors ran it on this frame)
+            pose = await inference_executor.run(
+                'pose', self.pose_estimator.estimate, frame.bgr,
+                frame_key=frame.key
+            )
+            if pose.detected:
                 # Check for "hands raised" or specific postures
                 pass 
         elif unknown_faces_count > 0:
-             logger.debug("Skipping pose analysis for intruder (pose_detector not available)")
+             logger.debug("Skipping pose analysis for intruder (pose estimator not available)")
         # 4. Alert Logic
         intruder_detected = unknown_faces_count > 0
         alert_required = intruder_detected and (
@@ -135,78 +327,94 @@ class IntruderDetector:
             'intruder_detected': intruder_detected,
             'confidence': 0.95 if intruder_detected else 0.0,
             'details': {
-                'num_people': len(face_locations),
+                'num_people': len(face_boxes),
                 'unknown_people': unknown_faces_count,
                 'known_people': known_people_names,
                 'suspicious_behavior': suspicious_behavior,
+                'faces_embedded': len(to_embed),
             },
             'alert_required': alert_required,
             'alert_message': alert_message,
             'timestamp': timestamp.isoformat()
         }
 
-    def enroll_face(self, user_id: str, name: str, relation: str, image_base64: str):
+    def _detect_face_boxes(self, frame: FrameContext) -> Optional[List[Box]]:
+        """Decode frame and locate faces, without embedding them (blocking)."""
+        if frame.try_decode() is None:
+            return None
+        
+        if not FACE_REC_AVAILABLE:
+            logger.debug("Mocking intruder detection (DeepFace unavailable)")
+            return None
+
+        if self.face_roi_from_pose:
+            # Face boxes from the shared pose pass (no face detection)
+            try:
+                boxes = self.pose_estimator.face_boxes(frame)
+            except Exception as e:
+                logger.debug(f"Pose face ROI unavailable: {e}")
+                boxes = []
+            if boxes:
+                return boxes
+
+        if self.remote is not None:
+            return self.remote.face_boxes(frame)
+        return self._extract_face_boxes(frame)
+
+    def _extract_face_boxes(self, frame: FrameContext) -> List[Box]:
+        """Face detector pass (blocking; runs in a worker process with INFERENCE_TOPOLOGY=workers)."""
+        # Detector only; Facenet runs later, for the faces that need it
+        faces = DeepFace.extract_faces(img_path=frame.rgb, enforce_detection=False)
+        boxes = []
+        for face in faces:
+            # Without a detection DeepFace returns the whole image at confidence 0
+            if not face.get('confidence'):
+                continue
+            area = face['facial_area']
+            boxes.append((area['x'], area['y'], area['x'] + area['w'], area['y'] + area['h']))
+        return boxes
+
+    def _embed_boxes(self, frame: FrameContext, boxes: List[Box]) -> List[np.ndarray]:
+        """Facenet embeddings of face crops (blocking)."""
+        if self.remote is not None:
+            return self.remote.embed_faces(frame, boxes)
+        embeddings = []
+        for x1, y1, x2, y2 in boxes:
+            crop = frame.rgb[y1:y2, x1:x2]
+            embedding = DeepFace.represent(
+                img_path=crop,
+                model_name=self.FACE_MODEL,
+                enforce_detection=False,
+                detector_backend="skip"
+            )[0]['embedding']
+            embeddings.append(np.asarray(embedding, dtype=np.float32))
+        return embeddings
+
+    def enroll_face(self, user_id: str, name: str, relation: str, image_base64: str, source: str = 'api'):
         """
         Add a known person
         """
-        image = self._decode_image(image_base64)
-        if image is None: return False
+        frame = FrameContext.from_base64(image_base64)
+        if frame.try_decode() is None: return False
         
         if not FACE_REC_AVAILABLE:
             logger.error("Cannot enroll face: DeepFace not available.")
             return False
 
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        try:
-            # Extract embedding
-            encodings = DeepFace.represent(img_path=image_rgb, model_name="Facenet", enforce_detection=True)
-        except ValueError:
-            encodings = []
-        
-        if len(encodings) > 0:
-            if user_id not in self.known_faces_db:
-                self.known_faces_db[user_id] = {}
-            
-            person_id = str(uuid.uuid4())
-            self.known_faces_db[user_id][person_id] = {
-                'encoding': encodings[0]['embedding'],
-                'name': name,
-                'relationship': relation
-            }
+        embedding = self._embed_frame(frame)
+        if embedding is not None:
+            self.face_index.get(user_id).add(embedding, name, relation, source=source)
             return True
         return False
 
-    def _match_face(self, encoding_data, known_faces):
-        if not known_faces:
-             return None
-             
-        if not FACE_REC_AVAILABLE: return None
-        
-        target_embedding = encoding_data.get('embedding', encoding_data)
-        
-        # Check against all known encodings
-        best_match_id = None
-        best_distance = float('inf')
-        
-        for person_id, data in known_faces.items():
-            known_embedding = data['encoding']
-            
-            # Calculate Cosine Distance
-            a = np.array(target_embedding)
-            b = np.array(known_embedding)
-            distance = 1 - (np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
-            
-            if distance < self.FACE_MATCH_THRESHOLD and distance < best_distance:
-                best_distance = distance
-                best_match_id = person_id
-                
-        if best_match_id:
-            return known_faces[best_match_id]
-            
-        return None
+    def _match_faces(self, embeddings: List[np.ndarray], known_faces: HouseholdFaceIndex) -> List[Optional[Dict]]:
+        """Best known person (or None) for every face, in one matrix multiply."""
+        if not embeddings:
+            return []
+        return known_faces.match(embeddings, self.FACE_MATCH_THRESHOLD)
 
-    def _get_known_faces(self, user_id: str):
-        return self.known_faces_db.get(user_id, {})
+    def _get_known_faces(self, user_id: str) -> HouseholdFaceIndex:
+        return self.face_index.get(user_id)
 
     def _is_unusual_time(self, timestamp: datetime) -> bool:
         hour = timestamp.hour
@@ -214,15 +422,6 @@ class IntruderDetector:
             return True
         return False
 
-    def _decode_image(self, image_base64: str) -> Optional[np.ndarray]:
-        try:
-            if "," in image_base64:
-                image_base64 = image_base64.split(",")[1]
-            nparr = np.frombuffer(base64.b64decode(image_base64), np.uint8)
-            return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        except Exception:
-            return None
-
     def _get_empty_result(self, timestamp):
         return {
             'intruder_detected': False,
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Motion Gate
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Skips model inference for frames where nothing has changed.
+
+Each camera's last analyzed frame is kept as a tiny blurred grayscale
+thumbnail. A new frame is compared against it; if only a small share
+of pixels changed, the previous analysis is reused and the frame only
+counts as a heartbeat (the camera is alive).
+
+The comparison is against the last *analyzed* frame, not the previous
+one, so slow drift still accumulates into a change. A maximum staleness
+forces periodic re-analysis of static scenes, so a person lying still
+keeps feeding the oversleep / fainting logic.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+import numpy as np
+import cv2
+from loguru import logger
+
+from app.utils.frame_context import FrameContext
+
+
+class _CameraState:
+    """Reference thumbnail and cached result for one camera."""
+
+    __slots__ = ('thumbnail', 'result', 'analyzed_at', 'heartbeats', 'last_seen')
+
+    def __init__(self, thumbnail: np.ndarray, result: Dict, analyzed_at: float):
+        self.thumbnail = thumbnail
+        self.result = result
+        self.analyzed_at = analyzed_at
+        self.heartbeats = 0
+        self.last_seen = analyzed_at
+
+
+class MotionGate:
+    """
+    Per-camera static-scene detector.
+
+    Configuration (environment):
+    - MOTION_GATE_ENABLED: 'true' / 'false'
+    - MOTION_GATE_THRESHOLD: share of thumbnail pixels that must change
+    - MOTION_GATE_MAX_STALENESS_S: longest a cached result may be reused
+    - MOTION_GATE_MAX_CAMERAS: cameras tracked before evicting the least recent
+    """
+
+    # Longest side of the comparison thumbnail
+    THUMBNAIL_SIZE = 64
+
+    # Grayscale delta for a pixel to count as changed (sensor noise margin)
+    PIXEL_DELTA = 25
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        threshold: Optional[float] = None,
+        max_staleness_s: Optional[float] = None,
+        max_cameras: Optional[int] = None
+    ):
+        """
+        Initialize MotionGate.
+
+        Args:
+            enabled: Whether gating is active
+            threshold: Changed-pixel share (0-1) that counts as motion
+            max_staleness_s: Seconds after which a static scene is re-analyzed
+            max_cameras: Maximum number of cameras tracked
+        """
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv('MOTION_GATE_ENABLED', 'true').lower() == 'true'
+        )
+        self.threshold = (
+            threshold if threshold is not None
+            else float(os.getenv('MOTION_GATE_THRESHOLD', 0.02))
+        )
+        self.max_staleness_s = (
+            max_staleness_s if max_staleness_s is not None
+            else float(os.getenv('MOTION_GATE_MAX_STALENESS_S', 60))
+        )
+
+        self.max_cameras = max_cameras or int(os.getenv('MOTION_GATE_MAX_CAMERAS', 5000))
+
+        self._cameras: 'OrderedDict[Hashable, _CameraState]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._analyzed = 0
+        self._skipped = 0
+
+        logger.info(
+            f"✅ MotionGate initialized (enabled={self.enabled}, "
+            f"threshold={self.threshold}, max staleness={self.max_staleness_s}s)"
+        )
+
+    def thumbnail(self, frame: FrameContext) -> Optional[np.ndarray]:
+        """Blurred grayscale thumbnail used for comparison."""
+        if frame.try_decode() is None:
+            return None
+        small = frame.downscaled(self.THUMBNAIL_SIZE, gray=True)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def motion_score(self, a: np.ndarray, b: np.ndarray) -> float:
+        """Share of pixels that differ by more than PIXEL_DELTA."""
+        if a.shape != b.shape:
+            return 1.0
+        return float(np.count_nonzero(cv2.absdiff(a, b) > self.PIXEL_DELTA)) / a.size
+
+    def check(self, camera: Hashable, frame: FrameContext) -> Tuple[Optional[Dict], Dict]:
+        """
+        Decide whether a frame needs analysis.
+
+        Blocking (decodes the frame); run it off the event loop.
+
+        Args:
+            camera: Camera identity, e.g. (user ID, camera ID)
+            frame: Incoming frame
+
+        Returns:
+            (cached_result, motion_info). cached_result is the previous
+            analysis to reuse, or None if the frame must be analyzed.
+        """
+        now = time.monotonic()
+
+        if not self.enabled:
+            return None, {'gated': False}
+
+        thumbnail = self.thumbnail(frame)
+
+        with self._lock:
+            state = self._cameras.get(camera)
+            if state is None or thumbnail is None:
+                self._analyzed += 1
+                return None, {'gated': False, 'reason': 'no_reference'}
+
+            state.last_seen = now
+            self._cameras.move_to_end(camera)
+            score = self.motion_score(thumbnail, state.thumbnail)
+            age = now - state.analyzed_at
+
+            if score > self.threshold:
+                self._analyzed += 1
+                return None, {'gated': False, 'reason': 'motion', 'score': round(score, 4)}
+            if age >= self.max_staleness_s:
+                self._analyzed += 1
+                return None, {'gated': False, 'reason': 'stale', 'score': round(score, 4)}
+
+            state.heartbeats += 1
+            self._skipped += 1
+            return state.result, {
+                'gated': True,
+                'score': round(score, 4),
+                'result_age_s': round(age, 1),
+                'heartbeats': state.heartbeats
+            }
+
+    def update(self, camera: Hashable, frame: FrameContext, result: Dict):
+        """Record a freshly analyzed frame as the camera's reference."""
+        if not self.enabled:
+            return
+        thumbnail = self.thumbnail(frame)
+        if thumbnail is None:
+            return
+        with self._lock:
+            self._cameras[camera] = _CameraState(thumbnail, result, time.monotonic())
+            self._cameras.move_to_end(camera)
+            while len(self._cameras) > self.max_cameras:
+                self._cameras.popitem(last=False)
+
+    def forget(self, camera: Hashable):
+        """Drop a camera's reference frame."""
+        with self._lock:
+            self._cameras.pop(camera, None)
+
+    def get_stats(self) -> Dict:
+        """Get gating counters."""
+        with self._lock:
+            total = self._analyzed + self._skipped
+            return {
+                'enabled': self.enabled,
+                'cameras': len(self._cameras),
+                'frames_analyzed': self._analyzed,
+                'frames_skipped': self._skipped,
+                'skip_rate': round(self._skipped / total, 3) if total else 0.0
+            }
+
+
+# Create global instance for import
+motion_gate = MotionGate()
@@ -30,8 +30,7 @@ class RiskPredictor:
         ]
         self.risk_labels = ['safe', 'monitor', 'high']
         
-        # Load or train model
-        self._load_or_train_model()
+        # Model is loaded (or trained) on first prediction, not at import
     
     def _load_or_train_model(self):
         """Load existing model or train a new one."""
@@ -100,6 +99,9 @@ class RiskPredictor:
         Returns:
             Dictionary with riskLevel, riskScore, and contributing factors
         """
+        if self.model is None:
+            self._load_or_train_model()
+        
         # Extract features
         feature_vector = np.array([[
             features.get('avgMoodScore', 0.5),
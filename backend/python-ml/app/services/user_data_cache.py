@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Aggregated User Data Cache
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+In-process cache for DataAggregator's per-user Firestore reads.
+
+Each source (profile, chat, mood, vision, ...) is cached on its own
+with its own TTL: the profile and mood history change slowly, vision
+and health data during an incident change fast. A value older than
+its TTL but within USER_DATA_CACHE_STALE_S of it is still served while
+one background fetch replaces it (stale-while-revalidate), so a camera
+raising an alert on every frame costs one query set, not one per
+frame. Concurrent misses for the same user and source share one fetch.
+
+Writes that change a source (risk scores, emergency flags) call
+invalidate(); a fetch that was in flight during the write is not
+stored.
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from loguru import logger
+
+
+# (source, variant) - variant separates e.g. different day windows
+CacheKey = Tuple[str, Hashable]
+
+
+class _CacheEntry:
+    """One cached source value."""
+
+    __slots__ = ('value', 'fetched_at')
+
+    def __init__(self, value: Any, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+
+class _UserEntries:
+    """A user's cached sources and their invalidation counters."""
+
+    __slots__ = ('entries', 'versions')
+
+    def __init__(self):
+        self.entries: Dict[CacheKey, _CacheEntry] = {}
+        self.versions: Dict[str, int] = {}
+
+
+class UserDataCache:
+    """
+    Per-user, per-source TTL cache with stale-while-revalidate and
+    single-flight loading.
+
+    Configuration (environment):
+    - USER_DATA_CACHE_ENABLED: cache aggregated user data
+    - USER_DATA_TTL_<SOURCE>_S: seconds a source stays fresh
+      (see DEFAULT_TTL_S)
+    - USER_DATA_CACHE_STALE_S: seconds past the TTL a value is still
+      served while it refreshes
+    - USER_DATA_CACHE_MAX_USERS: users cached before evicting the least recent
+    """
+
+    # Fresh lifetime per source, in seconds
+    DEFAULT_TTL_S = {
+        'profile': 300.0,
+        'chat': 120.0,
+        'mood': 300.0,
+        'vision': 30.0,
+        'activity': 120.0,
+        'health': 30.0,
+        'events': 30.0,
+        'risk_history': 300.0,
+        # Daily rollup window shared by chat / mood / vision / activity / health
+        'rollups': 30.0
+    }
+
+    def __init__(
+        self,
+        ttl_s: Optional[Dict[str, float]] = None,
+        stale_s: Optional[float] = None,
+        max_users: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Initialize UserDataCache.
+
+        Args:
+            ttl_s: Per-source TTL overrides
+            stale_s: Window past the TTL in which stale values are served
+            max_users: Maximum number of users cached
+            enabled: Whether caching is on (False: every get loads)
+        """
+        self.enabled = (
+            enabled if enabled is not None
+            else os.getenv('USER_DATA_CACHE_ENABLED', 'true').lower() == 'true'
+        )
+        self.ttl_s = {
+            source: float(os.getenv(f"USER_DATA_TTL_{source.upper()}_S", ttl))
+            for source, ttl in self.DEFAULT_TTL_S.items()
+        }
+        self.ttl_s.update(ttl_s or {})
+        self.stale_s = stale_s if stale_s is not None else float(os.getenv('USER_DATA_CACHE_STALE_S', 600))
+        self.max_users = max_users or int(os.getenv('USER_DATA_CACHE_MAX_USERS', 5000))
+
+        self._users: 'OrderedDict[str, _UserEntries]' = OrderedDict()
+        self._inflight: Dict[Tuple[str, CacheKey], asyncio.Future] = {}
+
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._loads = 0
+
+    def ttl(self, source: str) -> float:
+        """Fresh lifetime of a source (60s for sources without a default)."""
+        return self.ttl_s.get(source, 60.0)
+
+    async def get(
+        self,
+        user_id: str,
+        source: str,
+        loader: Callable[[], Awaitable[Any]],
+        variant: Hashable = None
+    ) -> Any:
+        """
+        Get a user's source, loading it through `loader` if needed.
+
+        Args:
+            user_id: Elder user ID
+            source: Source name (sets the TTL and what invalidate() drops)
+            loader: Coroutine function fetching the value; exceptions
+                propagate and nothing is cached
+            variant: Extra key part, e.g. the day window
+
+        Returns:
+            Cached or freshly loaded value
+        """
+        if not self.enabled:
+            return await loader()
+
+        key = (source, variant)
+        user = self._touch(user_id)
+        entry = user.entries.get(key)
+
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            ttl = self.ttl(source)
+            if age < ttl:
+                self._hits += 1
+                return entry.value
+            if age < ttl + self.stale_s:
+                self._stale_hits += 1
+                self._load(user_id, key, loader)
+                return entry.value
+
+        self._misses += 1
+        # Shielded: a cancelled caller must not cancel a shared fetch
+        return await asyncio.shield(self._load(user_id, key, loader))
+
+    def _touch(self, user_id: str) -> _UserEntries:
+        """Get (or create) a user's entries and mark them most recent."""
+        user = self._users.get(user_id)
+        if user is None:
+            user = _UserEntries()
+            self._users[user_id] = user
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return user
+
+    def _load(self, user_id: str, key: CacheKey, loader: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Start a fetch, or join the one already running for this key."""
+        flight = (user_id, key)
+        task = self._inflight.get(flight)
+        if task is not None:
+            return task
+
+        version = self._touch(user_id).versions.get(key[0], 0)
+        task = asyncio.ensure_future(self._fetch(user_id, key, loader, version))
+        self._inflight[flight] = task
+
+        def _done(finished: asyncio.Future):
+            if self._inflight.get(flight) is finished:
+                del self._inflight[flight]
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.debug(f"User data load failed ({user_id}/{key[0]}): {finished.exception()}")
+
+        task.add_done_callback(_done)
+        return task
+
+    async def _fetch(self, user_id: str, key: CacheKey, loader: Callable[[], Awaitable[Any]], version: int) -> Any:
+        self._loads += 1
+        value = await loader()
+
+        user = self._users.get(user_id)
+        # Skip storing if the source was invalidated while loading
+        if user is not None and user.versions.get(key[0], 0) == version:
+            user.entries[key] = _CacheEntry(value, time.monotonic())
+        return value
+
+    def invalidate(self, user_id: str, sources: Optional[Iterable[str]] = None):
+        """
+        Drop cached sources for a user after a write.
+
+        Args:
+            user_id: Elder user ID
+            sources: Sources to drop (default: all)
+        """
+        user = self._users.get(user_id)
+        if user is None:
+            return
+
+        if sources is None:
+            sources = set(self.ttl_s) | set(user.versions) | {key[0] for key in user.entries} | {
+                flight[1][0] for flight in self._inflight if flight[0] == user_id
+            }
+        else:
+            sources = set(sources)
+        for key in [key for key in user.entries if key[0] in sources]:
+            del user.entries[key]
+        for source in sources:
+            user.versions[source] = user.versions.get(source, 0) + 1
+
+        # Later callers start a new fetch instead of joining one that predates the write
+        for flight in [flight for flight in self._inflight if flight[0] == user_id and flight[1][0] in sources]:
+            del self._inflight[flight]
+
+    def clear(self):
+        """Drop everything."""
+        self._users.clear()
+        self._inflight.clear()
+
+    def get_stats(self) -> Dict:
+        """Hit rates and size."""
+        lookups = self._hits + self._stale_hits + self._misses
+        return {
+            'enabled': self.enabled,
+            'users': len(self._users),
+            'entries': sum(len(user.entries) for user in self._users.values()),
+            'hits': self._hits,
+            'stale_hits': self._stale_hits,
+            'misses': self._misses,
+            'loads': self._loads,
+            'hit_rate': round((self._hits + self._stale_hits) / lookups, 3) if lookups else 0.0
+        }
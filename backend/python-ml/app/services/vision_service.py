@@ -12,12 +12,15 @@ Camera analysis orchestrator combining:
 Provides unified vision analysis API.
 """
 
-from typing import Dict, Optional
+import asyncio
+from typing import Dict, Optional, Union
 from datetime import datetime
 from loguru import logger
 
 from app.models.emotion_detector import emotion_detector
 from app.models.fall_detector import fall_detector
+from app.services.inference_executor import inference_executor, InferenceQueueFull
+from app.utils.frame_context import FrameContext
 
 
 class VisionService:
@@ -37,21 +40,23 @@ class VisionService:
     
     async def analyze_frame(
         self,
-        image_base64: str,
+        image_base64: Union[str, FrameContext],
         user_id: str,
         detect_emotion: bool = True,
         detect_fall: bool = True,
-        detect_quality: bool = True
+        detect_quality: bool = True,
+        camera_id: Optional[str] = None
     ) -> Dict:
         """
         Perform comprehensive analysis on a camera frame.
         
         Args:
-            image_base64: Base64-encoded image
+            image_base64: Base64-encoded image or shared FrameContext
             user_id: User ID for tracking
             detect_emotion: Whether to run emotion detection
             detect_fall: Whether to run fall detection
             detect_quality: Whether to assess image quality
+            camera_id: Camera the frame came from (keys fall motion tracking)
             
         Returns:
             Combined analysis result:
@@ -69,26 +74,41 @@ class VisionService:
             'timestamp': datetime.now().isoformat()
         }
         
-        # Emotion detection
+        # Both detectors read the same decoded frame
+        frame = FrameContext.ensure(image_base64)
+        
+        # Emotion and fall detection run in parallel on their own pools
+        tasks = {}
         if detect_emotion:
-            try:
-                emotion_result = self.emotion_detector.analyze_emotion(
-                    image_base64,
-                    detect_face_quality=detect_quality
-                )
-                result['emotion'] = emotion_result
-            except Exception as e:
-                logger.error(f"Emotion detection error: {e}")
-                result['emotion'] = {'error': str(e), 'face_detected': False}
-        
-        # Fall detection
+            tasks['emotion'] = inference_executor.run(
+                'emotion',
+                self.emotion_detector.analyze_emotion,
+                frame,
+                detect_face_quality=detect_quality
+            )
         if detect_fall:
-            try:
-                fall_result = self.fall_detector.detect_fall(image_base64)
-                result['pose'] = fall_result
-            except Exception as e:
-                logger.error(f"Fall detection error: {e}")
-                result['pose'] = {'error': str(e), 'pose_detected': False}
+            tasks['pose'] = inference_executor.run(
+                'pose',
+                self.fall_detector.detect_fall,
+                frame,
+                user_id=user_id,
+                camera_id=camera_id
+            )
+        
+        outcomes = await asyncio.gather(*tasks.values(), return_exceptions=True)
+        
+        for key, outcome in zip(tasks.keys(), outcomes):
+            if isinstance(outcome, InferenceQueueFull):
+                raise outcome
+            if isinstance(outcome, Exception):
+                if key == 'emotion':
+                    logger.error(f"Emotion detection error: {outcome}")
+                    result[key] = {'error': str(outcome), 'face_detected': False}
+                else:
+                    logger.error(f"Fall detection error: {outcome}")
+                    result[key] = {'error': str(outcome), 'pose_detected': False}
+            else:
+                result[key] = outcome
         
         # Check for alerts
         result['alert'] = self._check_alerts(result)
@@ -171,29 +191,43 @@ class VisionService:
     
     async def analyze_emotion_only(
         self,
-        image_base64: str
+        image_base64: Union[str, FrameContext]
     ) -> Dict:
         """
         Perform only emotion detection.
         
         Faster than full analysis when fall detection not needed.
         """
-        return self.emotion_detector.analyze_emotion(image_base64)
+        return await inference_executor.run(
+            'emotion',
+            self.emotion_detector.analyze_emotion,
+            image_base64
+        )
     
     async def detect_fall_only(
         self,
-        image_base64: str
+        image_base64: Union[str, FrameContext],
+        user_id: Optional[str] = None,
+        camera_id: Optional[str] = None
     ) -> Dict:
         """
         Perform only fall detection.
         
         Faster than full analysis when emotion not needed.
+        Pose history is updated only when user_id is given;
+        camera_id keys the motion timeline.
         """
-        return self.fall_detector.detect_fall(image_base64)
+        return await inference_executor.run(
+            'pose',
+            self.fall_detector.detect_fall,
+            image_base64,
+            user_id=user_id,
+            camera_id=camera_id
+        )
     
-    def get_movement_pattern(self) -> Dict:
-        """Get movement pattern analysis from fall detector."""
-        return self.fall_detector.analyze_movement_pattern()
+    def get_movement_pattern(self, user_id: str) -> Dict:
+        """Get a user's movement pattern analysis from fall detector."""
+        return self.fall_detector.analyze_movement_pattern(user_id)
     
     def analyze_emotion_trend(
         self,
@@ -4,13 +4,19 @@ ElderNest AI - Utilities
 
 This package contains utility modules:
 - logger: Centralized Loguru logging configuration
-- firebase_client: Firebase Admin SDK utilities
+- firebase_client: Firebase Admin SDK utilities and the shared async Firestore client
 - model_loader: ML model loading utilities
+- frame_context: Decode-once camera frames shared across analyzers
+- micro_batcher: Batching scheduler for concurrent inference calls
+- shared_frame_ring: Shared-memory frame slots for inference workers
 """
 
 from app.utils.logger import logger, get_logger, log_request, log_emergency, log_prediction, log_alert_sent
-from app.utils.firebase_client import firebase_client, get_db, send_notification
-from app.utils.model_loader import load_model, load_risk_model, save_model, get_model_path
+from app.utils.firebase_client import firebase_client, get_db, get_async_db, send_notification
+from app.utils.model_loader import load_model, load_risk_model, save_model, get_model_path, lazy_import
+from app.utils.frame_context import FrameContext, FrameDecodeError
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.shared_frame_ring import SharedFrameRing
 
 __all__ = [
     # Logger
@@ -24,11 +30,21 @@ __all__ = [
     # Firebase
     'firebase_client',
     'get_db',
+    'get_async_db',
     'send_notification',
     
     # Model loading
     'load_model',
     'load_risk_model',
     'save_model',
-    'get_model_path'
+    'get_model_path',
+    'lazy_import',
+    
+    # Frames
+    'FrameContext',
+    'FrameDecodeError',
+    'SharedFrameRing',
+    
+    # Batching
+    'MicroBatcher'
 ]
@@ -5,27 +5,52 @@ ElderNest AI - Firebase Client
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 Firebase Admin SDK initialization and utilities.
+
+The one place the Admin SDK is initialized. Besides the sync Firestore
+client (get_db) it owns a shared Firestore AsyncClient for the data
+layer: queries are awaited on the event loop instead of occupying a
+thread each, and every service multiplexes its requests over the same
+gRPC channel. FIRESTORE_MAX_CONCURRENCY bounds the queries in flight
+so a burst of per-user fetches queues instead of flooding the channel.
 """
 
 import os
-from typing import Optional
+import asyncio
+import inspect
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 from loguru import logger
 
 # Firebase imports
 try:
     import firebase_admin
-    from firebase_admin import credentials, firestore, messaging
+    from firebase_admin import credentials, firestore, firestore_async, messaging
     FIREBASE_AVAILABLE = True
 except ImportError:
     FIREBASE_AVAILABLE = False
     logger.warning("Firebase Admin SDK not installed")
 
+# Keyword filters need google-cloud-firestore >= 2.11 (pinned in requirements.txt)
+FieldFilter = None
+if FIREBASE_AVAILABLE:
+    try:
+        from google.cloud.firestore_v1 import FieldFilter
+    except ImportError:
+        logger.error(
+            "google-cloud-firestore is older than 2.11 (no FieldFilter); "
+            "falling back to positional where() filters - upgrade it"
+        )
+
 
 class FirebaseClient:
     """
     Firebase client for Firestore and FCM operations.
     
     Provides centralized Firebase initialization and access.
+    
+    Configuration (environment):
+    - FIREBASE_PROJECT_ID / FIREBASE_PRIVATE_KEY / FIREBASE_CLIENT_EMAIL,
+      or FIREBASE_SERVICE_ACCOUNT_PATH: credentials
+    - FIRESTORE_MAX_CONCURRENCY: async queries in flight at once
     """
     
     _instance = None
@@ -42,6 +67,13 @@ class FirebaseClient:
         if not FirebaseClient._initialized:
             self.db = None
             self.app = None
+            self.max_concurrency = int(os.getenv('FIRESTORE_MAX_CONCURRENCY', 64))
+            
+            # AsyncClient channels are bound to the loop they were created on
+            self._async_db = None
+            self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+            self._async_slots: Optional[asyncio.Semaphore] = None
+            
             self._initialize()
             FirebaseClient._initialized = True
     
@@ -107,6 +139,134 @@ class FirebaseClient:
         """Get Firestore client."""
         return self.db
     
+    def get_async_firestore(self):
+        """
+        Get the shared Firestore AsyncClient (None without Firebase).
+        
+        Created on first use inside the running event loop and reused
+        by every caller on that loop.
+        """
+        if not self.is_available:
+            return None
+        
+        loop = asyncio.get_running_loop()
+        if self._async_db is None or self._async_loop is not loop:
+            self._async_db = firestore_async.client(self.app)
+            self._async_loop = loop
+            self._async_slots = asyncio.Semaphore(self.max_concurrency)
+            logger.info(f"Firestore AsyncClient created ({self.max_concurrency} concurrent queries)")
+        return self._async_db
+    
+    async def stream(
+        self,
+        collection: str,
+        filters: Sequence[Tuple[str, str, object]] = (),
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream a collection query as dicts, without blocking the loop.
+        
+        Args:
+            collection: Root collection name
+            filters: (field, operator, value) conditions, ANDed
+            order_by: Field to sort by
+            descending: Sort direction
+            limit: Maximum documents returned
+            fields: Field paths to return (projection; default: whole documents)
+            
+        Yields:
+            Document data, one document at a time
+        """
+        db = self.get_async_firestore()
+        if db is None:
+            return
+        
+        query = db.collection(collection)
+        for field, op, value in filters:
+            if FieldFilter is not None:
+                query = query.where(filter=FieldFilter(field, op, value))
+            else:
+                query = query.where(field, op, value)
+        if order_by:
+            query = query.order_by(order_by, direction='DESCENDING' if descending else 'ASCENDING')
+        if limit:
+            query = query.limit(limit)
+        if fields:
+            query = query.select(list(fields))
+        
+        async with self._async_slots:
+            async for doc in query.stream():
+                yield doc.to_dict()
+    
+    async def query(
+        self,
+        collection: str,
+        filters: Sequence[Tuple[str, str, object]] = (),
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Dict]:
+        """Run a collection query and collect the documents (see stream)."""
+        return [doc async for doc in self.stream(collection, filters, order_by, descending, limit, fields)]
+    
+    async def get_document(
+        self,
+        collection: str,
+        doc_id: str,
+        fields: Optional[Sequence[str]] = None
+    ) -> Optional[Dict]:
+        """Fetch one document's data, optionally only `fields` (None if missing or Firebase is unavailable)."""
+        db = self.get_async_firestore()
+        if db is None:
+            return None
+        
+        async with self._async_slots:
+            doc = await db.collection(collection).document(doc_id).get(field_paths=fields)
+        return doc.to_dict() if doc.exists else None
+    
+    async def add_document(self, collection: str, data: Dict) -> bool:
+        """Add a document with a generated ID; False if Firebase is unavailable."""
+        db = self.get_async_firestore()
+        if db is None:
+            return False
+        
+        async with self._async_slots:
+            await db.collection(collection).add(data)
+        return True
+    
+    async def set_document(self, collection: str, doc_id: str, data: Dict) -> bool:
+        """Create or overwrite a document; False if Firebase is unavailable."""
+        db = self.get_async_firestore()
+        if db is None:
+            return False
+        
+        async with self._async_slots:
+            await db.collection(collection).document(doc_id).set(data)
+        return True
+    
+    async def update_document(self, collection: str, doc_id: str, data: Dict) -> bool:
+        """Update fields of an existing document; False if Firebase is unavailable."""
+        db = self.get_async_firestore()
+        if db is None:
+            return False
+        
+        async with self._async_slots:
+            await db.collection(collection).document(doc_id).update(data)
+        return True
+    
+    async def close(self):
+        """Close the AsyncClient's channel (application shutdown)."""
+        if self._async_db is not None and self._async_loop is asyncio.get_running_loop():
+            closing = self._async_db.close()
+            if inspect.isawaitable(closing):
+                await closing
+        self._async_db = None
+        self._async_loop = None
+    
     def send_fcm_notification(
         self,
         token: str,
@@ -157,6 +317,10 @@ def get_db():
     """Get Firestore client."""
     return firebase_client.get_firestore()
 
+def get_async_db():
+    """Get the shared Firestore AsyncClient."""
+    return firebase_client.get_async_firestore()
+
 def send_notification(token: str, title: str, body: str, data: dict = None) -> bool:
     """Send push notification."""
     return firebase_client.send_fcm_notification(token, title, body, data)
@@ -165,5 +329,6 @@ __all__ = [
     'FirebaseClient',
     'firebase_client',
     'get_db',
+    'get_async_db',
     'send_notification'
 ]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Frame Context
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Decode-once camera frame shared by every analyzer in a request.
+
+A FrameContext wraps the encoded image (base64 or raw bytes) and
+lazily caches derived views:
+- bgr: decoded frame (OpenCV / YOLO input)
+- rgb: colour-converted frame (DeepFace input)
+- gray: grayscale frame (quality / motion checks)
+- downscaled(max_side): area-resized copies for cheap pre-checks
+
+Each view is computed at most once, even when emotion, pose and face
+analyzers read it concurrently from different inference threads.
+"""
+
+import base64
+import hashlib
+import threading
+from typing import Dict, Hashable, Optional, Tuple, Union
+import numpy as np
+import cv2
+
+
+class FrameDecodeError(ValueError):
+    """Raised when a frame cannot be decoded into an image."""
+
+
+class FrameContext:
+    """
+    Lazily decoded camera frame with cached derived views.
+
+    Build with from_base64(), from_bytes() or from_array(); analyzers
+    accept either a FrameContext or a base64 string via ensure().
+    """
+
+    def __init__(
+        self,
+        data: Optional[Union[bytes, bytearray, memoryview]] = None,
+        image_base64: Optional[str] = None,
+        bgr: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize FrameContext. Prefer the from_* constructors.
+
+        Args:
+            data: Encoded image bytes (JPEG/PNG/...)
+            image_base64: Base64 image, optionally with a data URI prefix
+            bgr: Already-decoded BGR frame
+        """
+        self._data = data
+        self._image_base64 = image_base64
+        self._views: Dict[Hashable, np.ndarray] = {}
+        self._key: Optional[Hashable] = None
+        self._lock = threading.RLock()
+
+        if bgr is not None:
+            self._views['bgr'] = bgr
+
+    # ━━━ Constructors ━━━
+
+    @classmethod
+    def from_base64(cls, image_base64: str) -> 'FrameContext':
+        """Wrap a base64 image; decoding is deferred until first use."""
+        return cls(image_base64=image_base64)
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview]) -> 'FrameContext':
+        """Wrap encoded image bytes without copying them."""
+        return cls(data=data)
+
+    @classmethod
+    def from_array(cls, bgr: np.ndarray, key: Optional[Hashable] = None) -> 'FrameContext':
+        """
+        Wrap an already-decoded BGR frame.
+
+        Args:
+            bgr: Decoded frame
+            key: Known frame key (e.g. from the process that decoded it)
+        """
+        frame = cls(bgr=bgr)
+        frame._key = key
+        return frame
+
+    @classmethod
+    def ensure(cls, image: Union[str, 'FrameContext']) -> 'FrameContext':
+        """Return image unchanged if it is a FrameContext, else wrap it."""
+        if isinstance(image, FrameContext):
+            return image
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(image)
+        return cls.from_base64(image)
+
+    # ━━━ Encoded data ━━━
+
+    @property
+    def data(self) -> Union[bytes, bytearray, memoryview]:
+        """Encoded image bytes (base64 decoded on first access)."""
+        if self._data is None and self._image_base64 is not None:
+            with self._lock:
+                if self._data is None:
+                    payload = self._image_base64
+                    # Skip a data URI prefix without split() copies
+                    comma = payload.find(',', 0, 100)
+                    if comma != -1:
+                        payload = payload[comma + 1:]
+                    try:
+                        self._data = base64.b64decode(payload)
+                    except Exception as e:
+                        raise FrameDecodeError(f"Invalid base64 image: {e}") from e
+        if self._data is None:
+            raise FrameDecodeError("Frame has no encoded data")
+        return self._data
+
+    @property
+    def key(self) -> Hashable:
+        """Content digest identifying this frame (for per-frame caches)."""
+        if self._key is None:
+            with self._lock:
+                if self._key is None:
+                    if self._data is None and self._image_base64 is None:
+                        source = np.ascontiguousarray(self.bgr)
+                    else:
+                        source = self.data
+                    self._key = hashlib.blake2b(source, digest_size=16).digest()
+        return self._key
+
+    # ━━━ Decoded views ━━━
+
+    def _view(self, name: Hashable, build) -> np.ndarray:
+        """Return a cached view, building it once under the lock."""
+        view = self._views.get(name)
+        if view is None:
+            with self._lock:
+                view = self._views.get(name)
+                if view is None:
+                    view = build()
+                    self._views[name] = view
+        return view
+
+    def _decode(self) -> np.ndarray:
+        """Decode encoded bytes straight into a BGR array."""
+        buffer = np.frombuffer(self.data, dtype=np.uint8)
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if image is None:
+            raise FrameDecodeError("Could not decode image data")
+        return image
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """Decoded BGR frame."""
+        return self._view('bgr', self._decode)
+
+    @property
+    def rgb(self) -> np.ndarray:
+        """RGB frame."""
+        return self._view('rgb', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Grayscale frame."""
+        return self._view('gray', lambda: cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+
+    def downscaled(self, max_side: int = 320, gray: bool = False) -> np.ndarray:
+        """
+        Frame resized so its longest side is at most max_side.
+
+        Args:
+            max_side: Longest side of the result in pixels
+            gray: Return the grayscale view instead of BGR
+        """
+        def build():
+            source = self.gray if gray else self.bgr
+            height, width = source.shape[:2]
+            scale = max_side / max(height, width)
+            if scale >= 1.0:
+                return source
+            size = (max(1, int(round(width * scale))), max(1, int(round(height * scale))))
+            return cv2.resize(source, size, interpolation=cv2.INTER_AREA)
+
+        return self._view(('downscaled', max_side, gray), build)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Shape of the decoded BGR frame."""
+        return self.bgr.shape
+
+    def try_decode(self) -> Optional[np.ndarray]:
+        """Decoded BGR frame, or None if the data is not a valid image."""
+        try:
+            return self.bgr
+        except FrameDecodeError:
+            return None
+
+
+__all__ = [
+    'FrameContext',
+    'FrameDecodeError'
+]
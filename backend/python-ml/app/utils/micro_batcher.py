@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Micro-Batcher
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Coalesces single-item inference calls from concurrent requests into
+one batched model call.
+
+Callers block in submit(); a background thread collects items that
+arrive within a short window (or until the batch is full), runs the
+batch function once, and hands each caller its own result. With many
+cameras posting at once this turns N single-image forward passes into
+a few batched ones.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+
+class MicroBatcher:
+    """
+    Background batching scheduler for a blocking batch function.
+
+    `batch_fn` receives a list of items and must return a list of
+    results of the same length and order.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 8,
+        window_ms: float = 10.0
+    ):
+        """
+        Initialize MicroBatcher.
+
+        Args:
+            name: Name used for the worker thread and logs
+            batch_fn: Blocking function mapping items to results
+            max_batch_size: Largest batch passed to batch_fn (1 disables batching)
+            window_ms: How long to wait for more items after the first arrives
+        """
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window_ms) / 1000.0
+
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Counters for /health reporting
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._total_wait_ms = 0.0
+        self._total_batch_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        """True if calls are batched rather than run inline."""
+        return self.max_batch_size > 1
+
+    def submit(self, item: Any) -> Any:
+        """
+        Run one item through the batch function, waiting for its result.
+
+        Raises:
+            Whatever batch_fn raised for the batch containing this item
+        """
+        if not self.enabled:
+            start = time.perf_counter()
+            result = self.batch_fn([item])[0]
+            self._record([0.0], (time.perf_counter() - start) * 1000)
+            return result
+
+        future: Future = Future()
+        # Checked and enqueued under the lock shutdown() takes, so no
+        # item can land behind the stop sentinel and wait forever
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"MicroBatcher '{self.name}' is shut down")
+            self._ensure_worker()
+            self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_worker(self):
+        """Start the batching thread on first use (caller holds the lock)."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"batcher-{self.name}",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _collect(self) -> Optional[List[tuple]]:
+        """Block for the first item, then gather more until the window closes."""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                # Shutdown requested; finish this batch first
+                self._queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        """Worker loop: collect a batch, run it, fan out results."""
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            items = [entry[0] for entry in batch]
+            futures = [entry[1] for entry in batch]
+            started = time.perf_counter()
+            waits = [(started - entry[2]) * 1000 for entry in batch]
+
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name} batch returned {len(results)} results for {len(items)} items"
+                    )
+            except Exception as e:
+                logger.error(f"MicroBatcher '{self.name}' batch of {len(items)} failed: {e}")
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+            self._record(waits, (time.perf_counter() - started) * 1000)
+
+    def _record(self, waits: List[float], batch_ms: float):
+        """Update batch-size and queue-wait counters."""
+        with self._lock:
+            self._batches += 1
+            self._items += len(waits)
+            self._largest_batch = max(self._largest_batch, len(waits))
+            self._total_wait_ms += sum(waits)
+            self._total_batch_ms += batch_ms
+
+    def get_stats(self) -> Dict:
+        """Get batch-size and queue-wait metrics."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'max_batch_size': self.max_batch_size,
+                'window_ms': round(self.window * 1000, 2),
+                'queued': self._queue.qsize(),
+                'batches': self._batches,
+                'items': self._items,
+                'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'avg_queue_wait_ms': round(self._total_wait_ms / self._items, 2) if self._items else 0.0,
+                'avg_batch_ms': round(self._total_batch_ms / self._batches, 2) if self._batches else 0.0
+            }
+
+    def shutdown(self):
+        """Stop the worker thread after queued items are processed."""
+        with self._lock:
+            self._closed = True
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join(timeout=5)
+
+
+__all__ = [
+    'MicroBatcher'
+]
@@ -8,6 +8,9 @@ Utility for loading trained ML models.
 """
 
 import os
+import sys
+import importlib.util
+from types import ModuleType
 from typing import Optional, Tuple, Any, List
 from loguru import logger
 
@@ -120,6 +123,37 @@ def load_risk_model() -> Tuple[Optional[Any], Optional[List[str]]]:
     return model, feature_names
 
 
+def lazy_import(module_name: str) -> Optional[ModuleType]:
+    """
+    Import a heavy optional module on first attribute access.
+    
+    Keeps TensorFlow / PyTorch out of service startup: the module is
+    located now but only executed when a model is actually loaded.
+    
+    Args:
+        module_name: Dotted module name (e.g. 'deepface.DeepFace')
+        
+    Returns:
+        Lazy module, or None if it is not installed
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except ImportError:
+        return None
+    if spec is None or spec.loader is None:
+        return None
+    
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    loader.exec_module(module)
+    return module
+
+
 def save_model(model: Any, model_name: str, save_dir: str = 'trained_models') -> bool:
     """
     Save a model to disk.
@@ -151,5 +185,6 @@ __all__ = [
     'get_model_path',
     'load_model',
     'load_risk_model',
+    'lazy_import',
     'save_model'
 ]
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - Shared-Memory Frame Ring
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Fixed pool of frame slots in one shared-memory block, used to hand
+decoded frames to inference worker processes without pickling them.
+
+The API process owns the ring: it acquires a free slot, copies the
+decoded frame in, and sends the worker only (slot, shape, dtype).
+The worker maps a zero-copy numpy view onto the slot, runs the model,
+and the API process releases the slot once the result is back.
+"""
+
+import threading
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+import numpy as np
+
+
+# (slot, shape, dtype string) identifying a frame in the ring
+FrameSpec = Tuple[int, Tuple[int, ...], str]
+
+
+class SharedFrameRing:
+    """
+    Fixed-size frame slots in a shared-memory block.
+
+    Only the creating (owner) process allocates and releases slots;
+    attached worker processes just read views. Workers are spawned
+    children sharing the owner's resource tracker, so the block is
+    unlinked once, by the owner, in close().
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        slot_bytes: int,
+        name: Optional[str] = None,
+        create: bool = True
+    ):
+        """
+        Initialize SharedFrameRing. Workers use attach() instead.
+
+        Args:
+            slots: Number of frames that can be in flight at once
+            slot_bytes: Capacity of each slot in bytes
+            name: Shared memory name (required when attaching)
+            create: Create the block (owner) or attach to an existing one
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = create
+
+        self._shm = shared_memory.SharedMemory(
+            name=name,
+            create=create,
+            size=slots * slot_bytes if create else 0
+        )
+
+        self._free = list(range(slots))
+        self._available = threading.Semaphore(slots)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, name: str, slots: int, slot_bytes: int) -> 'SharedFrameRing':
+        """Attach to a ring created by another process."""
+        return cls(slots, slot_bytes, name=name, create=False)
+
+    @property
+    def name(self) -> str:
+        """Shared memory block name (passed to workers)."""
+        return self._shm.name
+
+    @property
+    def in_use(self) -> int:
+        """Number of slots currently holding frames."""
+        with self._lock:
+            return self.slots - len(self._free)
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """
+        Reserve a free slot.
+
+        Raises:
+            TimeoutError: If no slot frees up within timeout
+        """
+        if not self._available.acquire(timeout=timeout):
+            raise TimeoutError(f"No free frame slot ({self.slots} in use)")
+        with self._lock:
+            return self._free.pop()
+
+    def release(self, slot: int):
+        """Return a slot to the pool."""
+        with self._lock:
+            self._free.append(slot)
+        self._available.release()
+
+    def write(self, slot: int, frame: np.ndarray) -> FrameSpec:
+        """
+        Copy a frame into a slot.
+
+        Raises:
+            ValueError: If the frame does not fit in a slot
+        """
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(
+                f"Frame of {frame.nbytes} bytes exceeds slot size {self.slot_bytes}"
+            )
+        spec = (slot, tuple(frame.shape), frame.dtype.str)
+        np.copyto(self.view(spec), frame, casting='no')
+        return spec
+
+    def view(self, spec: FrameSpec) -> np.ndarray:
+        """Zero-copy numpy view of the frame in a slot."""
+        slot, shape, dtype = spec
+        return np.ndarray(
+            shape,
+            dtype=np.dtype(dtype),
+            buffer=self._shm.buf,
+            offset=slot * self.slot_bytes
+        )
+
+    def close(self):
+        """Detach from the block; the owner also frees it."""
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view is still alive; the mapping goes away with the process
+            pass
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+__all__ = [
+    'FrameSpec',
+    'SharedFrameRing'
+]
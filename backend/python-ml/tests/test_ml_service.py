@@ -37,6 +37,109 @@ def create_test_image(width: int = 200, height: int = 200) -> str:
     return base64.b64encode(buffer.getvalue()).decode('utf-8')
 
 
+def create_test_clip(path: str, still_frames: int = 15, moving_frames: int = 15, fps: int = 10):
+    """Write an MJPG clip: a still scene, then a moving block."""
+    import cv2
+    
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (160, 120))
+    for i in range(still_frames + moving_frames):
+        frame = np.full((120, 160, 3), 90, dtype=np.uint8)
+        if i >= still_frames:
+            x = (i - still_frames) * 10
+            frame[30:90, x:x + 40] = 255
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def make_torso_keypoints(center_y: float, horizontal: bool = False) -> np.ndarray:
+    """COCO-17 keypoints with a 100px torso centered at center_y."""
+    keypoints = np.zeros((17, 2), dtype=np.float32)
+    if horizontal:
+        keypoints[[5, 6]] = [[200, center_y - 5], [200, center_y + 5]]
+        keypoints[[11, 12]] = [[300, center_y - 5], [300, center_y + 5]]
+    else:
+        keypoints[[5, 6]] = [[280, center_y - 50], [320, center_y - 50]]
+        keypoints[[11, 12]] = [[285, center_y + 50], [315, center_y + 50]]
+    return keypoints
+
+
+class FakeFirestore:
+    """In-memory stand-in for the FirebaseClient async data layer."""
+    
+    is_available = True
+    
+    def __init__(self, collections: dict = None, profile: dict = None, delay: float = 0.0):
+        self.collections = collections or {}
+        self.profile = profile or {}
+        self.delay = delay
+        self.documents = {}
+        self.calls = []
+        self.projections = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    @staticmethod
+    def project(doc, fields):
+        """Keep only the (dotted) field paths, as Firestore's select does."""
+        if fields is None:
+            return doc
+        projected = {}
+        for path in fields:
+            source, target = doc, projected
+            *parents, leaf = path.split('.')
+            for name in parents:
+                source = source.get(name) if isinstance(source, dict) else None
+                target = target.setdefault(name, {})
+            if isinstance(source, dict) and leaf in source:
+                target[leaf] = source[leaf]
+        return projected
+    
+    async def stream(self, collection, filters=(), order_by=None, descending=False, limit=None, fields=None):
+        import asyncio
+        import operator
+        ops = {'==': operator.eq, '>=': operator.ge, '>': operator.gt, '<': operator.lt, '<=': operator.le}
+        
+        self.calls.append((collection, tuple(filters)))
+        self.projections[collection] = fields
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        
+        docs = list(self.collections.get(collection, [])) + list(self.documents.get(collection, {}).values())
+        # Filters on fields a document lacks are ignored (keeps fixtures short)
+        docs = [
+            doc for doc in docs
+            if all(field not in doc or ops[op](doc[field], value) for field, op, value in filters)
+        ]
+        if order_by:
+            docs.sort(key=lambda doc: (doc.get(order_by) is None, doc.get(order_by)), reverse=descending)
+        for doc in docs[:limit] if limit else docs:
+            yield self.project(doc, fields)
+    
+    async def query(self, collection, filters=(), order_by=None, descending=False, limit=None, fields=None):
+        return [doc async for doc in self.stream(collection, filters, order_by, descending, limit, fields)]
+    
+    async def set_document(self, collection, doc_id, data):
+        self.documents.setdefault(collection, {})[doc_id] = data
+        return True
+    
+    async def get_document(self, collection, doc_id, fields=None):
+        self.calls.append((collection, doc_id))
+        self.projections[collection] = fields
+        return self.project(self.profile, fields)
+    
+    async def add_document(self, collection, data):
+        self.collections.setdefault(collection, []).append(data)
+        return True
+    
+    async def update_document(self, collection, doc_id, data):
+        self.profile.update(data)
+        return True
+    
+
+
 class TestEmotionDetector:
     """Tests for EmotionDetector."""
     
@@ -120,6 +223,99 @@ class TestFallDetector:
         assert detector.FALLEN_THRESHOLD == 30
         assert detector.LYING_THRESHOLD == 45
         assert detector.SITTING_THRESHOLD == 70
+    
+    def test_posture_metrics_vectorized(self):
+        """Test posture geometry for several persons in one pass."""
+        from app.models.fall_detector import posture_metrics
+        
+        keypoints = np.stack([
+            make_torso_keypoints(150),
+            make_torso_keypoints(400, horizontal=True)
+        ])
+        keypoints[0, 0] = [300, 60]    # nose above the hips
+        keypoints[1, 0] = [180, 420]   # nose below the hips
+        
+        metrics = posture_metrics(keypoints, (480, 640))
+        
+        assert metrics['body_angle'].shape == (2,)
+        assert metrics['body_angle'][0] > 80
+        assert metrics['body_angle'][1] < 10
+        assert list(metrics['head_below_hip']) == [False, True]
+        assert metrics['hip_height'][0] == pytest.approx(200 / 480)
+    
+    def test_posture_metrics_ignore_missing_keypoints(self):
+        """Test that an occluded or low-confidence hip falls back to the visible one."""
+        from app.models.fall_detector import posture_metrics
+        
+        keypoints = np.stack([make_torso_keypoints(150)] * 3)
+        keypoints[:, 0] = [300, 60]
+        keypoints[1, 11] = 0                 # occluded hip at (0, 0)
+        keypoints[2, 12] = [20, 15]          # low-confidence hip guess
+        confidences = np.full((3, 17), 0.9, dtype=np.float32)
+        confidences[1, 11] = 0.0
+        confidences[2, 12] = 0.05
+        
+        metrics = posture_metrics(keypoints, (480, 640), confidences)
+        
+        assert np.all(metrics['body_angle'] > 75)
+        assert not metrics['head_below_hip'].any()
+        assert metrics['hip_height'] == pytest.approx([200 / 480] * 3)
+        assert list(metrics['hip_tilt']) == [0.0, 0.0, 0.0]
+    
+    def test_every_person_classified(self):
+        """Test that a fallen person is found behind a standing one."""
+        from app.models.fall_detector import FallDetector
+        from app.models.pose_estimator import PoseResult
+        
+        keypoints = np.stack([
+            make_torso_keypoints(150),
+            np.zeros((17, 2), dtype=np.float32),
+            make_torso_keypoints(400, horizontal=True)
+        ])
+        stub = type('Stub', (), {
+            'is_available': True,
+            'estimate': staticmethod(lambda image, frame_key=None: PoseResult(
+                keypoints, np.full((3, 17), 0.9, dtype=np.float32), (480, 640)
+            ))
+        })()
+        detector = FallDetector(estimator=stub)
+        
+        result = detector.detect_fall(create_test_image())
+        
+        assert result['person_count'] == 2
+        assert [p['posture'] for p in result['persons']] == ['standing', 'fallen']
+        assert [p['person'] for p in result['persons']] == [0, 2]
+        assert result['fall_detected'] is True
+        assert result['posture'] == 'fallen'
+        assert result['fallen_count'] == 1
+        assert result['alert']['severity'] == 'critical'
+    
+    def test_person_order_swap_is_not_a_fall(self):
+        """Test that two people swapping detection order does not read as a fast drop."""
+        from app.models.fall_detector import FallDetector
+        from app.models.keypoint_timeline import KeypointTimelineStore
+        from app.models.pose_estimator import PoseResult
+        
+        standing = make_torso_keypoints(150)
+        reclining = np.zeros((17, 2), dtype=np.float32)
+        reclining[[5, 6]] = [[400, 340], [410, 340]]
+        reclining[[11, 12]] = [[500, 420], [510, 420]]
+        frames = iter([[standing, reclining], [standing, reclining], [reclining, standing]])
+        stub = type('Stub', (), {
+            'is_available': True,
+            'estimate': staticmethod(lambda image, frame_key=None: PoseResult(
+                np.stack(next(frames)), np.full((2, 17), 0.9, dtype=np.float32), (480, 640)
+            ))
+        })()
+        detector = FallDetector(estimator=stub)
+        detector.keypoint_timelines = KeypointTimelineStore()
+        
+        results = [detector.detect_fall(create_test_image(width=200 + i), user_id='elder-a') for i in range(3)]
+        
+        assert [r['posture'] for r in results] == ['standing'] * 3
+        assert sorted(p['posture'] for p in results[-1]['persons']) == ['lying', 'standing']
+        assert not any(r['fall_detected'] for r in results)
+        assert results[-1]['motion']['suddenness'] == 0.0
 
 
 class TestActivityAnalyzer:
@@ -335,58 +531,2011 @@ class TestVisionService:
         assert result['user_id'] == 'test-user'
 
 
-class TestAPIEndpoints:
-    """Tests for FastAPI endpoints."""
+class TestInferenceExecutor:
+    """Tests for the bounded inference executor."""
     
-    @pytest.fixture
-    def client(self):
-        """Create test client."""
-        from fastapi.testclient import TestClient
-        from app.main import app
-        return TestClient(app)
+    @pytest.mark.asyncio
+    async def test_run_returns_result(self):
+        """Test that blocking calls run in the pool and return."""
+        from app.services.inference_executor import InferencePool
+        
+        pool = InferencePool('test', workers=1, queue_size=1)
+        result = await pool.run(lambda x, y=0: x + y, 2, y=3)
+        
+        assert result == 5
+        assert pool.get_stats()['completed'] == 1
+        pool.shutdown()
     
-    def test_root_endpoint(self, client):
-        """Test root endpoint."""
-        response = client.get("/")
-        assert response.status_code == 200
+    @pytest.mark.asyncio
+    async def test_runs_bound_detector_methods(self):
+        """Test that detector methods (objects holding locks) can be submitted."""
+        from app.services.inference_executor import InferencePool
+        from app.models.fall_detector import fall_detector
         
-        data = response.json()
-        assert data['service'] == 'ElderNest ML Service'
-        assert 'capabilities' in data
+        pool = InferencePool('test', workers=1, queue_size=1)
+        result = await pool.run(fall_detector.detect_fall, create_test_image())
+        
+        assert 'fall_detected' in result
+        pool.shutdown()
     
-    def test_health_endpoint(self, client):
-        """Test health check endpoint."""
-        response = client.get("/health")
-        assert response.status_code == 200
+    @pytest.mark.asyncio
+    async def test_queue_full_rejects(self):
+        """Test that calls beyond capacity are rejected, not queued."""
+        import asyncio
+        import threading
+        from app.services.inference_executor import InferencePool, InferenceQueueFull
         
-        data = response.json()
-        assert data['status'] == 'healthy'
+        pool = InferencePool('test', workers=1, queue_size=0)
+        release = threading.Event()
+        
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        
+        with pytest.raises(InferenceQueueFull):
+            await pool.run(lambda: None)
+        
+        release.set()
+        await running
+        assert pool.get_stats()['rejected'] == 1
+        pool.shutdown()
     
-    def test_analyze_emotion_endpoint(self, client):
-        """Test emotion analysis endpoint."""
-        image_b64 = create_test_image()
+    @pytest.mark.asyncio
+    async def test_cancelled_call_holds_slot_until_thread_finishes(self):
+        """Test that cancelling the caller neither frees a busy worker's slot nor counts as completed."""
+        import asyncio
+        import threading
+        import time
+        from app.services.inference_executor import InferencePool, InferenceQueueFull
         
-        response = client.post(
-            "/api/analyze-emotion",
-            json={"image": image_b64}
+        pool = InferencePool('test', workers=1, queue_size=0)
+        release = threading.Event()
+        
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+        
+        assert pool.get_stats()['in_flight'] == 1
+        with pytest.raises(InferenceQueueFull):
+            await pool.run(lambda: None)
+        
+        release.set()
+        deadline = time.monotonic() + 2
+        while pool.get_stats()['in_flight'] and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        
+        stats = pool.get_stats()
+        assert stats['in_flight'] == 0
+        assert stats['cancelled'] == 1
+        assert stats['completed'] == 0 and stats['failed'] == 0
+        assert await pool.run(lambda: 'ok') == 'ok'
+        pool.shutdown()
+    
+    @pytest.mark.asyncio
+    async def test_families_run_in_parallel(self):
+        """Test that different model families do not block each other."""
+        import asyncio
+        import time
+        from app.services.inference_executor import InferenceExecutor
+        
+        executor = InferenceExecutor()
+        start = time.perf_counter()
+        await asyncio.gather(
+            executor.run('emotion', time.sleep, 0.2),
+            executor.run('pose', time.sleep, 0.2),
+            executor.run('face', time.sleep, 0.2)
         )
         
-        assert response.status_code == 200
-        data = response.json()
-        assert 'emotion' in data
+        assert time.perf_counter() - start < 0.5
+        executor.shutdown()
+
+
+class TestPoseEstimator:
+    """Tests for the shared pose estimator."""
     
-    def test_detect_fall_endpoint(self, client):
-        """Test fall detection endpoint."""
-        image_b64 = create_test_image()
+    def _counting_estimator(self, delay: float = 0.0):
+        """Create an estimator whose inference is a counted stub."""
+        import time
+        from app.models.pose_estimator import PoseEstimator, PoseResult
         
-        response = client.post(
-            "/api/detect-fall",
-            json={"image": image_b64}
+        estimator = PoseEstimator(cache_size=2)
+        estimator.calls = 0
+        
+        def fake_infer(image):
+            estimator.calls += 1
+            time.sleep(delay)
+            keypoints = np.ones((1, 17, 2), dtype=np.float32)
+            return PoseResult(keypoints, np.ones((1, 17), dtype=np.float32), image.shape[:2])
+        
+        estimator._infer = fake_infer
+        return estimator
+    
+    def test_detectors_share_one_estimator(self):
+        """Test that all pose consumers use the same model instance."""
+        from app.models.pose_estimator import pose_estimator
+        from app.models.fall_detector import fall_detector
+        from app.services.health_state_detector import health_state_detector
+        from app.services.intruder_detector import intruder_detector
+        
+        assert fall_detector.pose_estimator is pose_estimator
+        assert health_state_detector.pose_estimator is pose_estimator
+        assert intruder_detector.pose_estimator is pose_estimator
+    
+    def test_keypoints_memoized_per_frame(self):
+        """Test that repeated estimates for a frame run inference once."""
+        estimator = self._counting_estimator()
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+        
+        first = estimator.estimate(image, frame_key='frame-1')
+        second = estimator.estimate(image, frame_key='frame-1')
+        
+        assert first is second
+        assert estimator.calls == 1
+        assert first.detected
+    
+    def test_concurrent_requests_coalesced(self):
+        """Test that parallel detectors on one frame share one inference."""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        estimator = self._counting_estimator(delay=0.1)
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+        
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            results = list(pool.map(
+                lambda _: estimator.estimate(image, frame_key='frame-2'), range(3)
+            ))
+        
+        assert estimator.calls == 1
+        assert all(r is results[0] for r in results)
+    
+    def test_cache_is_bounded(self):
+        """Test that old frames are evicted from the cache."""
+        estimator = self._counting_estimator()
+        image = np.zeros((32, 32, 3), dtype=np.uint8)
+        
+        for key in ['a', 'b', 'c']:
+            estimator.estimate(image, frame_key=key)
+        estimator.estimate(image, frame_key='a')
+        
+        assert estimator.get_stats()['cached_frames'] == 2
+        assert estimator.calls == 4
+
+
+class TestPoseFaceROI:
+    """Tests for face regions derived from pose keypoints."""
+    
+    def _pose(self, head_points, confidence=0.9):
+        """PoseResult with the given head keypoints (0-4)."""
+        from app.models.pose_estimator import PoseResult
+        
+        keypoints = np.zeros((1, 17, 2), dtype=np.float32)
+        keypoints[0, :5] = head_points
+        confidences = np.full((1, 17), confidence, dtype=np.float32)
+        return PoseResult(keypoints, confidences, (480, 640))
+    
+    def test_face_box_from_eyes(self):
+        """Test that the face box is centered on the head keypoints."""
+        pose = self._pose([[320, 200], [300, 190], [340, 190], [280, 195], [360, 195]])
+        
+        boxes = pose.face_boxes()
+        
+        assert len(boxes) == 1
+        x1, y1, x2, y2 = boxes[0]
+        assert x1 < 300 and x2 > 340
+        assert y1 < 190 and y2 > 200
+        assert (x2 - x1) == (y2 - y1) == 100
+    
+    def test_no_box_without_keypoints(self):
+        """Test that low-confidence head keypoints give no box."""
+        pose = self._pose([[320, 200], [300, 190], [340, 190], [0, 0], [0, 0]], confidence=0.1)
+        
+        assert pose.face_boxes() == []
+    
+    def test_emotion_uses_pose_roi(self):
+        """Test that pose-ROI mode skips the face detector."""
+        from app.models.emotion_detector import EmotionDetector
+        
+        detector = EmotionDetector()
+        detector.is_available = True
+        detector.face_roi_from_pose = True
+        detector._emotion_model = TestBatchedEmotion.FakeEmotionModel()
+        
+        def no_detector(image):
+            raise AssertionError("face detector should be skipped")
+        
+        detector._extract_face = no_detector
+        detector.pose_estimator = type('Stub', (), {
+            'face_boxes': staticmethod(lambda frame: [(10, 10, 90, 90)])
+        })()
+        
+        result = detector.analyze_emotion(create_test_image())
+        detector.shutdown()
+        
+        assert result['face_detected'] is True
+        assert detector._emotion_model.batch_shapes == [(1, 48, 48, 1)]
+
+
+class TestFrameContext:
+    """Tests for the decode-once frame context."""
+    
+    def test_views_decoded_once(self):
+        """Test that derived views are cached on the frame."""
+        from app.utils.frame_context import FrameContext
+        
+        frame = FrameContext.from_base64(create_test_image(120, 80))
+        
+        assert frame.bgr is frame.bgr
+        assert frame.gray is frame.gray
+        assert frame.shape == (80, 120, 3)
+        assert frame.rgb.shape == (80, 120, 3)
+    
+    def test_data_uri_prefix(self):
+        """Test that data URI prefixes are accepted."""
+        from app.utils.frame_context import FrameContext
+        
+        image = create_test_image(50, 50)
+        plain = FrameContext.from_base64(image)
+        prefixed = FrameContext.from_base64(f"data:image/png;base64,{image}")
+        
+        assert prefixed.shape == (50, 50, 3)
+        assert prefixed.key == plain.key
+    
+    def test_bytes_and_base64_share_key(self):
+        """Test that the same image has the same key however it arrives."""
+        from app.utils.frame_context import FrameContext
+        
+        image = create_test_image()
+        from_b64 = FrameContext.from_base64(image)
+        from_bytes = FrameContext.from_bytes(base64.b64decode(image))
+        
+        assert from_b64.key == from_bytes.key
+        assert np.array_equal(from_b64.bgr, from_bytes.bgr)
+    
+    def test_invalid_data(self):
+        """Test that undecodable frames report None instead of raising."""
+        from app.utils.frame_context import FrameContext, FrameDecodeError
+        
+        frame = FrameContext.from_bytes(b"not an image")
+        
+        assert frame.try_decode() is None
+        with pytest.raises(FrameDecodeError):
+            _ = frame.bgr
+    
+    def test_downscaled(self):
+        """Test that downscaled views keep aspect ratio."""
+        from app.utils.frame_context import FrameContext
+        
+        frame = FrameContext.from_base64(create_test_image(640, 480))
+        small = frame.downscaled(160, gray=True)
+        
+        assert small.shape == (120, 160)
+        assert frame.downscaled(160, gray=True) is small
+
+
+class TestMicroBatcher:
+    """Tests for the inference micro-batcher."""
+    
+    def test_concurrent_items_batched(self):
+        """Test that items submitted together run as one batch."""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.utils.micro_batcher import MicroBatcher
+        
+        batches = []
+        
+        def double(items):
+            batches.append(len(items))
+            return [item * 2 for item in items]
+        
+        batcher = MicroBatcher('test', double, max_batch_size=4, window_ms=100)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(batcher.submit, range(4)))
+        batcher.shutdown()
+        
+        assert results == [0, 2, 4, 6]
+        assert sum(batches) == 4
+        assert max(batches) > 1
+        
+        stats = batcher.get_stats()
+        assert stats['items'] == 4
+        assert stats['largest_batch'] == max(batches)
+        assert 'avg_queue_wait_ms' in stats
+    
+    def test_batch_errors_reach_callers(self):
+        """Test that a failing batch raises in every waiting caller."""
+        from app.utils.micro_batcher import MicroBatcher
+        
+        def fail(items):
+            raise ValueError("model error")
+        
+        batcher = MicroBatcher('test', fail, max_batch_size=2, window_ms=1)
+        with pytest.raises(ValueError):
+            batcher.submit(1)
+        batcher.shutdown()
+    
+    def test_submit_racing_shutdown_never_hangs(self):
+        """Test that every submit either resolves or is refused once shut down."""
+        from concurrent.futures import ThreadPoolExecutor, wait
+        from app.utils.micro_batcher import MicroBatcher
+        
+        batcher = MicroBatcher('test', lambda items: list(items), max_batch_size=4, window_ms=1)
+        batcher.submit(0)
+        
+        def submit(item):
+            try:
+                return batcher.submit(item)
+            except RuntimeError:
+                return None
+        
+        pool = ThreadPoolExecutor(max_workers=8)
+        futures = [pool.submit(submit, i) for i in range(200)]
+        batcher.shutdown()
+        done, pending = wait(futures, timeout=5)
+        pool.shutdown(wait=False)
+        
+        assert not pending
+        with pytest.raises(RuntimeError):
+            batcher.submit(1)
+    
+    def test_batching_disabled(self):
+        """Test that max_batch_size=1 runs inline."""
+        from app.utils.micro_batcher import MicroBatcher
+        
+        batcher = MicroBatcher('test', lambda items: [i + 1 for i in items], max_batch_size=1)
+        
+        assert batcher.submit(1) == 2
+        assert not batcher.enabled
+        assert batcher._thread is None
+
+
+class TestBatchedEmotion:
+    """Tests for the batched emotion classifier path."""
+    
+    class FakeEmotionModel:
+        """Stand-in for the Keras emotion classifier."""
+        
+        def __init__(self):
+            self.batch_shapes = []
+        
+        def predict(self, batch, verbose=0):
+            self.batch_shapes.append(batch.shape)
+            # Unnormalized scores; 'sad' dominant
+            row = np.array([1, 1, 1, 1, 5, 1, 0], dtype=np.float32)
+            return np.tile(row, (batch.shape[0], 1))
+    
+    def _batched_detector(self):
+        """Create a detector wired to the fake classifier."""
+        from app.models.emotion_detector import EmotionDetector
+        
+        detector = EmotionDetector()
+        detector.is_available = True
+        detector._loaded = True
+        detector._emotion_model = self.FakeEmotionModel()
+        detector._extract_face = lambda image: np.full((48, 48), 0.5, dtype=np.float32)
+        return detector
+    
+    def test_classify_faces_stacks_batch(self):
+        """Test that face crops are classified in one forward pass."""
+        detector = self._batched_detector()
+        faces = [np.zeros((48, 48), dtype=np.float32) for _ in range(3)]
+        
+        results = detector._classify_faces(faces)
+        
+        assert detector._emotion_model.batch_shapes == [(3, 48, 48, 1)]
+        assert len(results) == 3
+        assert abs(sum(results[0].values()) - 100) < 1e-3
+        assert max(results[0], key=results[0].get) == 'sad'
+    
+    def test_batched_result_matches_analyze_format(self):
+        """Test that the batched path returns the usual emotion dict."""
+        detector = self._batched_detector()
+        
+        result = detector.analyze_emotion(create_test_image())
+        detector.shutdown()
+        
+        assert result['emotion'] == 'sad'
+        assert result['face_detected'] is True
+        assert set(result['all_emotions']) == set(detector.EMOTION_LABELS)
+        assert result['distress_level'] in ['low', 'medium', 'high', 'critical']
+        assert 'pain_detected' in result
+        assert 'mock' not in result
+    
+    def test_quality_gate_skips_model(self):
+        """Test that dark and blurry frames never reach the classifier."""
+        from app.utils.frame_context import FrameContext
+        
+        detector = self._batched_detector()
+        dark = FrameContext.from_array(np.full((200, 200, 3), 10, dtype=np.uint8))
+        flat = FrameContext.from_array(np.full((200, 200, 3), 128, dtype=np.uint8))
+        
+        for frame in (dark, flat):
+            result = detector.analyze_emotion(frame)
+            assert result['image_quality'] == 'poor'
+            assert result['face_detected'] is False
+        
+        detector.shutdown()
+        assert detector._emotion_model.batch_shapes == []
+    
+    def test_quality_gate_flags_blurred_hd_frame(self):
+        """Test that blur is judged at native scale, not on the downscaled view."""
+        import cv2
+        from app.models.emotion_detector import emotion_detector
+        from app.utils.frame_context import FrameContext
+        
+        rng = np.random.default_rng(0)
+        sharp = np.full((1080, 1920, 3), 120, dtype=np.uint8)
+        for _ in range(400):
+            x, y = rng.integers(0, 1880), rng.integers(0, 1040)
+            w, h = rng.integers(10, 60, 2)
+            cv2.rectangle(sharp, (int(x), int(y)), (int(x + w), int(y + h)), int(rng.integers(0, 255)), -1)
+        blurred = cv2.GaussianBlur(sharp, (21, 21), 0)
+        
+        assert emotion_detector._assess_image_quality(FrameContext.from_array(sharp)) != 'poor'
+        assert emotion_detector._assess_image_quality(FrameContext.from_array(blurred)) == 'poor'
+
+
+class TestCameraSession:
+    """Tests for per-connection camera session state."""
+    
+    @pytest.mark.asyncio
+    async def test_latest_frame_wins(self):
+        """Test that unanalyzed frames are replaced, not queued."""
+        from app.services.camera_session import CameraSession
+        from app.utils.frame_context import FrameContext
+        
+        session = CameraSession('test-user', fps=10)
+        first = FrameContext.from_bytes(b'1')
+        second = FrameContext.from_bytes(b'2')
+        session.offer(first)
+        session.offer(second)
+        
+        assert await session.next_frame() is second
+        assert session.frames_received == 2
+        assert session.frames_dropped == 1
+    
+    def test_fps_must_be_finite(self):
+        """Test that NaN or infinite rates are refused rather than stored."""
+        from app.services.camera_session import CameraSession, camera_sessions
+        
+        session = CameraSession('test-user', fps=10)
+        for value in (float('nan'), float('inf')):
+            with pytest.raises(ValueError):
+                session.fps = value
+        assert session.fps == 10.0
+        
+        assert camera_sessions.valid_fps(5)
+        assert not any(camera_sessions.valid_fps(value) for value in (float('nan'), float('inf'), True, 0, '5'))
+    
+    @pytest.mark.asyncio
+    async def test_fps_limit(self):
+        """Test that frames are released no faster than the target FPS."""
+        import time
+        from app.services.camera_session import CameraSession
+        from app.utils.frame_context import FrameContext
+        
+        session = CameraSession('test-user', fps=10)
+        session.offer(FrameContext.from_bytes(b'1'))
+        await session.next_frame()
+        
+        start = time.monotonic()
+        session.offer(FrameContext.from_bytes(b'2'))
+        await session.next_frame()
+        
+        assert time.monotonic() - start >= 0.08
+
+
+class TestMotionGate:
+    """Tests for the per-camera motion gate."""
+    
+    def _frame(self, value: int):
+        """Uniform gray frame."""
+        from app.utils.frame_context import FrameContext
+        return FrameContext.from_array(np.full((120, 160, 3), value, dtype=np.uint8))
+    
+    def test_static_scene_reuses_result(self):
+        """Test that an unchanged frame reuses the last analysis."""
+        from app.services.motion_gate import MotionGate
+        
+        gate = MotionGate(enabled=True, threshold=0.02, max_staleness_s=60)
+        cached, motion = gate.check('cam', self._frame(100))
+        assert cached is None
+        
+        gate.update('cam', self._frame(100), {'emotion': 'neutral'})
+        cached, motion = gate.check('cam', self._frame(102))
+        
+        assert cached == {'emotion': 'neutral'}
+        assert motion['gated'] is True
+        assert gate.get_stats()['frames_skipped'] == 1
+    
+    def test_motion_triggers_analysis(self):
+        """Test that a changed scene is analyzed."""
+        from app.services.motion_gate import MotionGate
+        
+        gate = MotionGate(enabled=True, threshold=0.02, max_staleness_s=60)
+        gate.update('cam', self._frame(100), {})
+        
+        moved = self._frame(100)
+        moved.bgr[20:80, 40:100] = 255
+        cached, motion = gate.check('cam', moved)
+        
+        assert cached is None
+        assert motion['reason'] == 'motion'
+    
+    def test_evicts_least_recent_camera(self):
+        """Test that per-camera state is bounded."""
+        from app.services.motion_gate import MotionGate
+        
+        gate = MotionGate(enabled=True, max_cameras=2)
+        gate.update('cam-1', self._frame(100), {})
+        gate.update('cam-2', self._frame(100), {})
+        gate.check('cam-1', self._frame(100))
+        gate.update('cam-3', self._frame(100), {})
+        
+        assert gate.get_stats()['cameras'] == 2
+        assert gate.check('cam-2', self._frame(100))[1]['reason'] == 'no_reference'
+        assert gate.check('cam-1', self._frame(100))[1]['gated'] is True
+    
+    def test_max_staleness(self):
+        """Test that a static scene is re-analyzed once stale."""
+        from app.services.motion_gate import MotionGate
+        
+        gate = MotionGate(enabled=True, threshold=0.02, max_staleness_s=0)
+        gate.update('cam', self._frame(100), {})
+        cached, motion = gate.check('cam', self._frame(100))
+        
+        assert cached is None
+        assert motion['reason'] == 'stale'
+
+
+class TestPoseHistory:
+    """Tests for per-user pose history ring buffers."""
+    
+    def test_running_counters_match_recount(self):
+        """Test that counters stay exact after the ring wraps."""
+        from app.models.pose_history import PoseHistory, POSTURES
+        
+        history = PoseHistory(capacity=5)
+        sequence = ['standing', 'sitting', 'sitting', 'lying', 'fallen',
+                    'standing', 'standing', 'sitting']
+        for i, posture in enumerate(sequence):
+            history.append(posture, 45.0, posture == 'fallen', timestamp=float(i))
+        
+        window = sequence[-5:]
+        summary = history.summary()
+        
+        assert summary['total'] == 5
+        assert summary['posture_counts']['standing'] == window.count('standing')
+        assert summary['fall_events'] == window.count('fallen')
+        assert summary['posture_changes'] == sum(
+            1 for a, b in zip(window, window[1:]) if a != b
         )
+        assert [POSTURES[c] for c in history.ordered()['postures']] == window
+    
+    def test_store_bounds_users(self):
+        """Test that the least recently seen user is evicted."""
+        from app.models.pose_history import PoseHistoryStore
         
-        assert response.status_code == 200
-        data = response.json()
-        assert 'fall_detected' in data
+        store = PoseHistoryStore(capacity=4, max_users=2)
+        store.record('a', 'standing', 80.0, False)
+        store.record('b', 'standing', 80.0, False)
+        store.record('a', 'sitting', 60.0, False)
+        store.record('c', 'lying', 20.0, False)
+        
+        assert len(store) == 2
+        assert store.get('b') is None
+        assert store.get('a').count == 2
+    
+    def test_movement_pattern_per_user(self):
+        """Test that users' movement patterns are independent."""
+        from app.models.fall_detector import FallDetector
+        
+        detector = FallDetector()
+        for _ in range(6):
+            detector._update_history('elder-a', 'sitting', False, 60.0)
+        
+        pattern = detector.analyze_movement_pattern('elder-a')
+        
+        assert pattern['time_sitting_pct'] == 100.0
+        assert pattern['activity_level'] == 'sedentary'
+        assert detector.analyze_movement_pattern('elder-b')['activity_level'] == 'unknown'
+
+
+class TestKeypointTimeline:
+    """Tests for per-user keypoint timelines and torso motion."""
+    
+    def test_compact_storage_and_dedupe(self):
+        """Test float16 storage, wrap-around and per-frame dedupe."""
+        from app.models.keypoint_timeline import KeypointTimeline
+        
+        timeline = KeypointTimeline(capacity=4)
+        assert timeline.keypoints.dtype == np.float16
+        
+        for i in range(6):
+            timeline.append(make_torso_keypoints(100 + i), timestamp=float(i), frame_key=i)
+        assert not timeline.append(make_torso_keypoints(0), timestamp=6.0, frame_key=5)
+        
+        window = timeline.window()
+        assert timeline.count == 4
+        assert list(window['timestamps']) == [2.0, 3.0, 4.0, 5.0]
+        assert window['keypoints'][-1, 5, 1] == pytest.approx(55.0)
+    
+    def test_fall_is_sudden_sitting_is_not(self):
+        """Test that a fast drop scores as sudden and sitting down does not."""
+        from app.models.keypoint_timeline import KeypointTimeline, sudden_drop_score
+        
+        fall = KeypointTimeline()
+        for t, y, flat in [(0.0, 150, False), (0.5, 150, False), (1.0, 260, False), (1.5, 385, True)]:
+            fall.append(make_torso_keypoints(y, flat), timestamp=t)
+        
+        sit = KeypointTimeline()
+        for i, y in enumerate([150, 170, 190, 210, 230]):
+            sit.append(make_torso_keypoints(y), timestamp=i * 0.5)
+        
+        fall_motion = fall.motion()
+        assert fall_motion['peak_drop_velocity'] > 2.0
+        assert fall_motion['peak_acceleration'] > 0
+        assert sudden_drop_score(fall_motion) == 1.0
+        assert sudden_drop_score(sit.motion()) < 0.5
+    
+    def test_gap_starts_new_run(self):
+        """Test that frames before a long gap are ignored."""
+        from app.models.keypoint_timeline import KeypointTimeline
+        
+        timeline = KeypointTimeline()
+        timeline.append(make_torso_keypoints(100), timestamp=0.0)
+        timeline.append(make_torso_keypoints(400), timestamp=2.0)
+        timeline.append(make_torso_keypoints(400), timestamp=2.5)
+        
+        motion = timeline.motion()
+        assert motion['frames'] == 2
+        assert motion['peak_drop_velocity'] == 0.0
+    
+    def test_occluded_keypoint_does_not_move_torso(self):
+        """Test that a missing hip or a frame without hips is not read as motion."""
+        from app.models.keypoint_timeline import KeypointTimeline, sudden_drop_score
+        
+        timeline = KeypointTimeline()
+        for t in range(4):
+            keypoints = make_torso_keypoints(150)
+            confidences = np.ones(17, dtype=np.float32)
+            if t == 1:
+                keypoints[11] = 0  # one hip occluded
+            if t == 2:
+                keypoints[[11, 12]] = 0  # both hips occluded
+                confidences[[11, 12]] = 0
+            timeline.append(keypoints, confidences, timestamp=t * 0.5)
+        
+        motion = timeline.motion()
+        assert motion['frames'] == 3
+        assert motion['peak_drop_velocity'] == 0.0
+        assert motion['drop'] == 0.0
+        assert sudden_drop_score(motion) == 0.0
+    
+    def test_cameras_have_separate_timelines(self):
+        """Test that one elder on two cameras does not read as a jump between them."""
+        from app.models.keypoint_timeline import KeypointTimelineStore, sudden_drop_score
+        
+        store = KeypointTimelineStore()
+        for i in range(4):
+            store.record('elder-a', make_torso_keypoints(150), timestamp=i * 0.5, camera_id='kitchen')
+            store.record('elder-a', make_torso_keypoints(400), timestamp=i * 0.5 + 0.1, camera_id='bedroom')
+        
+        assert len(store) == 2
+        for camera in ('kitchen', 'bedroom'):
+            motion = store.get('elder-a', camera).motion()
+            assert motion['frames'] == 4
+            assert sudden_drop_score(motion) == 0.0
+    
+    def test_health_state_detects_fast_faint(self):
+        """Test that a fast drop to horizontal is fainting without state history."""
+        import time
+        from datetime import datetime
+        from app.models.keypoint_timeline import KeypointTimelineStore
+        from app.services.health_state_detector import HealthStateDetector
+        
+        detector = HealthStateDetector()
+        detector.keypoint_timelines = KeypointTimelineStore()
+        now = time.time()
+        for t, y in [(-1.0, 150), (-0.5, 260)]:
+            detector.keypoint_timelines.record('elder-a', make_torso_keypoints(y), timestamp=now + t)
+        
+        pose = {'detected': True, 'body_angle': 5.0, 'keypoints': make_torso_keypoints(385, True)}
+        movement = detector._analyze_movement('elder-a', pose, datetime.now())
+        state = detector._classify_state(pose, {'detected': True}, movement, [], datetime.now())
+        
+        assert movement['suddenness'] == 1.0
+        assert state['state'] == 'fainting'
+
+
+class TestFaceIndex:
+    """Tests for household face-embedding indexes."""
+    
+    def test_matrix_match_equals_loop(self):
+        """Test that one matrix multiply matches the per-person loop."""
+        from app.models.face_index import HouseholdFaceIndex
+        
+        rng = np.random.default_rng(0)
+        known = rng.normal(size=(50, 128)).astype(np.float32)
+        index = HouseholdFaceIndex()
+        for i, embedding in enumerate(known):
+            index.add(embedding, f'person-{i}', 'family')
+        
+        faces = np.concatenate([known[[3, 17]] + rng.normal(scale=0.05, size=(2, 128)),
+                                rng.normal(size=(1, 128))])
+        matches = index.match(faces, threshold=0.4)
+        
+        for face, match in zip(faces, matches):
+            distances = [
+                1 - np.dot(face, k) / (np.linalg.norm(face) * np.linalg.norm(k)) for k in known
+            ]
+            best = int(np.argmin(distances))
+            if distances[best] < 0.4:
+                assert match['name'] == f'person-{best}'
+                assert match['distance'] == pytest.approx(distances[best], abs=1e-3)
+            else:
+                assert match is None
+        assert [m and m['name'] for m in matches] == ['person-3', 'person-17', None]
+    
+    def test_persists_and_reloads_mmap(self, tmp_path):
+        """Test that enrolments survive a restart as memory-mapped .npy."""
+        from app.models.face_index import FaceIndexStore
+        
+        store = FaceIndexStore(directory=str(tmp_path))
+        store.get('elder-1').add(np.ones(8), 'Asha', 'daughter')
+        store.get('elder-1').add(-np.ones(8), 'Ravi', 'caregiver', source='profile')
+        
+        reloaded = FaceIndexStore(directory=str(tmp_path)).get('elder-1')
+        
+        assert isinstance(reloaded.matrix, np.memmap)
+        assert reloaded.matrix.dtype == np.float32
+        assert [p['name'] for p in reloaded.people] == ['Asha', 'Ravi']
+        assert reloaded.match([np.ones(8)], threshold=0.4)[0]['name'] == 'Asha'
+        
+        assert reloaded.remove(source='profile') == 1
+        assert len(FaceIndexStore(directory=str(tmp_path)).get('elder-1')) == 1
+        assert len(store.get('elder-2')) == 0
+    
+    def test_intruder_counts_unknown_faces(self, tmp_path):
+        """Test that intruder matching uses the household index."""
+        from app.models.face_index import FaceIndexStore
+        from app.services.intruder_detector import IntruderDetector
+        
+        detector = IntruderDetector()
+        detector.face_index = FaceIndexStore(directory=str(tmp_path))
+        known = detector._get_known_faces('elder-1')
+        known.add(np.ones(4), 'Asha', 'daughter')
+        
+        matches = detector._match_faces(
+            [np.array([1.0, 1.0, 1.0, 0.9]), np.array([1.0, -1.0, 1.0, -1.0])], known
+        )
+        
+        assert matches[0]['name'] == 'Asha'
+        assert matches[1] is None
+    
+    @pytest.mark.asyncio
+    async def test_photo_sync_embeds_only_new_photos(self, tmp_path, monkeypatch):
+        """Test that unchanged photos are served from the embedding cache."""
+        import httpx
+        import app.services.intruder_detector as intruder_module
+        from app.models.face_index import EmbeddingCache, FaceIndexStore
+        from app.services.data_aggregator import data_aggregator
+        from app.services.intruder_detector import IntruderDetector
+        
+        photos = {f'https://photos.example/{i}.jpg': bytes([i]) * 64 for i in range(3)}
+        requests_seen = []
+        
+        def handler(request):
+            requests_seen.append(request.headers.get('if-none-match'))
+            etag = f'"{request.url.path}"'
+            if request.headers.get('if-none-match') == etag:
+                return httpx.Response(304)
+            return httpx.Response(200, content=photos[str(request.url)], headers={'ETag': etag})
+        
+        async def fake_profile(user_id):
+            return {'manualFamilyMembers': [
+                {'name': f'member-{i}', 'relation': 'family', 'photoURL': url}
+                for i, url in enumerate(photos)
+            ]}
+        
+        detector = IntruderDetector()
+        detector.face_index = FaceIndexStore(directory=str(tmp_path))
+        detector.embedding_cache = EmbeddingCache(str(tmp_path / 'embeddings'))
+        detector._http_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        embedded = []
+        
+        def fake_embed(content):
+            embedded.append(content)
+            return np.frombuffer(content[:8], dtype=np.uint8).astype(np.float32) + 1
+        
+        detector._embed_photo = fake_embed
+        monkeypatch.setattr(intruder_module, 'FACE_REC_AVAILABLE', True)
+        monkeypatch.setattr(data_aggregator, '_fetch_user_profile', fake_profile)
+        
+        assert await detector._sync_family_photos('elder-1') is True
+        assert await detector._sync_family_photos('elder-1') is False
+        
+        assert len(embedded) == 3
+        assert requests_seen[3:] == [f'"/{i}.jpg"' for i in range(3)]
+        assert [p['name'] for p in detector.face_index.get('elder-1').people] == [
+            'member-0', 'member-1', 'member-2'
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_failed_photo_keeps_member_enrolled(self, tmp_path, monkeypatch):
+        """Test that one member's failed download neither aborts the sync nor un-enrolls them."""
+        import httpx
+        import app.services.intruder_detector as intruder_module
+        from app.models.face_index import EmbeddingCache, FaceIndexStore
+        from app.services.data_aggregator import data_aggregator
+        from app.services.intruder_detector import IntruderDetector
+        
+        photos = {f'https://photos.example/{i}.jpg': bytes([i]) * 64 for i in range(3)}
+        failing = set()
+        
+        def handler(request):
+            if str(request.url) in failing:
+                return httpx.Response(503)
+            return httpx.Response(200, content=photos[str(request.url)])
+        
+        async def fake_profile(user_id):
+            return {'manualFamilyMembers': [
+                {'name': f'member-{i}', 'relation': 'family', 'photoURL': url}
+                for i, url in enumerate(photos)
+            ]}
+        
+        detector = IntruderDetector()
+        detector.face_index = FaceIndexStore(directory=str(tmp_path))
+        detector.embedding_cache = EmbeddingCache(str(tmp_path / 'embeddings'))
+        detector._http_client = lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        detector._embed_photo = lambda content: np.frombuffer(content[:8], dtype=np.uint8).astype(np.float32) + 1
+        monkeypatch.setattr(intruder_module, 'FACE_REC_AVAILABLE', True)
+        monkeypatch.setattr(data_aggregator, '_fetch_user_profile', fake_profile)
+        
+        await detector._sync_family_photos('elder-1')
+        before = [p['person_id'] for p in detector.face_index.get('elder-1').people]
+        failing.add('https://photos.example/0.jpg')
+        photos['https://photos.example/2.jpg'] = bytes([9]) * 64
+        assert await detector._sync_family_photos('elder-1') is True
+        
+        people = detector.face_index.get('elder-1').people
+        assert [p['name'] for p in people] == ['member-0', 'member-1', 'member-2']
+        assert [p['person_id'] for p in people[:2]] == before[:2]
+        assert people[2]['person_id'] != before[2]
+    
+    @pytest.mark.asyncio
+    async def test_photo_client_refuses_other_hosts(self):
+        """Test that photos (and redirects) outside FACE_PHOTO_HOSTS are not fetched."""
+        import httpx
+        from app.services.intruder_detector import IntruderDetector
+        
+        fetched = []
+        
+        def handler(request):
+            fetched.append(str(request.url))
+            if request.url.path == '/redirect':
+                return httpx.Response(302, headers={'Location': 'http://169.254.169.254/latest/meta-data/'})
+            return httpx.Response(200, content=b'photo')
+        
+        detector = IntruderDetector()
+        async with detector._http_client(transport=httpx.MockTransport(handler)) as client:
+            ok = await client.get('https://firebasestorage.googleapis.com/v0/b/app/o/a.jpg')
+            assert (await client.get('https://lh3.googleusercontent.com/a.jpg')).content == b'photo'
+            for url in [
+                'http://169.254.169.254/latest/meta-data/',
+                'http://firebasestorage.googleapis.com/v0/b/app/o/a.jpg',
+                'https://firebasestorage.googleapis.com.evil.example/a.jpg',
+                'https://firebasestorage.googleapis.com/redirect'
+            ]:
+                with pytest.raises(ValueError):
+                    await client.get(url)
+        
+        assert ok.content == b'photo'
+        assert not any('169.254' in url or 'evil' in url for url in fetched)
+    
+    @pytest.mark.asyncio
+    async def test_sync_runs_in_background(self, tmp_path):
+        """Test that known faces are returned without waiting for the sync."""
+        import asyncio
+        from app.models.face_index import FaceIndexStore
+        from app.services.intruder_detector import IntruderDetector
+        
+        detector = IntruderDetector()
+        detector.face_index = FaceIndexStore(directory=str(tmp_path))
+        release = asyncio.Event()
+        
+        async def slow_sync(user_id):
+            await release.wait()
+            return True
+        
+        detector._sync_family_photos = slow_sync
+        
+        known = await asyncio.wait_for(detector._sync_and_get_known_faces('elder-1'), timeout=1)
+        await detector._sync_and_get_known_faces('elder-1')
+        
+        assert len(known) == 0
+        assert list(detector._sync_tasks) == ['elder-1']
+        release.set()
+        await asyncio.sleep(0.01)
+        assert detector._sync_tasks == {}
+
+
+class TestFaceTracker:
+    """Tests for carrying face identities across frames."""
+    
+    def test_tracks_follow_moving_faces(self):
+        """Test IoU matching, new tracks and re-verification."""
+        from app.models.face_tracker import FaceTracker
+        
+        tracker = FaceTracker(iou_threshold=0.3, max_age_s=60.0, reverify_s=30.0)
+        
+        tracks, stale = tracker.update('cam', [(100, 100, 200, 200)], now=0.0)
+        assert stale == tracks
+        tracker.label(tracks[0], {'name': 'Asha'}, now=0.0)
+        
+        # Same face, moved a little, plus a newcomer
+        moved, stale = tracker.update('cam', [(400, 100, 500, 200), (110, 105, 210, 205)], now=0.5)
+        assert moved[1] is tracks[0]
+        assert moved[1].label == {'name': 'Asha'}
+        assert stale == [moved[0]]
+        
+        # Due for re-verification after the interval
+        _, stale = tracker.update('cam', [(112, 105, 212, 205)], now=31.0)
+        assert stale and stale[0] is tracks[0]
+        
+        # Track expires after it is not seen for max_age_s
+        fresh, _ = tracker.update('cam', [(112, 105, 212, 205)], now=100.0)
+        assert fresh[0] is not tracks[0]
+    
+    @pytest.mark.asyncio
+    async def test_intruder_embeds_tracked_face_once(self, tmp_path, monkeypatch):
+        """Test that a person standing in view is embedded once, not per frame."""
+        from datetime import datetime
+        import app.services.intruder_detector as intruder_module
+        from app.models.face_index import FaceIndexStore
+        from app.services.intruder_detector import IntruderDetector
+        
+        monkeypatch.setattr(intruder_module, 'FACE_REC_AVAILABLE', True)
+        detector = IntruderDetector()
+        detector.face_index = FaceIndexStore(directory=str(tmp_path))
+        detector.face_index.get('elder-1').add(np.ones(4), 'Asha', 'daughter')
+        detector.last_sync_time['elder-1'] = float('inf')
+        
+        embedded = []
+        detector._detect_face_boxes = lambda frame: [(100, 100, 200, 200)]
+        
+        def fake_embed(frame, boxes):
+            embedded.extend(boxes)
+            return [np.ones(4) for _ in boxes]
+        
+        detector._embed_boxes = fake_embed
+        
+        image = create_test_image()
+        results = [
+            await detector.detect_intruder('elder-1', image, datetime(2026, 1, 1, 12))
+            for _ in range(10)
+        ]
+        
+        assert len(embedded) == 1
+        assert all(r['details']['known_people'] == ['Asha'] for r in results)
+        assert not any(r['intruder_detected'] for r in results)
+        assert detector.face_tracker.get_stats()['embed_ratio'] == 0.1
+    
+    @pytest.mark.asyncio
+    async def test_cameras_have_separate_tracks(self, tmp_path, monkeypatch):
+        """Test that a stranger on one camera does not inherit a family member's track from another."""
+        from datetime import datetime
+        import app.services.intruder_detector as intruder_module
+        from app.models.face_index import FaceIndexStore
+        from app.services.intruder_detector import IntruderDetector
+        
+        monkeypatch.setattr(intruder_module, 'FACE_REC_AVAILABLE', True)
+        detector = IntruderDetector()
+        detector.face_index = FaceIndexStore(directory=str(tmp_path))
+        detector.face_index.get('elder-1').add(np.ones(4), 'Asha', 'daughter')
+        detector.last_sync_time['elder-1'] = float('inf')
+        
+        # Same box position on both cameras; only the kitchen shows Asha
+        kitchen, porch = create_test_image(), create_test_image(width=220)
+        detector._detect_face_boxes = lambda frame: [(100, 100, 200, 200)]
+        detector._embed_boxes = lambda frame, boxes: [
+            np.ones(4) if frame.bgr.shape[1] == 200 else np.array([1.0, -1.0, 1.0, -1.0])
+            for _ in boxes
+        ]
+        
+        now = datetime(2026, 1, 1, 12)
+        first = await detector.detect_intruder('elder-1', kitchen, now, camera_id='kitchen')
+        second = await detector.detect_intruder('elder-1', porch, now, camera_id='porch')
+        
+        assert first['details']['known_people'] == ['Asha']
+        assert second['intruder_detected']
+        assert detector.face_tracker.get_stats()['cameras'] == 2
+
+
+class TestOnnxBackend:
+    """Tests for the ONNX Runtime backend helpers."""
+    
+    def test_letterbox_geometry(self):
+        """Test that frames are scaled and padded to a centered square."""
+        from app.models.onnx_backend import letterbox
+        
+        padded, scale, pad = letterbox(np.zeros((480, 1280, 3), dtype=np.uint8), 640)
+        
+        assert padded.shape == (640, 640, 3)
+        assert scale == 0.5
+        assert pad == (0, 200)
+        assert padded[0, 0, 0] == 114
+    
+    def test_decode_pose_output(self):
+        """Test NMS, ordering and mapping keypoints back to the frame."""
+        from app.models.onnx_backend import decode_pose_output
+        
+        output = np.zeros((56, 8), dtype=np.float32)
+        # cx, cy, w, h, score for three candidate people
+        output[:5, 0] = [320, 300, 100, 200, 0.6]
+        output[:5, 1] = [100, 300, 80, 200, 0.9]
+        output[:5, 2] = [102, 300, 80, 200, 0.8]   # Overlaps candidate 1
+        keypoints = output[5:].reshape(17, 3, 8)
+        keypoints[:, 0, 1] = 100
+        keypoints[:, 1, 1] = 280    # Letterboxed y (80px top pad)
+        keypoints[:, 2, 1] = 0.95
+        
+        xy, conf = decode_pose_output(output, 1.0, (0, 80), (480, 640))
+        
+        assert xy.shape == (2, 17, 2)
+        assert conf.shape == (2, 17)
+        assert np.allclose(xy[0], [100, 200])
+        assert np.allclose(conf[0], 0.95)
+    
+    def test_float32_models_by_default(self, tmp_path, monkeypatch):
+        """Test that INT8 quantization is opt-in."""
+        from app.models import onnx_backend
+        
+        (tmp_path / 'model.onnx').write_bytes(b'')
+        monkeypatch.setenv('ONNX_MODEL_DIR', str(tmp_path))
+        monkeypatch.delenv('ONNX_QUANTIZE', raising=False)
+        monkeypatch.setattr(onnx_backend, 'quantize_int8', lambda source, target: target)
+        
+        assert onnx_backend.resolve_model('model') == str(tmp_path / 'model.onnx')
+        
+        monkeypatch.setenv('ONNX_QUANTIZE', 'int8')
+        assert onnx_backend.resolve_model('model') == str(tmp_path / 'model.int8.onnx')
+    
+    def test_falls_back_without_onnxruntime(self, monkeypatch):
+        """Test that the ONNX backend is only used when it can run."""
+        from app.models import onnx_backend
+        
+        monkeypatch.setenv('INFERENCE_BACKEND', 'onnx')
+        assert onnx_backend.use_onnx() == onnx_backend.ONNX_AVAILABLE
+        
+        monkeypatch.setenv('INFERENCE_BACKEND', 'native')
+        assert onnx_backend.use_onnx() is False
+
+
+class TestInferenceWorkers:
+    """Tests for the shared-memory frame ring and worker processes."""
+    
+    def test_ring_round_trip(self):
+        """Test that a frame written to a slot reads back unchanged."""
+        from app.utils.shared_frame_ring import SharedFrameRing
+        
+        ring = SharedFrameRing(slots=2, slot_bytes=64 * 64 * 3)
+        try:
+            frame = np.random.randint(0, 255, (64, 64, 3), dtype=np.uint8)
+            slot = ring.acquire()
+            spec = ring.write(slot, frame)
+            
+            assert np.array_equal(ring.view(spec), frame)
+            assert ring.in_use == 1
+            
+            ring.release(slot)
+            assert ring.in_use == 0
+        finally:
+            ring.close()
+    
+    def test_ring_bounds(self):
+        """Test slot exhaustion and oversized frames."""
+        from app.utils.shared_frame_ring import SharedFrameRing
+        
+        ring = SharedFrameRing(slots=1, slot_bytes=16)
+        try:
+            slot = ring.acquire()
+            with pytest.raises(TimeoutError):
+                ring.acquire(timeout=0.01)
+            with pytest.raises(ValueError):
+                ring.write(slot, np.zeros(32, dtype=np.uint8))
+            ring.release(slot)
+        finally:
+            ring.close()
+    
+    def test_workers_route_detectors(self):
+        """Test that detectors dispatch to a worker process and back."""
+        from app.services.inference_workers import InferenceWorkers
+        from app.models.pose_estimator import pose_estimator
+        from app.models.emotion_detector import emotion_detector
+        from app.utils.frame_context import FrameContext
+        
+        workers = InferenceWorkers()
+        workers.enabled = True
+        workers.processes = 1
+        workers.slots = 2
+        workers.start()
+        try:
+            assert pose_estimator.remote is workers
+            assert emotion_detector.remote is workers
+            
+            frame = FrameContext.from_base64(create_test_image())
+            result = emotion_detector.analyze_emotion(frame)
+            poses = workers.pose_batch([frame.bgr])
+            
+            assert 'emotion' in result
+            assert result['image_quality'] == 'good'
+            assert len(poses) == 1
+            assert workers.get_stats()['calls'] == 2
+            assert workers.get_stats()['ring_slots_in_use'] == 0
+        finally:
+            workers.stop()
+        
+        assert pose_estimator.remote is None
+        assert emotion_detector.remote is None
+    
+    def test_remote_emotion_batched_in_api_process(self):
+        """Test that worker-topology emotion frames are batched before dispatch, with pose face boxes."""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.models.emotion_detector import EmotionDetector
+        from app.utils.frame_context import FrameContext
+        
+        class FakeRemote:
+            def __init__(self):
+                self.batches = []
+            
+            def analyze_emotion_batch(self, frames, boxes):
+                self.batches.append(list(boxes))
+                return [{'emotion': 'happy', 'face_detected': True} for _ in frames]
+        
+        detector = EmotionDetector()
+        detector.load()
+        detector.remote = FakeRemote()
+        detector.face_roi_from_pose = True
+        detector.pose_estimator = type('Stub', (), {
+            'face_boxes': staticmethod(lambda frame: [(10, 10, 60, 60)])
+        })()
+        detector._remote_batcher.window = 0.2
+        
+        frames = [FrameContext.from_base64(create_test_image(width=200 + i)) for i in range(4)]
+        pool = ThreadPoolExecutor(max_workers=4)
+        try:
+            results = list(pool.map(detector.analyze_emotion, frames))
+        finally:
+            pool.shutdown(wait=False)
+            detector.shutdown()
+        
+        assert all(result['emotion'] == 'happy' for result in results)
+        assert sum(len(batch) for batch in detector.remote.batches) == 4
+        assert len(detector.remote.batches) < 4
+        assert all(box == (10, 10, 60, 60) for batch in detector.remote.batches for box in batch)
+    
+    def test_deferred_models_fail_without_workers(self, monkeypatch):
+        """Test that topology=workers without running workers errors instead of returning empty results."""
+        from app.models.emotion_detector import EmotionDetector
+        from app.models.pose_estimator import PoseEstimator
+        
+        monkeypatch.setenv('INFERENCE_TOPOLOGY', 'workers')
+        pose = PoseEstimator()
+        emotion = EmotionDetector()
+        try:
+            with pytest.raises(RuntimeError):
+                pose.estimate(np.zeros((32, 32, 3), dtype=np.uint8))
+            result = emotion.analyze_emotion(create_test_image())
+            assert result['face_detected'] is False
+            assert 'inference workers are not running' in result['error']
+        finally:
+            pose.shutdown()
+            emotion.shutdown()
+    
+    def test_intruder_face_models_route_to_workers(self, monkeypatch):
+        """Test that face detection and Facenet embedding go to the workers when they run."""
+        import app.services.intruder_detector as intruder_module
+        from app.services.intruder_detector import IntruderDetector
+        from app.utils.frame_context import FrameContext
+        
+        calls = []
+        
+        class FakeRemote:
+            def face_boxes(self, frame):
+                calls.append('detect')
+                return [(0, 0, 20, 20)]
+            
+            def embed_faces(self, frame, boxes):
+                calls.append(('embed', boxes))
+                return [np.ones(4, dtype=np.float32)] * (len(boxes) if boxes is not None else 1)
+        
+        monkeypatch.setattr(intruder_module, 'FACE_REC_AVAILABLE', True)
+        detector = IntruderDetector()
+        detector.remote = FakeRemote()
+        frame = FrameContext.from_base64(create_test_image())
+        
+        boxes = detector._detect_face_boxes(frame)
+        assert detector._embed_boxes(frame, boxes)[0].shape == (4,)
+        assert detector._embed_frame(frame).shape == (4,)
+        assert calls == ['detect', ('embed', [(0, 0, 20, 20)]), ('embed', None)]
+
+    def test_worker_gets_its_thread_share(self, monkeypatch):
+        """Test that a worker's ONNX Runtime threads come from the parent's budget."""
+        import os
+        import importlib
+        from app.utils.shared_frame_ring import SharedFrameRing
+        
+        # The module (app.services re-exports the instance under this name)
+        inference_workers = importlib.import_module('app.services.inference_workers')
+        
+        monkeypatch.setattr(os, 'environ', dict(os.environ, INFERENCE_TOPOLOGY='workers'))
+        os.environ.pop('ONNX_INTRA_OP_THREADS', None)
+        monkeypatch.setattr(inference_workers, '_worker_ring', None)
+        
+        ring = SharedFrameRing(slots=1, slot_bytes=16)
+        try:
+            inference_workers._init_worker(ring.name, 1, 16, 3)
+            assert os.environ['ONNX_INTRA_OP_THREADS'] == '3'
+            assert os.environ['INFERENCE_TOPOLOGY'] == 'inprocess'
+        finally:
+            inference_workers._worker_ring.close()
+            ring.close()
+        
+        workers = inference_workers.InferenceWorkers()
+        workers.processes = 2
+        assert workers.threads_per_process == max(1, (os.cpu_count() or 1) // 2)
+    
+    def test_workers_load_models(self, monkeypatch):
+        """Test that workers spawned with topology=workers hold the models and answer."""
+        from app.services.inference_workers import InferenceWorkers, _worker_status
+        from app.models.pose_estimator import pose_estimator
+        from app.models.emotion_detector import emotion_detector
+        from app.utils.frame_context import FrameContext
+
+        # This process keeps its in-process models
+        pose_estimator.load()
+        emotion_detector.load()
+        # Inherited by the spawned workers, as in production
+        monkeypatch.setenv('INFERENCE_TOPOLOGY', 'workers')
+        workers = InferenceWorkers()
+        workers.processes = 1
+        workers.slots = 2
+        workers.start()
+        try:
+            status = workers._executor.submit(_worker_status).result()
+            assert status['models_loaded']
+
+            frame = FrameContext.from_base64(create_test_image())
+            result = emotion_detector.analyze_emotion(frame)
+            poses = workers.pose_batch([frame.bgr, frame.bgr])
+
+            assert result['emotion'] in emotion_detector.EMOTION_SCORES
+            assert [pose.image_shape for pose in poses] == [frame.bgr.shape[:2]] * 2
+        finally:
+            workers.stop()
+
+
+class TestModelRegistry:
+    """Tests for deferred model loading."""
+    
+    def test_loads_once_and_reports_state(self):
+        """Test single-flight loading and per-model status."""
+        from app.models.model_registry import ModelRegistry
+        
+        calls = []
+        registry = ModelRegistry(mode='lazy')
+        registry.register('ok', lambda: calls.append('ok'))
+        registry.register('broken', lambda: 1 / 0)
+        
+        assert registry.pending() == ['ok', 'broken']
+        assert registry.load_all() is False
+        assert registry.load('ok') is True
+        
+        status = registry.get_status()
+        assert calls == ['ok']
+        assert status['ready'] is True
+        assert status['models']['ok']['state'] == 'ready'
+        assert status['models']['broken']['state'] == 'failed'
+    
+    def test_background_loading(self):
+        """Test that background loading runs off the calling thread."""
+        import threading
+        from app.models.model_registry import ModelRegistry
+        
+        release = threading.Event()
+        registry = ModelRegistry(mode='background')
+        registry.register('slow', release.wait)
+        
+        registry.start_background()
+        assert registry.loading and not registry.ready
+        
+        release.set()
+        registry.start_background().join(timeout=5)
+        assert registry.ready
+
+
+class TestClipAnalyzer:
+    """Tests for streaming clip decode and adaptive sampling."""
+    
+    def test_samples_densely_on_motion(self, tmp_path):
+        """Test sparse sampling of still scenes and dense sampling of motion."""
+        from app.services.clip_analyzer import ClipAnalyzer, _ClipReader
+        
+        path = create_test_clip(str(tmp_path / 'clip.avi'))
+        analyzer = ClipAnalyzer(sample_interval_s=1.0, motion_interval_s=0.2)
+        
+        reader = _ClipReader(path, analyzer)
+        times = [t for t, _, _, _ in reader.take(100)]
+        reader.close()
+        
+        still = [t for t in times if t < 1.5]
+        moving = [t for t in times if t >= 1.5]
+        
+        assert reader.frames_read == 30
+        assert len(still) == 2
+        assert len(moving) >= 6
+        assert all(b - a <= 0.21 for a, b in zip(moving, moving[1:]))
+    
+    @pytest.mark.asyncio
+    async def test_clip_verdicts(self, tmp_path):
+        """Test timeline and aggregated verdicts for a whole clip."""
+        from app.services.clip_analyzer import ClipAnalyzer
+        
+        path = create_test_clip(str(tmp_path / 'clip.avi'))
+        analyzer = ClipAnalyzer(batch_size=4, max_samples=5)
+        
+        result = await analyzer.analyze_clip(path, 'test-user')
+        
+        assert result['clip']['frames_sampled'] == 5
+        assert result['clip']['truncated'] is True
+        assert len(result['timeline']) == 5
+        assert 'fall_detected' in result['fall']
+        assert result['verdict']['distress_level'] in ['low', 'medium', 'high', 'critical']
+    
+    @pytest.mark.asyncio
+    async def test_not_truncated_when_clip_ends_at_limit(self, tmp_path):
+        """Test that a clip with exactly max_samples samples is not truncated."""
+        from app.services.clip_analyzer import ClipAnalyzer, _ClipReader
+        
+        path = create_test_clip(str(tmp_path / 'clip.avi'))
+        reader = _ClipReader(path, ClipAnalyzer())
+        samples = len(reader.take(100))
+        reader.close()
+        
+        result = await ClipAnalyzer(batch_size=4, max_samples=samples).analyze_clip(path, 'test-user')
+        
+        assert result['clip']['frames_sampled'] == samples
+        assert result['clip']['truncated'] is False
+    
+    @pytest.mark.asyncio
+    async def test_clip_lane_bounds_pool_use_and_retries(self, tmp_path, monkeypatch):
+        """Test that clip frames stay within their share of the pools and full pools are retried."""
+        import asyncio
+        from app.services.clip_analyzer import ClipAnalyzer
+        from app.services.inference_executor import InferenceQueueFull
+        from app.services.vision_service import vision_service
+        
+        state = {'in_flight': 0, 'peak': 0, 'calls': 0}
+        
+        async def fake_analyze(frame, **kwargs):
+            state['calls'] += 1
+            if state['calls'] % 3 == 0:
+                raise InferenceQueueFull('pose', 12)
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+            await asyncio.sleep(0.01)
+            state['in_flight'] -= 1
+            return {'pose': {'posture': 'standing'}}
+        
+        monkeypatch.setattr(vision_service, 'analyze_frame', fake_analyze)
+        monkeypatch.setattr(ClipAnalyzer, 'RETRY_BACKOFF_S', 0.001)
+        path = create_test_clip(str(tmp_path / 'clip.avi'))
+        analyzer = ClipAnalyzer(batch_size=8, max_in_flight=2)
+        
+        results = await asyncio.gather(*(analyzer.analyze_clip(path, 'test-user') for _ in range(2)))
+        
+        assert state['peak'] == 2
+        for result in results:
+            assert result['clip']['frames_skipped'] == 0
+            assert all(entry['posture'] == 'standing' for entry in result['timeline'])
+    
+    @pytest.mark.asyncio
+    async def test_clip_frame_skipped_when_pools_stay_full(self, tmp_path, monkeypatch):
+        """Test that a frame the pools keep rejecting is skipped, not a failed clip."""
+        from app.services.clip_analyzer import ClipAnalyzer
+        from app.services.inference_executor import InferenceQueueFull
+        from app.services.vision_service import vision_service
+        
+        async def always_full(frame, **kwargs):
+            raise InferenceQueueFull('pose', 12)
+        
+        monkeypatch.setattr(vision_service, 'analyze_frame', always_full)
+        monkeypatch.setattr(ClipAnalyzer, 'RETRY_BACKOFF_S', 0.001)
+        path = create_test_clip(str(tmp_path / 'clip.avi'))
+        
+        result = await ClipAnalyzer(max_samples=3, queue_retries=2).analyze_clip(path, 'test-user')
+        
+        assert result['clip']['frames_skipped'] == 3
+        assert all(entry['skipped'] for entry in result['timeline'])
+        assert result['fall']['fall_detected'] is False
+    
+    @pytest.mark.asyncio
+    async def test_rejects_non_video(self, tmp_path):
+        """Test that undecodable uploads raise ClipDecodeError."""
+        from app.services.clip_analyzer import ClipAnalyzer, ClipDecodeError
+        
+        path = tmp_path / 'clip.webm'
+        path.write_bytes(b'not a video')
+        
+        with pytest.raises(ClipDecodeError):
+            await ClipAnalyzer().analyze_clip(str(path), 'test-user')
+
+
+class TestDataAggregator:
+    """Tests for the async Firestore data layer behind risk assessment."""
+    
+    @pytest.mark.asyncio
+    async def test_fetches_collections_concurrently(self):
+        """Test that per-user queries are awaited together, not threaded."""
+        from datetime import datetime, timezone
+        from app.services.daily_rollups import DailyRollups
+        from app.services.data_aggregator import DataAggregator
+        
+        now = datetime.now(timezone.utc)
+        firebase = FakeFirestore(
+            collections={
+                'moods': [{'score': -1, 'timestamp': now}, {'score': 1, 'timestamp': now}],
+                'medicines': [{'taken': True, 'timestamp': now}, {'taken': False, 'timestamp': now}],
+                'alerts': [{'type': 'emergency_button', 'timestamp': now}]
+            },
+            profile={'fullName': 'Asha', 'connectedFamily': ['family-1']},
+            delay=0.05
+        )
+        aggregator = DataAggregator(firebase=firebase, rollups=DailyRollups(firebase=firebase, enabled=False))
+        
+        data = await aggregator.fetch_user_data('elder-1', days=7)
+        
+        assert data['elder_name'] == 'Asha'
+        assert data['family_members'] == ['family-1']
+        assert data['mood']['sad_count'] == 1
+        assert data['health'] == {'medicine_missed': 1, 'medicine_adherence': 0.5, 'emergency_presses': 1}
+        assert firebase.max_in_flight == 7
+        assert ('users', 'elder-1') in firebase.calls
+    
+    @pytest.mark.asyncio
+    async def test_fetches_only_requested_sources(self):
+        """Test that the alert path costs a single profile read."""
+        from app.services.daily_rollups import DailyRollups
+        from app.services.data_aggregator import DataAggregator
+        from app.services.user_data_cache import UserDataCache
+        
+        firebase = FakeFirestore(profile={'fullName': 'Asha', 'connectedFamily': ['family-1']})
+        aggregator = DataAggregator(
+            firebase=firebase,
+            cache=UserDataCache(enabled=False),
+            rollups=DailyRollups(firebase=firebase, enabled=False)
+        )
+        
+        data = await aggregator.fetch_user_data('elder-1', sources=['profile'])
+        assert firebase.calls == [('users', 'elder-1')]
+        assert set(data) == {'elder_name', 'family_members', 'period_days', 'fetched_at'}
+        
+        data = await aggregator.fetch_user_data('elder-1', sources=('health', 'activity'))
+        assert [call[0] for call in firebase.calls[1:]] == ['activities', 'medicines', 'alerts']
+        assert set(data) == {'activity', 'health', 'period_days', 'fetched_at'}
+        
+        with pytest.raises(ValueError):
+            await aggregator.fetch_user_data('elder-1', sources=['heartbeat'])
+    
+    @pytest.mark.asyncio
+    async def test_streams_projected_fields(self):
+        """Test that chat metrics are folded from projected documents."""
+        from datetime import datetime, timedelta, timezone
+        from app.services.daily_rollups import DailyRollups, SOURCE_FIELDS
+        from app.services.data_aggregator import DataAggregator
+
+        now = datetime.now(timezone.utc)
+        chats = [
+            {
+                'timestamp': now - timedelta(minutes=i),
+                'sentiment': {'score': -0.5, 'label': 'negative'},
+                'userMessage': 'I feel so alone' if i % 4 == 0 else 'Nice day',
+                'aiResponse': 'A long reply ' * 50
+            }
+            for i in range(1000)
+        ]
+        chats.append({'timestamp': now - timedelta(days=8), 'sentiment': {'score': 1.0}, 'userMessage': 'old'})
+        firebase = FakeFirestore(collections={'chats': chats})
+        aggregator = DataAggregator(firebase=firebase, rollups=DailyRollups(firebase=firebase, enabled=False))
+
+        chat = await aggregator.fetch_chat_data('elder-1', days=7)
+
+        assert chat == {'avg_sentiment': -0.5, 'lonely_mentions': 250, 'health_complaints': 0, 'message_count': 1000}
+        assert firebase.projections['chats'] == SOURCE_FIELDS['chats']
+        assert 'aiResponse' not in SOURCE_FIELDS['chats']
+
+        await aggregator.fetch_user_data('elder-1', sources=['profile'])
+        assert firebase.projections['users'] == ['fullName', 'connectedFamily']
+
+    @pytest.mark.asyncio
+    async def test_uses_mock_data_without_firebase(self):
+        """Test the mock fallback when the shared client is unavailable."""
+        from app.services.alert_service import AlertService
+        from app.services.data_aggregator import DataAggregator
+        from app.utils.firebase_client import firebase_client
+        
+        aggregator = DataAggregator()
+        
+        assert aggregator.firebase is firebase_client
+        assert AlertService().firebase is firebase_client
+        assert aggregator.firebase_initialized is False
+        assert (await aggregator.fetch_user_data('elder-1'))['elder_name'] == 'Test Elder'
+        assert set(await aggregator.fetch_user_data('elder-1', sources=['mood'])) == {
+            'mood', 'period_days', 'fetched_at'
+        }
+
+
+class TestUserDataCache:
+    """Tests for the per-user aggregated data cache."""
+    
+    @staticmethod
+    def counting_loader(values):
+        """Loader returning successive values, counting calls."""
+        import asyncio
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return values[min(len(calls), len(values)) - 1]
+        
+        return loader, calls
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_fetch(self):
+        """Test single-flight loading and fresh hits."""
+        import asyncio
+        from app.services.user_data_cache import UserDataCache
+        
+        cache = UserDataCache(enabled=True)
+        loader, calls = self.counting_loader(['v1'])
+        
+        results = await asyncio.gather(*(cache.get('elder-1', 'chat', loader, 7) for _ in range(5)))
+        
+        assert results == ['v1'] * 5
+        assert await cache.get('elder-1', 'chat', loader, 7) == 'v1'
+        assert len(calls) == 1
+        assert cache.get_stats()['hits'] == 1
+    
+    @pytest.mark.asyncio
+    async def test_serves_stale_while_refreshing(self):
+        """Test that an expired value is returned at once and refreshed in the background."""
+        import asyncio
+        from app.services.user_data_cache import UserDataCache
+        
+        cache = UserDataCache(ttl_s={'vision': 0.0}, stale_s=60, enabled=True)
+        loader, calls = self.counting_loader(['v1', 'v2'])
+        
+        assert await cache.get('elder-1', 'vision', loader) == 'v1'
+        assert await cache.get('elder-1', 'vision', loader) == 'v1'
+        await asyncio.sleep(0.05)
+        
+        assert await cache.get('elder-1', 'vision', loader) == 'v2'
+        assert cache.get_stats()['stale_hits'] >= 1
+    
+    @pytest.mark.asyncio
+    async def test_invalidation_during_fetch_is_not_stored(self):
+        """Test that a write during a load keeps its result out of the cache."""
+        import asyncio
+        from app.services.user_data_cache import UserDataCache
+        
+        cache = UserDataCache(enabled=True)
+        loader, calls = self.counting_loader(['before-write', 'after-write'])
+        
+        pending = asyncio.ensure_future(cache.get('elder-1', 'profile', loader))
+        await asyncio.sleep(0)
+        cache.invalidate('elder-1', ['profile'])
+        
+        assert await pending == 'before-write'
+        assert await cache.get('elder-1', 'profile', loader) == 'after-write'
+        assert len(calls) == 2
+    
+    @pytest.mark.asyncio
+    async def test_failed_loads_are_not_cached(self):
+        """Test that loader errors propagate and the next call retries."""
+        from app.services.user_data_cache import UserDataCache
+        
+        cache = UserDataCache(enabled=True)
+        attempts = []
+        
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("Firestore unavailable")
+            return 'ok'
+        
+        with pytest.raises(RuntimeError):
+            await cache.get('elder-1', 'health', flaky)
+        assert await cache.get('elder-1', 'health', flaky) == 'ok'
+    
+    @pytest.mark.asyncio
+    async def test_aggregator_reuses_cached_sources(self):
+        """Test repeated fetches hit the cache and writes invalidate what they change."""
+        from app.services.data_aggregator import DataAggregator
+        from app.services.user_data_cache import UserDataCache
+        
+        firebase = FakeFirestore(profile={'fullName': 'Asha'})
+        aggregator = DataAggregator(firebase=firebase, cache=UserDataCache(enabled=True))
+        
+        await aggregator.fetch_user_data('elder-1')
+        queries = len(firebase.calls)
+        await aggregator.fetch_user_data('elder-1')
+        assert len(firebase.calls) == queries
+        
+        await aggregator.flag_emergency('elder-1', {'isEmergency': True})
+        await aggregator.fetch_user_data('elder-1')
+        assert firebase.calls[queries:] == [('users', 'elder-1')]
+        
+        await aggregator.record_risk_score('elder-1', {'riskScore': 0.2}, {'fullName': 'Asha R'})
+        data = await aggregator.fetch_user_data('elder-1')
+        assert data['elder_name'] == 'Asha R'
+        assert data['risk_history'] == [{'riskScore': 0.2}]
+
+
+class TestDailyRollups:
+    """Tests for per-user daily rollup documents."""
+    
+    @staticmethod
+    def make_firestore(now):
+        """Raw documents over the last three UTC days."""
+        from datetime import timedelta
+        
+        def at(days_ago, hour):
+            day = (now - timedelta(days=days_ago)).replace(hour=0, minute=0, second=0, microsecond=0)
+            return day + timedelta(hours=hour)
+        
+        return FakeFirestore(collections={
+            'chats': [
+                {'userId': 'elder-1', 'timestamp': at(2, 9), 'sentiment': {'score': -0.5}, 'userMessage': 'I feel so lonely'},
+                {'userId': 'elder-1', 'timestamp': at(0, 8), 'sentiment': {'score': 0.5}, 'userMessage': 'My back hurts'}
+            ],
+            'moods': [
+                {'userId': 'elder-1', 'timestamp': at(2, 10), 'score': -1},
+                {'userId': 'elder-1', 'timestamp': at(1, 10), 'score': 1}
+            ],
+            'vision_logs': [
+                {'userId': 'elder-1', 'timestamp': at(1, 6), 'emotionScore': 0.2, 'fallDetected': True},
+                {'userId': 'elder-1', 'timestamp': at(1, 8), 'emotionScore': 0.4, 'distressLevel': 'high'},
+                {'userId': 'elder-1', 'timestamp': at(0, 2), 'emotionScore': 0.6}
+            ],
+            'activities': [
+                {'userId': 'elder-1', 'timestamp': at(1, 12), 'type': 'eating'},
+                {'userId': 'elder-1', 'timestamp': at(0, 7), 'type': 'sleeping', 'data': {'sleepHours': 8}}
+            ],
+            'medicines': [
+                {'userId': 'elder-1', 'timestamp': at(0, 9), 'taken': True},
+                {'userId': 'elder-1', 'timestamp': at(0, 10), 'taken': False}
+            ],
+            'alerts': [{'elderId': 'elder-1', 'timestamp': at(1, 3), 'type': 'emergency_button'}]
+        })
+    
+    @staticmethod
+    def utc_now():
+        from datetime import datetime, timezone
+        return datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+    
+    @pytest.mark.asyncio
+    async def test_window_metrics_from_rollups(self):
+        """Test that rollups reproduce the raw-document metrics."""
+        from app.services.daily_rollups import DailyRollups
+        
+        now = self.utc_now()
+        firebase = self.make_firestore(now)
+        rollups = DailyRollups(firebase=firebase, enabled=True, grace_h=6)
+        
+        metrics = await rollups.window('elder-1', 3, now)
+        
+        assert metrics['chat'] == {
+            'avg_sentiment': 0.0, 'lonely_mentions': 1, 'health_complaints': 1, 'message_count': 2
+        }
+        assert metrics['mood'] == {'sad_count': 1, 'happy_count': 1, 'inactive_days': 1}
+        assert metrics['vision']['fall_count'] == 1
+        assert metrics['vision']['distress_count'] == 1
+        assert metrics['vision']['emotion_score'] == 0.4
+        # Longest camera gap: 08:00 yesterday to 02:00 today
+        assert metrics['vision']['inactivity_hours'] == 18.0
+        assert metrics['activity']['days_without_eating'] == 2
+        assert metrics['activity']['sleep_quality'] == 1.0
+        assert metrics['health'] == {'medicine_missed': 1, 'medicine_adherence': 0.5, 'emergency_presses': 1}
+        assert len(firebase.documents['dailyRollups']) == 3
+    
+    @pytest.mark.asyncio
+    async def test_closed_days_are_final_and_today_is_incremental(self):
+        """Test that later reads only fold today's new documents, without double counting."""
+        from datetime import timedelta
+        from app.services.daily_rollups import DailyRollups
+        
+        now = self.utc_now()
+        firebase = self.make_firestore(now)
+        rollups = DailyRollups(firebase=firebase, enabled=True, grace_h=6)
+        
+        first = await rollups.window('elder-1', 3, now)
+        stored = firebase.documents['dailyRollups']
+        assert [doc['final'] for doc in sorted(stored.values(), key=lambda doc: doc['date'])] == [True, True, False]
+        
+        later = now + timedelta(hours=1)
+        firebase.collections['chats'].append({
+            'userId': 'elder-1', 'timestamp': now + timedelta(minutes=30),
+            'sentiment': {'score': 1.0}, 'userMessage': 'Lovely walk'
+        })
+        firebase.calls.clear()
+        
+        second = await rollups.window('elder-1', 3, later)
+        
+        assert second['chat']['message_count'] == first['chat']['message_count'] + 1
+        assert second['health'] == first['health']
+        assert rollups.get_stats()['days_incremental'] == 1
+        raw_starts = {
+            filters[1][2] for collection, filters in firebase.calls if collection == 'chats'
+        }
+        assert raw_starts == {now}
+    
+    @pytest.mark.asyncio
+    async def test_late_upload_folded_in_during_grace(self):
+        """Test that a closed day in its grace period picks up documents stamped before its last read."""
+        from datetime import timedelta
+        from app.services.daily_rollups import DailyRollups
+        
+        now = self.utc_now().replace(hour=1)
+        firebase = self.make_firestore(now)
+        rollups = DailyRollups(firebase=firebase, enabled=True, grace_h=6)
+        
+        first = await rollups.window('elder-1', 3, now)
+        # Uploaded late, stamped yesterday evening
+        firebase.collections['chats'].append({
+            'userId': 'elder-1', 'timestamp': now.replace(hour=0) - timedelta(hours=4),
+            'sentiment': {'score': 1.0}, 'userMessage': 'Lovely walk'
+        })
+        
+        second = await rollups.window('elder-1', 3, now + timedelta(hours=1))
+        assert second['chat']['message_count'] == first['chat']['message_count'] + 1
+        
+        final = await rollups.window('elder-1', 3, now + timedelta(hours=7))
+        assert final['chat']['message_count'] == second['chat']['message_count']
+        assert firebase.documents['dailyRollups'][f"elder-1_{(now - timedelta(days=1)).date().isoformat()}"]['final']
+    
+    @pytest.mark.asyncio
+    async def test_rebuild_is_idempotent(self):
+        """Test that recomputing days rewrites identical documents."""
+        import copy
+        from app.services.daily_rollups import DailyRollups
+        
+        now = self.utc_now()
+        firebase = self.make_firestore(now)
+        rollups = DailyRollups(firebase=firebase, enabled=True, grace_h=6)
+        
+        assert await rollups.rebuild('elder-1', 3, now) == 3
+        snapshot = copy.deepcopy(firebase.documents['dailyRollups'])
+        assert await rollups.rebuild('elder-1', 3, now) == 3
+        
+        assert firebase.documents['dailyRollups'] == snapshot
+
+
+class TestAPIEndpoints:
+    """Tests for FastAPI endpoints."""
+    
+    @pytest.fixture
+    def client(self):
+        """Create test client."""
+        from fastapi.testclient import TestClient
+        from app.main import app
+        return TestClient(app)
+    
+    def test_root_endpoint(self, client):
+        """Test root endpoint."""
+        response = client.get("/")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data['service'] == 'ElderNest ML Service'
+        assert 'capabilities' in data
+    
+    def test_health_endpoint(self, client):
+        """Test health check endpoint."""
+        response = client.get("/health")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data['status'] == 'healthy'
+        assert 'pose' in data['inference']
+    
+    def test_vision_gated_while_models_load(self, client, monkeypatch):
+        """Test 503 on vision endpoints while cheap endpoints keep working."""
+        from app.main import model_registry
+        
+        monkeypatch.setattr(type(model_registry), 'ready', property(lambda self: False))
+        monkeypatch.setattr(type(model_registry), 'loading', property(lambda self: True))
+        
+        response = client.post("/api/analyze-emotion", json={"image": create_test_image()})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+        assert client.get("/ready").status_code == 503
+        
+        response = client.post("/api/analyze-activity", json={"days": 7})
+        assert response.status_code == 200
+    
+    def test_analyze_clip_endpoint(self, client, tmp_path):
+        """Test clip upload as a raw video body."""
+        path = create_test_clip(str(tmp_path / 'clip.avi'))
+        with open(path, 'rb') as clip:
+            response = client.post(
+                "/api/vision/analyze-clip?userId=test-user",
+                content=clip.read(),
+                headers={"Content-Type": "video/x-msvideo"}
+            )
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data['clip']['frames_decoded'] == 30
+        assert data['timeline']
+        assert 'emotion' in data and 'fall' in data
+        
+        response = client.post(
+            "/api/vision/analyze-clip?userId=test-user",
+            content=b'not a video',
+            headers={"Content-Type": "video/webm"}
+        )
+        assert response.status_code == 400
+    
+    def test_analyze_emotion_endpoint(self, client):
+        """Test emotion analysis endpoint."""
+        image_b64 = create_test_image()
+        
+        response = client.post(
+            "/api/analyze-emotion",
+            json={"image": image_b64}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert 'emotion' in data
+    
+    def test_detect_fall_endpoint(self, client):
+        """Test fall detection endpoint."""
+        image_b64 = create_test_image()
+        
+        response = client.post(
+            "/api/detect-fall",
+            json={"image": image_b64}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert 'fall_detected' in data
+    
+    def test_binary_emotion_endpoint(self, client):
+        """Test emotion analysis from a raw image body."""
+        image_bytes = base64.b64decode(create_test_image())
+        
+        response = client.post(
+            "/api/analyze-emotion/binary",
+            content=image_bytes,
+            headers={"Content-Type": "image/png"}
+        )
+        
+        assert response.status_code == 200
+        assert 'emotion' in response.json()
+    
+    def test_binary_fall_endpoint_multipart(self, client):
+        """Test fall detection from a multipart upload."""
+        image_bytes = base64.b64decode(create_test_image())
+        
+        response = client.post(
+            "/api/detect-fall/binary",
+            files={"image": ("frame.png", image_bytes, "image/png")}
+        )
+        
+        assert response.status_code == 200
+        assert 'fall_detected' in response.json()
+    
+    def test_binary_comprehensive_endpoint(self, client):
+        """Test comprehensive analysis from a raw image body."""
+        image_bytes = base64.b64decode(create_test_image())
+        
+        response = client.post(
+            "/api/vision/comprehensive-analysis/binary?userId=test-user",
+            content=image_bytes,
+            headers={"Content-Type": "image/png"}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data['user_id'] == 'test-user'
+        assert 'emotion' in data and 'fall' in data
+    
+    def test_motion_gate_is_per_user(self, client):
+        """Test that two users sending the same cameraId never share a cached analysis."""
+        image_bytes = base64.b64decode(create_test_image())
+        
+        responses = [
+            client.post(
+                f"/api/vision/comprehensive-analysis/binary?userId={user}&cameraId=living-room",
+                content=image_bytes,
+                headers={"Content-Type": "image/png"}
+            ).json()
+            for user in ('gate-user-a', 'gate-user-b', 'gate-user-a')
+        ]
+        
+        assert responses[1]['user_id'] == 'gate-user-b'
+        assert not responses[1]['motion'].get('gated')
+        assert responses[2]['user_id'] == 'gate-user-a'
+        assert responses[2]['motion']['gated']
+    
+    def test_camera_websocket_stream(self, client):
+        """Test that a streamed frame is analyzed and pushed back."""
+        image_bytes = base64.b64decode(create_test_image())
+        
+        with client.websocket_connect("/ws/camera/test-user?fps=10") as websocket:
+            session = websocket.receive_json()
+            assert session['type'] == 'session'
+            assert session['user_id'] == 'test-user'
+            
+            websocket.send_bytes(image_bytes)
+            message = websocket.receive_json()
+            while message['type'] != 'analysis':
+                message = websocket.receive_json()
+            
+            assert message['frame'] == 1
+            assert 'emotion' in message['result']
+            assert 'fall' in message['result']
+    
+    def test_camera_websocket_rejects_bad_config(self, client):
+        """Test that malformed config messages get an error frame, not a closed socket."""
+        with client.websocket_connect("/ws/camera/test-user") as websocket:
+            assert websocket.receive_json()['type'] == 'session'
+            
+            for message in ('[1, 2]', '"config"', '{"type": "config", "fps": "fast"}',
+                            '{"type": "config", "fps": -1}', '{"type": "config", "fps": 1e9}'):
+                websocket.send_text(message)
+                assert websocket.receive_json()['type'] == 'error'
+            
+            websocket.send_text('{"type": "config", "fps": 4}')
+            session = websocket.receive_json()
+            assert session['type'] == 'session'
+            assert session['fps'] == 4.0
+    
+    def test_camera_websocket_rejects_bad_fps_query(self, client):
+        """Test that an invalid ?fps= closes the socket with a policy violation."""
+        from starlette.websockets import WebSocketDisconnect
+        from app.services.camera_session import camera_sessions
+        
+        for fps in ('nan', 'inf', '-1', '1e9'):
+            with client.websocket_connect(f"/ws/camera/test-user?fps={fps}") as websocket:
+                assert websocket.receive_json()['type'] == 'error'
+                with pytest.raises(WebSocketDisconnect) as closed:
+                    websocket.receive_json()
+                assert closed.value.code == 1008
+        
+        assert not any(session['user_id'] == 'test-user' for session in camera_sessions.get_stats()['sessions'])
+    
+    def test_movement_pattern_endpoint(self, client):
+        """Test per-user movement pattern endpoint."""
+        response = client.get("/api/vision/movement-pattern/test-user")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data['user_id'] == 'test-user'
+        assert 'activity_level' in data
+    
+    def test_binary_endpoint_rejects_empty_body(self, client):
+        """Test that an empty binary upload is a client error."""
+        response = client.post(
+            "/api/detect-fall/binary",
+            content=b"",
+            headers={"Content-Type": "image/jpeg"}
+        )
+        
+        assert response.status_code == 400
     
     def test_predict_risk_manual_endpoint(self, client):
         """Test manual risk prediction endpoint."""
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+ElderNest AI - ONNX Model Export
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+
+Exports the vision models to ONNX for INFERENCE_BACKEND=onnx:
+- yolov8n-pose (ultralytics) -> yolov8n-pose.onnx
+- DeepFace FER2013 emotion CNN -> emotion.onnx
+
+and, with ONNX_QUANTIZE=int8, an INT8 copy of each (*.int8.onnx).
+Needs the native frameworks plus `onnx` and `tf2onnx` at export time
+only; production nodes then need just `onnxruntime`.
+
+Usage:
+    python training/export_onnx_models.py
+"""
+
+import os
+import sys
+
+# Allow running from the project root without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.onnx_backend import (
+    DEFAULT_MODEL_DIR,
+    export_emotion_model,
+    export_pose_model,
+    resolve_model
+)
+from app.models.pose_estimator import PoseEstimator
+
+
+def main():
+    """Main entry point for the export script."""
+    print(f"📂 Model dir: {os.getenv('ONNX_MODEL_DIR', DEFAULT_MODEL_DIR)}")
+    print(f"⚙️  Quantization: {os.getenv('ONNX_QUANTIZE', 'none')}")
+
+    pose_path = resolve_model(
+        os.path.splitext(PoseEstimator.MODEL_NAME)[0],
+        lambda target: export_pose_model(PoseEstimator.MODEL_NAME, target)
+    )
+    print(f"✅ Pose model: {pose_path}")
+
+    emotion_path = resolve_model('emotion', export_emotion_model)
+    print(f"✅ Emotion model: {emotion_path}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️ Export interrupted by user.")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n\n❌ Export failed: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)